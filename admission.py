@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from config import ADMISSION_CONFIG
+from metrics_utils import increment
+
+class BusyError(Exception):
+    """Raised when a turn can't be admitted: the user is sending too fast or the wait queue is full"""
+
+    def __init__(self, reason):
+        super().__init__(f"Busy: {reason}")
+        self.reason = reason
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount=1):
+        """Take `amount` tokens, going into debt if needed; returns seconds until they are covered"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def refund(self, amount=1):
+        """Give back a reservation that was not used"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+class AdmissionController:
+    """Per-user rate limits and a global concurrency and tokens-per-minute budget"""
+
+    def __init__(self, config=ADMISSION_CONFIG):
+        self.config = config
+        self._lock = threading.Lock()
+        self._user_buckets = OrderedDict()  # user_id -> TokenBucket, least recently used first
+        self._slots = threading.BoundedSemaphore(config["max_in_flight"])
+        self._tpm = TokenBucket(config["tokens_per_minute"] / 60, config["tokens_per_minute"])
+        self._waiting = 0
+        self._in_flight = 0
+
+    def run(self, user_id, iterator_factory, estimated_tokens, meta=None, submitted_at=None):
+        """Admit a turn and yield its output on the calling thread.
+
+        `iterator_factory(meta)` starts the upstream request once the turn is admitted;
+        its global slot is held until the output is exhausted or the iteration stops.
+        Raises BusyError if the turn can't be admitted within the configured wait, counted
+        from `submitted_at` (time.monotonic()) when the turn queued for a worker first.
+        """
+        self._acquire(user_id, estimated_tokens, submitted_at)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield from iterator_factory(meta if meta is not None else {})
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {'waiting': self._waiting, 'in_flight': self._in_flight, 'users': len(self._user_buckets)}
+
+    def _user_bucket(self, user_id):
+        with self._lock:
+            bucket = self._user_buckets.get(user_id)
+            if bucket is None:
+                bucket = TokenBucket(self.config["user_turns_per_minute"] / 60, self.config["user_burst"])
+                self._user_buckets[user_id] = bucket
+                while len(self._user_buckets) > self.config["max_tracked_users"]:
+                    self._user_buckets.popitem(last=False)
+            self._user_buckets.move_to_end(user_id)
+            return bucket
+
+    def _acquire(self, user_id, estimated_tokens, submitted_at=None):
+        """Wait for the user's rate limit, a global slot and token budget, or raise BusyError"""
+        deadline = (time.monotonic() if submitted_at is None else submitted_at) + self.config["max_wait"]
+        if time.monotonic() >= deadline:
+            # Spent the whole wait queued for a worker
+            increment('board_chat_rejected_total', reason='queue_wait')
+            raise BusyError('queue_wait')
+        with self._lock:
+            if self._waiting >= self.config["max_waiting"]:
+                increment('board_chat_rejected_total', reason='queue_full')
+                raise BusyError('queue_full')
+            self._waiting += 1
+        try:
+            bucket = self._user_bucket(user_id)
+            wait = bucket.reserve()
+            if time.monotonic() + wait > deadline:
+                bucket.refund()
+                increment('board_chat_rejected_total', reason='user_rate')
+                raise BusyError('user_rate')
+            time.sleep(wait)
+
+            if not self._slots.acquire(timeout=max(0, deadline - time.monotonic())):
+                bucket.refund()
+                increment('board_chat_rejected_total', reason='concurrency')
+                raise BusyError('concurrency')
+
+            wait = self._tpm.reserve(estimated_tokens)
+            if time.monotonic() + wait > deadline:
+                self._tpm.refund(estimated_tokens)
+                self._slots.release()
+                bucket.refund()
+                increment('board_chat_rejected_total', reason='tokens_per_minute')
+                raise BusyError('tokens_per_minute')
+            time.sleep(wait)
+        finally:
+            with self._lock:
+                self._waiting -= 1
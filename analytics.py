@@ -0,0 +1,155 @@
+"""Precomputed admin analytics: rollup counters kept under analytics/ in Firebase.
+
+The logging path adds each turn to the rollups with server-side increments (see
+build_analytics_update), so the admin Analytics tab reads a handful of small nodes
+instead of scanning `chats`:
+
+    analytics/total                      chats, turns
+    analytics/days/<YYYY-MM-DD>          chats started, turns
+    analytics/languages/<language>       chats started, turns
+    analytics/members/<member>           chats started, turns the member was selected for
+    analytics/turn_histogram/<bucket>    chats by their current number of turns
+
+Chats logged before the rollups existed are counted once with the backfill job, which
+streams `chats` in pages and replaces the rollups with totals recomputed from them:
+
+    python analytics.py --backfill
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from config import ANALYTICS_CONFIG
+from firebase_utils import initialize_firebase, iter_chats, increment_value, safe_key, _normalize_messages
+
+# Upper bound (inclusive) and label of each turn-count bucket; the last one is open-ended
+TURN_BUCKETS = [(1, '1 turn'), (2, '2 turns'), (5, '3-5 turns'), (10, '6-10 turns'), (20, '11-20 turns'),
+                (None, '21+ turns')]
+
+def turn_bucket(turns):
+    """The histogram bucket for a chat with `turns` turns"""
+    for upper, label in TURN_BUCKETS:
+        if upper is None or turns <= upper:
+            return label
+
+def _count_turns(messages):
+    return sum(1 for msg in messages if msg.get('role') == 'user')
+
+def build_analytics_update(messages, board_members, language, start=0):
+    """Root-relative update adding messages[start:] of a chat to the rollups.
+
+    A chat counts as started when it is first logged (start 0). Its turn-count bucket
+    moves with it: the bucket it leaves is decremented and the one it enters incremented.
+    """
+    new_turns = _count_turns(messages[start:])
+    if not new_turns:
+        return {}
+    turns_before = _count_turns(messages[:start])
+    counters = {'turns': new_turns}
+    if not start:
+        counters['chats'] = 1
+
+    paths = ['analytics/total', f"analytics/days/{datetime.utcnow().strftime('%Y-%m-%d')}",
+             f'analytics/languages/{safe_key(language)}']
+    paths += [f'analytics/members/{safe_key(member)}' for member in board_members]
+    update = {f'{path}/{name}': increment_value(amount) for path in paths for name, amount in counters.items()}
+
+    before, after = turn_bucket(turns_before) if turns_before else None, turn_bucket(turns_before + new_turns)
+    if before != after:
+        if before:
+            update[f'analytics/turn_histogram/{before}'] = increment_value(-1)
+        update[f'analytics/turn_histogram/{after}'] = increment_value(1)
+    return update
+
+def log_analytics(ref, messages, board_members, language, start=0):
+    """Add newly logged messages to the rollups in Firebase"""
+    if not ref:
+        return
+
+    try:
+        update = build_analytics_update(messages, board_members, language, start)
+        if update:
+            ref.update(update)
+    except Exception as e:
+        print(f"Error logging analytics: {str(e)}")
+
+def get_analytics_summary(ref, days=30, top_members=20):
+    """The rollups for the admin dashboard; reads a bounded amount however many chats exist.
+
+    Returns the totals, the last `days` days (oldest first), per-language totals, the
+    `top_members` members by turns and the turn-count histogram in bucket order.
+    """
+    summary = {'total': {}, 'days': {}, 'languages': {}, 'members': {}, 'turn_histogram': {}}
+    if not ref:
+        return summary
+
+    try:
+        analytics = ref.child('analytics')
+        summary['total'] = analytics.child('total').get() or {}
+        summary['days'] = dict(sorted((analytics.child('days').order_by_key().limit_to_last(days).get() or {}).items()))
+        summary['languages'] = analytics.child('languages').get() or {}
+        members = analytics.child('members').order_by_child('turns').limit_to_last(top_members).get() or {}
+        summary['members'] = dict(sorted(members.items(), key=lambda item: item[1].get('turns', 0), reverse=True))
+        histogram = analytics.child('turn_histogram').get() or {}
+        summary['turn_histogram'] = {label: histogram.get(label, 0) for _, label in TURN_BUCKETS}
+        return summary
+
+    except Exception as e:
+        print(f"Error retrieving analytics: {str(e)}")
+        return summary
+
+def backfill_analytics(ref, page_size=200):
+    """Recompute the rollups from every chat in Firebase and replace them; returns the chats counted.
+
+    Chats are streamed one page at a time, so memory is bounded by the number of days,
+    languages and members rather than chats. Without per-turn timestamps, a chat's
+    turns are all counted on the day it was last updated. Turns logged while the job
+    runs may be counted twice or not at all, so run it at a quiet time.
+    """
+    if not ref:
+        return 0
+
+    rollups = defaultdict(lambda: defaultdict(int))
+    counted = 0
+    for _, chat_data in iter_chats(ref, page_size):
+        if not isinstance(chat_data, dict):
+            continue
+        turns = _count_turns(_normalize_messages(chat_data.get('messages')))
+        if not turns:
+            continue
+        day = chat_data.get('timestamp', datetime.utcnow().isoformat())[:10]
+        paths = ['total', f'days/{day}', f"languages/{safe_key(chat_data.get('language', 'English'))}"]
+        paths += [f'members/{safe_key(member)}' for member in chat_data.get('board_members', [])]
+        for path in paths:
+            rollups[path]['chats'] += 1
+            rollups[path]['turns'] += turns
+        rollups['turn_histogram'][turn_bucket(turns)] += 1
+        counted += 1
+        if counted % (page_size * 10) == 0:
+            print(f"Counted {counted} chats")
+
+    tree = {}
+    for path, counters in rollups.items():
+        node = tree
+        for part in path.split('/')[:-1]:
+            node = node.setdefault(part, {})
+        node[path.split('/')[-1]] = dict(counters)
+    tree['backfilled_at'] = datetime.utcnow().isoformat()
+    ref.child('analytics').set(tree)
+    return counted
+
+def main():
+    parser = argparse.ArgumentParser(description="Admin analytics rollups")
+    parser.add_argument("--backfill", action="store_true", help="recompute the rollups from all chats")
+    parser.add_argument("--page-size", type=int, default=ANALYTICS_CONFIG["page_size"])
+    args = parser.parse_args()
+
+    ref = initialize_firebase()
+    if not ref:
+        raise SystemExit("Firebase is not configured")
+    if args.backfill:
+        print(f"Rollups rebuilt from {backfill_analytics(ref, args.page_size)} chats")
+    total = get_analytics_summary(ref)['total']
+    print(f"{total.get('chats', 0)} chats, {total.get('turns', 0)} turns")
+
+if __name__ == "__main__":
+    main()
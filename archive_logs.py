@@ -0,0 +1,177 @@
+"""Retention job: move chats older than the retention period out of Firebase into a local archive.
+
+Old chats are read oldest-first from chat_index (so each run only touches chats past
+the cutoff), written to compressed, date-partitioned archive files, and then removed
+from `chats` and `chat_index`. Firebase keeps only recent activity; archived chats
+stay retrievable from the admin panel.
+
+    python archive_logs.py                       # uses ARCHIVE_RETENTION_DAYS
+    python archive_logs.py --retention-days 30 --dry-run
+    python archive_logs.py --backfill-index      # first index chats logged before chat_index existed
+
+Run it from cron, e.g. daily: 0 3 * * * cd /app && python archive_logs.py
+"""
+import argparse
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from config import ARCHIVE_CONFIG
+from export_logs import export_record
+from firebase_utils import initialize_firebase, backfill_chat_index
+from sqlite_utils import connect_sqlite
+
+class ChatArchive:
+    """Date-partitioned archive of chats with a manifest for point lookups.
+
+    Chats are stored as gzip-compressed JSONL under <path>/<YYYY>/<MM>/<YYYY-MM-DD>.jsonl.gz,
+    partitioned by their last update. Every write appends one complete gzip member, and
+    the SQLite manifest records each chat's partition, member offset and length, so
+    retrieving a chat only decompresses the member it was written in.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest_path = os.path.join(path, 'manifest.sqlite3')
+        os.makedirs(path, exist_ok=True)
+        with connect_sqlite(self.manifest_path) as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS chats ('
+                'user_id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, language TEXT, board_members TEXT, '
+                'message_count INTEGER, partition TEXT NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS chats_timestamp ON chats (timestamp)')
+
+    def add(self, records):
+        """Archive exported chat records (see export_logs.export_record)"""
+        by_day = defaultdict(list)
+        for record in records:
+            by_day[record['timestamp'][:10]].append(record)
+
+        rows = []
+        for day, day_records in by_day.items():
+            partition = os.path.join(day[:4], day[5:7], f'{day}.jsonl.gz')
+            file_path = os.path.join(self.path, partition)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            data = gzip.compress(
+                ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in day_records).encode('utf-8')
+            )
+            with open(file_path, 'ab') as f:
+                offset = f.tell()
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            rows += [
+                (record['user_id'], record['timestamp'], record['language'],
+                 json.dumps(record['board_members'], ensure_ascii=False), record['message_count'],
+                 partition, offset, len(data))
+                for record in day_records
+            ]
+        # Only listed in the manifest once the data is on disk
+        with connect_sqlite(self.manifest_path) as conn:
+            conn.executemany('INSERT OR REPLACE INTO chats VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def get(self, user_id):
+        """The archived chat record, or None"""
+        with connect_sqlite(self.manifest_path) as conn:
+            row = conn.execute(
+                'SELECT partition, offset, length FROM chats WHERE user_id = ?', (user_id,)
+            ).fetchone()
+        if not row:
+            return None
+        partition, offset, length = row
+        with open(os.path.join(self.path, partition), 'rb') as f:
+            f.seek(offset)
+            member = f.read(length)
+        for line in gzip.decompress(member).decode('utf-8').splitlines():
+            record = json.loads(line)
+            if record['user_id'] == user_id:
+                return record
+        return None
+
+    def list(self, limit=20, offset=0):
+        """Archived chat metadata, newest first: (entries, total)"""
+        with connect_sqlite(self.manifest_path) as conn:
+            total = conn.execute('SELECT COUNT(*) FROM chats').fetchone()[0]
+            rows = conn.execute(
+                'SELECT user_id, timestamp, language, board_members, message_count FROM chats '
+                'ORDER BY timestamp DESC LIMIT ? OFFSET ?',
+                (limit, offset)
+            ).fetchall()
+        entries = [{
+            'user_id': user_id,
+            'timestamp': datetime.fromisoformat(timestamp),
+            'language': language,
+            'board_members': json.loads(board_members or '[]'),
+            'message_count': message_count
+        } for user_id, timestamp, language, board_members, message_count in rows]
+        return entries, total
+
+    def stats(self):
+        """Number of archived chats and the range of their timestamps"""
+        with connect_sqlite(self.manifest_path) as conn:
+            count, oldest, newest = conn.execute('SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM chats').fetchone()
+        return {'chats': count, 'oldest': oldest, 'newest': newest}
+
+def archive_old_chats(ref, archive, retention_days, page_size=200, dry_run=False):
+    """Move chats not updated within `retention_days` into the archive; returns how many"""
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).isoformat()
+    index = ref.child('chat_index')
+    moved = 0
+    last_key = None
+    while True:
+        query = index.order_by_child('timestamp').end_at(cutoff)
+        if dry_run and last_key:
+            # Nothing is removed in a dry run, so page past what was already counted
+            query = index.order_by_child('timestamp').start_at(last_key[0]).end_at(cutoff)
+        entries = query.limit_to_first(page_size + (1 if dry_run and last_key else 0)).get() or {}
+        keys = [key for key, entry in entries.items()
+                if not (last_key and (entry.get('timestamp'), key) <= last_key)]
+        if not keys:
+            return moved
+        last_key = (entries[keys[-1]].get('timestamp'), keys[-1])
+        if dry_run:
+            moved += len(keys)
+            continue
+
+        records = []
+        for user_id in keys:
+            chat_data = ref.child('chats').child(user_id).get()
+            if isinstance(chat_data, dict):
+                records.append(export_record(user_id, chat_data))
+        archive.add(records)
+        # Removed from Firebase only after the archive write is on disk
+        update = {}
+        for user_id in keys:
+            update[f'chats/{user_id}'] = None
+            update[f'chat_index/{user_id}'] = None
+        ref.update(update)
+        moved += len(records)
+        print(f"Archived {moved} chats")
+
+def create_archive(config=ARCHIVE_CONFIG):
+    """Open the configured chat archive, or None when there is no archive directory yet"""
+    if not os.path.isdir(config["path"]):
+        return None
+    return ChatArchive(config["path"])
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive chats older than the retention period")
+    parser.add_argument("--retention-days", type=int, default=ARCHIVE_CONFIG["retention_days"])
+    parser.add_argument("--path", default=ARCHIVE_CONFIG["path"], help="archive directory")
+    parser.add_argument("--page-size", type=int, default=ARCHIVE_CONFIG["page_size"])
+    parser.add_argument("--dry-run", action="store_true", help="only count the chats that would be archived")
+    parser.add_argument("--backfill-index", action="store_true", help="index chats missing from chat_index first")
+    args = parser.parse_args()
+
+    ref = initialize_firebase()
+    if not ref:
+        raise SystemExit("Firebase is not configured")
+    if args.backfill_index:
+        print(f"Indexed {backfill_chat_index(ref)} older conversations")
+    moved = archive_old_chats(ref, ChatArchive(args.path), args.retention_days, args.page_size, args.dry_run)
+    print(f"{'Would archive' if args.dry_run else 'Archived'} {moved} chats older than {args.retention_days} days")
+
+if __name__ == "__main__":
+    main()
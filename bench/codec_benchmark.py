@@ -0,0 +1,114 @@
+"""Bytes saved and CPU cost of the stored-message codec (firebase_utils.encode_message).
+
+Compares the original {'role', 'content'} JSON with codec version 1, with and without
+a preset dictionary. The dictionary is trained on one half of the corpus and measured
+on the other. The corpus is an export from export_logs.py, or synthetic replies.
+
+    python -m bench.codec_benchmark --input chats.jsonl.gz
+    python -m bench.codec_benchmark --messages 2000 --compression zstd
+    python -m bench.codec_benchmark --input chats.jsonl.gz --train-dict codec/messages.dict
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+
+import firebase_utils
+from bench.mock_openrouter import WORDS
+from bench.load_test import DEFAULT_QUESTIONS, FOLLOW_UPS
+from config import MESSAGE_CODEC_CONFIG
+
+def load_corpus(path):
+    """Messages from an export_logs.py JSONL file (plain or .gz)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    messages = []
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                messages.extend(json.loads(line).get('messages', []))
+    return messages
+
+def synthetic_corpus(count, reply_tokens=200):
+    """Alternating questions and board replies built from the mock provider's vocabulary"""
+    messages = []
+    for i in range(count):
+        if i % 2 == 0:
+            messages.append({'role': 'user', 'content': random.choice(DEFAULT_QUESTIONS + FOLLOW_UPS)})
+        else:
+            tokens = random.randint(reply_tokens // 4, reply_tokens)
+            content = ' '.join(random.choice(WORDS) for _ in range(tokens))
+            messages.append({'role': 'assistant', 'content': content, 'model': 'openai/gpt-4-0125-preview',
+                             'ttft_ms': random.randint(200, 900), 'latency_ms': random.randint(2000, 9000)})
+    return messages
+
+def _json_size(value):
+    # Firebase stores and transfers the JSON form
+    return len(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+def measure(messages, config, dictionary=None):
+    """Total stored bytes and per-message encode/decode time in microseconds"""
+    firebase_utils._codec_dictionaries = (
+        ({firebase_utils._dictionary_id(dictionary): dictionary}, firebase_utils._dictionary_id(dictionary))
+        if dictionary else ({}, None)
+    )
+    start = time.perf_counter()
+    stored = [firebase_utils.encode_message(msg, config) for msg in messages]
+    encode_us = (time.perf_counter() - start) / len(messages) * 1e6
+    start = time.perf_counter()
+    decoded = [firebase_utils.decode_message(value) for value in stored]
+    decode_us = (time.perf_counter() - start) / len(messages) * 1e6
+    assert [msg['content'] for msg in decoded] == [msg['content'] for msg in messages]
+    return {
+        'bytes': sum(_json_size(value) for value in stored),
+        'encode_us': encode_us,
+        'decode_us': decode_us,
+        'compressed': sum('z' in value for value in stored)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Stored-message codec benchmark")
+    parser.add_argument("--input", help="export_logs.py JSONL(.gz) file; synthetic messages otherwise")
+    parser.add_argument("--messages", type=int, default=2000, help="synthetic corpus size")
+    parser.add_argument("--compression", choices=["zlib", "zstd"], default=MESSAGE_CODEC_CONFIG["compression"])
+    parser.add_argument("--threshold", type=int, default=MESSAGE_CODEC_CONFIG["threshold"])
+    parser.add_argument("--dict-size", type=int, default=32768)
+    parser.add_argument("--train-dict", help="train a dictionary on the whole corpus and write it here")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    messages = load_corpus(args.input) if args.input else synthetic_corpus(args.messages)
+    messages = [msg for msg in messages if msg.get('content')]
+    if len(messages) < 2:
+        raise SystemExit("Not enough messages to benchmark")
+    config = dict(MESSAGE_CODEC_CONFIG, compression=args.compression, threshold=args.threshold)
+
+    if args.train_dict:
+        dictionary = firebase_utils.train_message_dictionary(
+            [msg['content'] for msg in messages], args.dict_size, args.compression)
+        with open(args.train_dict, 'wb') as f:
+            f.write(dictionary)
+        print(f"Wrote {len(dictionary)} byte dictionary ({firebase_utils._dictionary_id(dictionary)}) to {args.train_dict}")
+        return
+
+    # Shuffled so both halves mix questions and replies
+    shuffled = random.sample(messages, len(messages))
+    train, test = shuffled[:len(shuffled) // 2], shuffled[len(shuffled) // 2:]
+    dictionary = firebase_utils.train_message_dictionary(
+        [msg['content'] for msg in train], args.dict_size, args.compression)
+    legacy = sum(_json_size(firebase_utils.decode_message(dict(msg))) for msg in test)
+    rows = [
+        ('original JSON', {'bytes': legacy, 'encode_us': 0.0, 'decode_us': 0.0, 'compressed': 0}),
+        (f'v1 {args.compression}', measure(test, config)),
+        (f'v1 {args.compression} + dict', measure(test, config, dictionary))
+    ]
+
+    print(f"{len(test)} messages, {legacy / len(test):.0f} bytes each as original JSON\n")
+    print(f"{'encoding':<22}{'bytes':>12}{'saved':>8}{'compressed':>12}{'encode us':>11}{'decode us':>11}")
+    for name, row in rows:
+        print(f"{name:<22}{row['bytes']:>12}{1 - row['bytes'] / legacy:>8.1%}{row['compressed']:>12}"
+              f"{row['encode_us']:>11.1f}{row['decode_us']:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""In-memory stand-in for a firebase_admin.db Reference.
+
+Implements the subset firebase_utils uses (child, get, set, update, push, delete,
+transaction, ordered/limited queries, listen) over a nested dict, with optional
+simulated round-trip latency. Pass `FakeDatabase().reference()` wherever the app
+expects the `db` reference.
+"""
+import copy
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+class FakeDatabase:
+    """Shared in-memory tree plus simulated latency for every round trip"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0):
+        self.root = {}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.lock = threading.RLock()
+        self.round_trips = 0
+
+    def reference(self, path=''):
+        return FakeReference(self, path)
+
+    def round_trip(self):
+        with self.lock:
+            self.round_trips += 1
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+
+def _split(path):
+    return [part for part in path.strip('/').split('/') if part]
+
+def _to_firebase(value):
+    """Store lists the way Firebase does: as index-keyed children"""
+    if isinstance(value, list):
+        value = {str(i): item for i, item in enumerate(value)}
+    if isinstance(value, dict):
+        return {str(k): _to_firebase(v) for k, v in value.items() if v is not None}
+    return value
+
+def _from_firebase(value):
+    """Return index-keyed children as a list when dense enough, like the real SDK"""
+    if not isinstance(value, dict):
+        return value
+    value = {k: _from_firebase(v) for k, v in value.items()}
+    if value and all(k.isdigit() for k in value):
+        top = max(int(k) for k in value)
+        if top < 2 * len(value):
+            return [value.get(str(i)) for i in range(top + 1)]
+    return value
+
+class FakeReference:
+    def __init__(self, database, path):
+        self._db = database
+        self.path = '/'.join(_split(path))
+        self.key = _split(path)[-1] if _split(path) else None
+
+    def child(self, path):
+        return FakeReference(self._db, f'{self.path}/{path}')
+
+    def _node(self, create=False):
+        node = self._db.root
+        for part in _split(self.path):
+            if not isinstance(node, dict) or part not in node:
+                if not create:
+                    return None
+                node[part] = {}
+            node = node[part]
+        return node
+
+    def _write(self, path, value):
+        parts = _split(path)
+        if not parts:
+            self._db.root = value if isinstance(value, dict) else {}
+            return
+        node = self._db.root
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        if value is None or value == {}:
+            node.pop(parts[-1], None)
+        elif isinstance(value, dict) and '.sv' in value:
+            # Server value {'.sv': {'increment': n}}, applied to the stored number
+            current = node.get(parts[-1])
+            node[parts[-1]] = (current if isinstance(current, (int, float)) else 0) + value['.sv']['increment']
+        else:
+            node[parts[-1]] = value
+
+    def get(self, etag=False, shallow=False):
+        self._db.round_trip()
+        with self._db.lock:
+            node = self._node()
+            if shallow and isinstance(node, dict):
+                return {k: True for k in node}
+            return _from_firebase(copy.deepcopy(node))
+
+    def set(self, value):
+        self._db.round_trip()
+        with self._db.lock:
+            self._write(self.path, _to_firebase(copy.deepcopy(value)))
+
+    def update(self, value):
+        self._db.round_trip()
+        with self._db.lock:
+            for key, item in value.items():
+                self._write(f'{self.path}/{key}', _to_firebase(copy.deepcopy(item)))
+
+    def push(self, value=''):
+        key = f'-{int(time.time() * 1000):013d}{uuid.uuid4().hex[:7]}'
+        child = self.child(key)
+        if value != '':
+            child.set(value)
+        return child
+
+    def delete(self):
+        self._db.round_trip()
+        with self._db.lock:
+            self._write(self.path, None)
+
+    def transaction(self, transaction_update):
+        self._db.round_trip()
+        with self._db.lock:
+            current = _from_firebase(copy.deepcopy(self._node()))
+            result = transaction_update(current)
+            self._write(self.path, _to_firebase(copy.deepcopy(result)))
+            return result
+
+    def listen(self, callback):
+        return _FakeListener()
+
+    def order_by_child(self, path):
+        return FakeQuery(self, lambda item: _child_value(item[1], path))
+
+    def order_by_key(self):
+        return FakeQuery(self, lambda item: item[0])
+
+    def order_by_value(self):
+        return FakeQuery(self, lambda item: item[1])
+
+def _child_value(value, path):
+    for part in _split(path):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def _sort_key(value):
+    # Firebase orders null < booleans < numbers < strings < objects
+    if value is None:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, value)
+    if isinstance(value, str):
+        return (3, value)
+    return (4, 0)
+
+class FakeQuery:
+    def __init__(self, ref, order):
+        self._ref = ref
+        self._order = order
+        self._start = None
+        self._end = None
+        self._first = None
+        self._last = None
+
+    def start_at(self, value):
+        self._start = value
+        return self
+
+    def end_at(self, value):
+        self._end = value
+        return self
+
+    def equal_to(self, value):
+        self._start = self._end = value
+        return self
+
+    def limit_to_first(self, limit):
+        self._first = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self._last = limit
+        return self
+
+    def get(self):
+        self._ref._db.round_trip()
+        with self._ref._db.lock:
+            node = self._ref._node()
+            if not isinstance(node, dict):
+                return OrderedDict()
+            items = sorted(node.items(), key=lambda item: (_sort_key(self._order(item)), item[0]))
+            if self._start is not None:
+                items = [item for item in items if _sort_key(self._order(item)) >= _sort_key(self._start)]
+            if self._end is not None:
+                items = [item for item in items if _sort_key(self._order(item)) <= _sort_key(self._end)]
+            if self._first is not None:
+                items = items[:self._first]
+            if self._last is not None:
+                items = items[-self._last:]
+            return OrderedDict((key, _from_firebase(copy.deepcopy(value))) for key, value in items)
+
+class _FakeListener:
+    def close(self):
+        pass
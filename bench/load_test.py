@@ -0,0 +1,313 @@
+"""End-to-end load test of the board chat turn flow.
+
+Drives N concurrent simulated sessions through the turn pipeline main_backup runs
+(turn_pipeline: similar-question lookup, admission, background jobs, single or full
+board replies, conversation, analytics and usage logging, session save and restore)
+against the local OpenRouter mock and an in-memory Firebase, and reports p50/p95/p99
+per phase along with how many turns were turned away and why.
+
+    python -m bench.load_test --sessions 20 --turns 5
+    python -m bench.load_test --board-share 0.3 --rerun-share 0.2 --similar
+    python -m bench.load_test --replay requests.jsonl --stream-share 0 --log-mode sync
+    python -m bench.load_test --url http://127.0.0.1:8765/api/v1/chat/completions   # external mock
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+from bench.mock_openrouter import add_mock_arguments, mock_options, start_server
+from bench.fake_firebase import FakeDatabase
+
+DEFAULT_QUESTIONS = [
+    "How do I choose a cofounder?",
+    "Should I quit my job to start a company?",
+    "How do I decide between two job offers?",
+    "What should I focus on in my first 90 days as a manager?",
+    "How do I know if my idea is worth pursuing?"
+]
+
+FOLLOW_UPS = [
+    "Can you say more about that?",
+    "What would the others on the board disagree with?",
+    "What is the first concrete step?"
+]
+
+def load_questions(path):
+    """Read first-turn questions from a JSONL file (question/content/body/title fields)"""
+    questions = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            for field in ('question', 'content', 'body', 'title'):
+                if record.get(field):
+                    questions.append(record[field])
+                    break
+    return questions
+
+class PhaseTimer:
+    """Thread-safe collection of per-phase durations and event counts"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.events = Counter()
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, phase, seconds):
+        with self._lock:
+            self.samples[phase].append(seconds)
+
+    def count(self, event):
+        with self._lock:
+            self.events[event] += 1
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+def follow_turn(job, turn, timer, submitted, stop_after=None):
+    """Consume a turn job like show_turn_output does; returns (reply, meta), or None if stopped early"""
+    from turn_pipeline import collect_reply
+    meta = {}
+    items = []
+    for item in job.follow(meta):
+        if not items:
+            timer.record('upstream_ttft', time.perf_counter() - submitted)
+        items.append(item)
+        if stop_after and len(items) >= stop_after:
+            # The browser went away mid-reply; the job keeps running for the next script run
+            return None
+    return collect_reply(turn, items), meta
+
+def run_session(session_index, args, questions, services, timer):
+    """One simulated user: a first question followed by follow-ups, through turn_pipeline"""
+    # Imported after OPENROUTER_URL is set in main()
+    from config import DEFAULT_BOARD_MEMBERS, SYSTEM_PROMPTS
+    from context_utils import new_context_state, plan_context
+    from firebase_utils import get_config, generate_user_id
+    from openrouter_utils import _error_message
+    from admission import BusyError
+    from session_store import new_session_token, serialize_session, deserialize_session
+    from turn_pipeline import (
+        new_turn, estimate_turn_tokens, over_token_budget, lookup_similar, remember_answer,
+        submit_turn, attach_reply, log_messages, log_turn_usage
+    )
+
+    ref, log_writer, store = services['ref'], services['log_writer'], services['session_store']
+    job_runner, admission, similar = services['job_runner'], services['admission'], services['similar']
+    token = new_session_token()
+    state = {
+        'messages': [], 'context': new_context_state(), 'logged_count': 0, 'user_id': generate_user_id(),
+        'language': "English", 'pending_turn': None, 'session_tokens': 0
+    }
+    rng = random.Random(session_index)
+
+    def save():
+        if store:
+            start = time.perf_counter()
+            store.put(token, serialize_session(state))
+            timer.record('session_save', time.perf_counter() - start)
+
+    def restore():
+        # A new browser session (reload, rerun after a disconnect) loads the meeting from the store
+        if store:
+            start = time.perf_counter()
+            blob = store.get(token)
+            timer.record('session_restore', time.perf_counter() - start)
+            if blob:
+                state.update(deserialize_session(blob))
+
+    def log():
+        start = time.perf_counter()
+        state['logged_count'], _ = log_messages(
+            log_writer, ref, state['user_id'], state['messages'], members, language, state['logged_count']
+        )
+        timer.record('log_conversation', time.perf_counter() - start)
+
+    for turn_number in range(args.turns):
+        turn_start = time.perf_counter()
+        language = state['language']
+        if turn_number and rng.random() < args.restore_share:
+            restore()
+
+        start = time.perf_counter()
+        config = get_config(ref) or {'board_members': DEFAULT_BOARD_MEMBERS, 'system_prompts': SYSTEM_PROMPTS}
+        timer.record('get_config', time.perf_counter() - start)
+        members = config['board_members']
+
+        question = questions[session_index % len(questions)] if turn_number == 0 else rng.choice(FOLLOW_UPS)
+        state['messages'].append({"role": "user", "content": question})
+
+        start = time.perf_counter()
+        plan = plan_context(state['messages'], state['context'], language)
+        timer.record('prompt_build', time.perf_counter() - start)
+
+        turn = new_turn(state['messages'], rng.random() < args.board_share, rng.random() < args.stream_share,
+                        members, language)
+        match = lookup_similar(similar, turn, question)
+        if match and match[0] == 'served':
+            timer.count('similar_served')
+            state['messages'].append({"role": "assistant", "content": match[2]['answer'], "model": "similar"})
+            log()
+            save()
+            timer.record('turn_total', time.perf_counter() - turn_start)
+            continue
+        if over_token_budget(state['session_tokens'], estimate_turn_tokens(turn, plan)):
+            timer.count('budget_rejected')
+            state['messages'].pop()
+            break
+        timer.count('full_board' if turn['full_board'] else 'stream' if turn['stream'] else 'blocking')
+
+        submitted = time.perf_counter()
+        try:
+            job = submit_turn(job_runner, admission, state['user_id'], turn, plan, config)
+            state['pending_turn'] = turn
+            save()
+            if rng.random() < args.rerun_share:
+                timer.count('rerun')
+                follow_turn(job, turn, timer, submitted, stop_after=1)
+                restore()
+                job = job_runner.get(state['user_id'], state['pending_turn']['turn_index'])
+            result = follow_turn(job, turn, timer, submitted)
+        except BusyError as e:
+            # main_backup drops the question and shows the busy message
+            timer.count(f"busy_{e.reason}")
+            state['messages'].pop()
+            state['pending_turn'] = None
+            job_runner.discard(state['user_id'], turn['turn_index'])
+            save()
+            timer.record('turn_total', time.perf_counter() - turn_start)
+            continue
+        timer.record('upstream_total', time.perf_counter() - submitted)
+        response, meta = result
+        if response.endswith((_error_message(language, "request"), _error_message(language, "processing"))):
+            timer.error()
+
+        attach_reply(state, response, meta)
+        job_runner.discard(state['user_id'], turn['turn_index'])
+        log()
+        start = time.perf_counter()
+        state['session_tokens'] += log_turn_usage(log_writer, ref, state['user_id'], turn, meta, False)
+        timer.record('log_usage', time.perf_counter() - start)
+        remember_answer(similar, turn, state['messages'][0]['content'], response, meta)
+        save()
+
+        timer.record('turn_total', time.perf_counter() - turn_start)
+        if args.think_ms:
+            time.sleep(rng.uniform(0, args.think_ms) / 1000)
+
+def report(timer, wall_seconds, turns):
+    """Print the per-phase latency table"""
+    print(f"{'phase':<18}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    results = {}
+    for phase, values in timer.samples.items():
+        row = {
+            'count': len(values),
+            'p50': percentile(values, 50) * 1000,
+            'p95': percentile(values, 95) * 1000,
+            'p99': percentile(values, 99) * 1000,
+            'max': max(values) * 1000,
+            'mean': statistics.fmean(values) * 1000
+        }
+        results[phase] = row
+        print(f"{phase:<18}{row['count']:>7}{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}{row['max']:>10.1f}")
+    print(f"\n{turns} turns in {wall_seconds:.1f}s ({turns / wall_seconds:.2f} turns/s), {timer.errors} error replies")
+    print("Turns: " + ", ".join(f"{event} {count}" for event, count in sorted(timer.events.items())))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Board chat end-to-end load test")
+    parser.add_argument("--sessions", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=3, help="turns per session")
+    parser.add_argument("--think-ms", type=float, default=0, help="max random pause between turns")
+    parser.add_argument("--replay", help="JSONL file of recorded first-turn questions")
+    parser.add_argument("--stream-share", type=float, default=1.0, help="share of single-reply turns that stream")
+    parser.add_argument("--board-share", type=float, default=0.2, help="share of turns asking the full board")
+    parser.add_argument("--rerun-share", type=float, default=0.1,
+                        help="share of turns whose script run is interrupted and resumed from the session store")
+    parser.add_argument("--restore-share", type=float, default=0.1,
+                        help="share of follow-up turns that start in a new browser session")
+    parser.add_argument("--similar", action="store_true", help="serve repeated first questions from the similar-question index")
+    parser.add_argument("--session-store", choices=["memory", "sqlite", "none"], default="memory")
+    parser.add_argument("--log-mode", choices=["writer", "sync"], default="writer")
+    parser.add_argument("--firebase-latency-ms", type=float, default=30)
+    parser.add_argument("--url", help="use an already running OpenRouter stand-in instead of starting one")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--metrics", action="store_true", help="print the app's Prometheus metrics afterwards")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    if args.url:
+        os.environ['OPENROUTER_URL'] = args.url
+    else:
+        server, url = start_server(**mock_options(args))
+        os.environ['OPENROUTER_URL'] = url
+    os.environ.setdefault('LOG_SPOOL_PATH', os.path.join(tempfile.mkdtemp(), 'log_spool.sqlite3'))
+
+    from config import OPENROUTER_HTTP_CONFIG, SESSION_STORE_CONFIG, SIMILAR_QUESTION_CONFIG
+    from log_writer import LogWriter
+    from admission import AdmissionController
+    from job_runner import JobRunner
+    from similar_questions import create_similar_question_index
+    from session_store import create_session_store
+    OPENROUTER_HTTP_CONFIG["pool_size"] = max(OPENROUTER_HTTP_CONFIG["pool_size"], args.sessions)
+
+    questions = load_questions(args.replay) if args.replay else DEFAULT_QUESTIONS
+    database = FakeDatabase(latency_ms=args.firebase_latency_ms, jitter_ms=args.firebase_latency_ms / 2)
+    ref = database.reference()
+    log_writer = LogWriter(ref) if args.log_mode == "writer" else None
+    # The process-wide services main_backup keeps in st.cache_resource
+    services = {
+        'ref': ref,
+        'log_writer': log_writer,
+        'admission': AdmissionController(),
+        'job_runner': JobRunner(),
+        'similar': create_similar_question_index({**SIMILAR_QUESTION_CONFIG, "enabled": args.similar}),
+        'session_store': create_session_store({
+            **SESSION_STORE_CONFIG, "backend": args.session_store,
+            "sqlite_path": os.path.join(tempfile.mkdtemp(), 'sessions.sqlite3')
+        })
+    }
+
+    timer = PhaseTimer()
+    threads = [
+        threading.Thread(target=run_session, args=(i, args, questions, services, timer))
+        for i in range(args.sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - start
+
+    if log_writer:
+        log_writer.close()
+        print(f"Log writer: {log_writer.stats()}")
+    print(f"Firebase round trips: {database.round_trips}\n")
+
+    results = report(timer, wall_seconds, args.sessions * args.turns)
+    if args.metrics:
+        from metrics_utils import render_prometheus
+        print("\n" + render_prometheus())
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'phases': results, 'events': dict(timer.events), 'wall_seconds': wall_seconds, 'errors': timer.errors,
+                       'args': vars(args)}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Local stand-in for the OpenRouter chat-completions endpoint.
+
+Point the app at it with OPENROUTER_URL=http://127.0.0.1:8765/api/v1/chat/completions.
+Supports streaming (SSE) and non-streaming replies, configurable latency
+distributions, token rates and error injection.
+
+    python -m bench.mock_openrouter --port 8765 --ttft-ms 400 --tokens-per-sec 60 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "Steve Jobs: Focus on the one thing that matters and cut everything else. "
+    "Charles Darwin: Observe patiently, the variations tell you what survives. "
+    "Laozi: The river does not push, yet it carves the canyon. "
+    "Bertrand Russell: Ask what evidence would change your mind before you decide. "
+).split()
+
+DEFAULT_OPTIONS = {
+    "latency": "lognormal",     # time to first token distribution: fixed, uniform, lognormal
+    "ttft_ms": 400.0,           # median (lognormal), value (fixed) or upper bound (uniform)
+    "ttft_sigma": 0.5,          # lognormal shape
+    "tokens_per_sec": 60.0,     # generation speed after the first token
+    "reply_tokens": 200,        # tokens per reply
+    "error_rate": 0.0,          # share of requests answered with error_status
+    "error_status": 500,
+    "stall_rate": 0.0,          # share of requests that stall for stall_ms before the first token
+    "stall_ms": 10000.0,
+    "stall_models": []          # models that always stall (to exercise fallback and hedging)
+}
+
+def _sample_ttft(options, model=None):
+    """Time to first token in seconds, drawn from the configured distribution"""
+    base = options["ttft_ms"] / 1000
+    if options["latency"] == "fixed":
+        delay = base
+    elif options["latency"] == "uniform":
+        delay = random.uniform(0, base)
+    else:
+        delay = random.lognormvariate(0, options["ttft_sigma"]) * base
+    if random.random() < options["stall_rate"] or model in options["stall_models"]:
+        delay += options["stall_ms"] / 1000
+    return delay
+
+def _reply_tokens(options):
+    return [random.choice(WORDS) + " " for _ in range(options["reply_tokens"])]
+
+_seen_prefixes = set()   # system prompts already "cached" by the mock provider
+_prefix_lock = threading.Lock()
+
+def _text(content):
+    """Message content as text, whether a string or a list of content parts"""
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content)
+    return content or ""
+
+def _usage(request, completion_tokens):
+    messages = request.get("messages", [])
+    prompt_chars = sum(len(_text(msg.get("content"))) for msg in messages)
+    prompt_tokens = prompt_chars // 4 + 1
+    # Like a provider prefix cache: a system prompt seen before is reported as cached
+    cached_tokens = 0
+    if messages and messages[0].get("role") == "system":
+        prefix = _text(messages[0].get("content"))
+        with _prefix_lock:
+            if prefix in _seen_prefixes:
+                cached_tokens = len(prefix) // 4
+            _seen_prefixes.add(prefix)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens}
+    }
+
+def make_handler(options):
+    """Build a request handler class bound to the given options"""
+
+    class MockOpenRouterHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            try:
+                self._handle_post()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up (timeout, hedged request cancelled); nothing to report
+                pass
+
+        def _handle_post(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            if random.random() < options["error_rate"]:
+                self._send_json(options["error_status"], {
+                    "error": {"code": options["error_status"], "message": "Injected error"}
+                })
+                return
+
+            time.sleep(_sample_ttft(options, request.get("model")))
+            tokens = _reply_tokens(options)
+            if request.get("stream"):
+                self._stream(request, tokens)
+            else:
+                time.sleep(len(tokens) / options["tokens_per_sec"])
+                self._send_json(200, {
+                    "id": "gen-mock",
+                    "model": request.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}}],
+                    "usage": _usage(request, len(tokens))
+                })
+
+        def _send_json(self, status, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _stream(self, request, tokens):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self._write_chunk(": OPENROUTER PROCESSING\n\n")
+            interval = 1 / options["tokens_per_sec"]
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(interval)
+                self._write_event({"model": request.get("model"), "choices": [{"index": 0, "delta": {"content": token}}]})
+            self._write_event({
+                "model": request.get("model"),
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": _usage(request, len(tokens))
+            })
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_event(self, body):
+            self._write_chunk(f"data: {json.dumps(body, ensure_ascii=False)}\n\n")
+
+        def _write_chunk(self, text):
+            data = text.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return MockOpenRouterHandler
+
+def start_server(port=0, **overrides):
+    """Start the mock in a background thread; returns (server, chat-completions URL)"""
+    options = dict(DEFAULT_OPTIONS, **overrides)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(options))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-openrouter", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
+
+def add_mock_arguments(parser):
+    """Add the mock's tuning flags to an argument parser"""
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default=DEFAULT_OPTIONS["latency"])
+    parser.add_argument("--ttft-ms", type=float, default=DEFAULT_OPTIONS["ttft_ms"])
+    parser.add_argument("--ttft-sigma", type=float, default=DEFAULT_OPTIONS["ttft_sigma"])
+    parser.add_argument("--tokens-per-sec", type=float, default=DEFAULT_OPTIONS["tokens_per_sec"])
+    parser.add_argument("--reply-tokens", type=int, default=DEFAULT_OPTIONS["reply_tokens"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_OPTIONS["error_rate"])
+    parser.add_argument("--error-status", type=int, default=DEFAULT_OPTIONS["error_status"])
+    parser.add_argument("--stall-rate", type=float, default=DEFAULT_OPTIONS["stall_rate"])
+    parser.add_argument("--stall-ms", type=float, default=DEFAULT_OPTIONS["stall_ms"])
+    parser.add_argument("--stall-models", nargs="*", default=DEFAULT_OPTIONS["stall_models"])
+
+def mock_options(args):
+    """Extract mock options from parsed arguments"""
+    return {key: getattr(args, key) for key in DEFAULT_OPTIONS}
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenRouter chat-completions stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = start_server(args.port, **mock_options(args))
+    print(f"Mock OpenRouter listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Hit rate, precision and lookup latency of the near-duplicate question index (similar_questions.py).
+
+Replays a stream of first-turn questions through SimilarQuestionIndex the way the app
+does: every question is looked up, and unmatched ones are added as if the board had
+answered. Synthetic traffic draws popular questions with Zipf-like frequencies and
+rewords each occurrence (stopwords, hyphens, punctuation, synonyms, suffixes, typos),
+so precision - matches that found a rewording of the same question - is known.
+Recorded traffic (--replay, same format as bench/load_test.py) reports the match rate.
+
+    python -m bench.similar_questions_benchmark
+    python -m bench.similar_questions_benchmark --questions 20000 --thresholds 0.5 0.7 0.9
+    python -m bench.similar_questions_benchmark --replay requests.jsonl --num-perm 128 --bands 32
+"""
+import argparse
+import random
+import statistics
+import time
+
+from bench.load_test import load_questions
+from config import SIMILAR_QUESTION_CONFIG
+from similar_questions import SimilarQuestionIndex, make_scope
+
+BASE_QUESTIONS = [
+    "How do I choose a cofounder?",
+    "How do I fire a cofounder?",
+    "How do I split equity with my cofounder?",
+    "Should I quit my job to start a company?",
+    "Should I quit my job to travel?",
+    "How do I decide between two job offers?",
+    "How do I ask for a raise?",
+    "What should I focus on in my first 90 days as a manager?",
+    "How do I know if my idea is worth pursuing?",
+    "How do I find product market fit?",
+    "How do I raise a seed round?",
+    "Should I take venture capital money?",
+    "How do I hire my first employee?",
+    "How do I give difficult feedback to my team?",
+    "How do I deal with burnout?",
+    "How do I stay motivated when progress is slow?",
+    "Should I go back to university?",
+    "How do I change careers at forty?",
+    "How do I become a better public speaker?",
+    "How do I negotiate a salary?",
+    "What makes a good leader?",
+    "How do I build good habits?",
+    "How do I handle conflict with my boss?",
+    "Should I move to another country for work?",
+    "How do I price my product?"
+]
+
+SYNONYMS = {
+    "choose": ["pick", "select", "choosing"], "cofounder": ["co-founder", "business partner"],
+    "company": ["startup", "business"], "job": ["position", "work"], "quit": ["leave"],
+    "decide": ["choose"], "offers": ["offer"], "idea": ["concept"], "hire": ["recruit", "hiring"],
+    "raise": ["raising"], "team": ["employees"], "fire": ["let go of"], "money": ["funding"],
+    "motivated": ["motivation"], "habits": ["habit"], "boss": ["manager"], "price": ["pricing"],
+    "salary": ["pay"], "deal": ["cope"], "better": ["good"]
+}
+
+PREFIXES = [("How do I", ["How to", "How should I", "how can I", "What's the best way to"]),
+            ("Should I", ["Is it wise to", "should i", "Do you think I should"])]
+
+def reword(question, rng):
+    """A random rewording of a question that keeps its meaning"""
+    for prefix, alternatives in PREFIXES:
+        if question.startswith(prefix) and rng.random() < 0.5:
+            question = rng.choice(alternatives) + question[len(prefix):]
+    words = question.rstrip('?').split()
+    for i, word in enumerate(words):
+        key = word.lower().strip('?,')
+        if key in SYNONYMS and rng.random() < 0.3:
+            words[i] = rng.choice(SYNONYMS[key])
+    if len(words) > 3 and rng.random() < 0.15:
+        # A typo: two adjacent letters swapped in one longer word
+        i = rng.randrange(len(words))
+        if len(words[i]) > 4:
+            j = rng.randrange(len(words[i]) - 1)
+            words[i] = words[i][:j] + words[i][j + 1] + words[i][j] + words[i][j + 2:]
+    question = ' '.join(words)
+    if rng.random() < 0.3:
+        question = question.lower()
+    return question + rng.choice(['?', '', ' ?', '??'])
+
+def synthetic_traffic(count, rng):
+    """(question, base index) pairs, popular questions first by Zipf-like weights"""
+    weights = [1 / (rank + 1) for rank in range(len(BASE_QUESTIONS))]
+    bases = rng.choices(range(len(BASE_QUESTIONS)), weights=weights, k=count)
+    return [(reword(BASE_QUESTIONS[base], rng), base) for base in bases]
+
+def replay(traffic, threshold, args):
+    """Run the traffic through a fresh index; returns hit rate, precision and timings"""
+    index = SimilarQuestionIndex(args.num_perm, args.bands, args.max_entries, ttl=float('inf'))
+    scope = make_scope("English", ["Steve Jobs", "Laozi"])
+    origin = {}  # stored question -> base index
+    lookup_us, add_us = [], []
+    hits = correct = 0
+    for question, base in traffic:
+        start = time.perf_counter()
+        match = index.lookup(question, scope, threshold)
+        lookup_us.append((time.perf_counter() - start) * 1e6)
+        if match:
+            hits += 1
+            correct += origin.get(match[1]['question']) == base
+            continue
+        start = time.perf_counter()
+        index.add(question, scope, f"answer {base}")
+        add_us.append((time.perf_counter() - start) * 1e6)
+        origin[question] = base
+    stats = index.stats()
+    return {
+        'hit_rate': hits / len(traffic),
+        'precision': correct / hits if hits else None,
+        'lookup_p50': statistics.median(lookup_us),
+        'lookup_p95': statistics.quantiles(lookup_us, n=20)[18],
+        'add_p50': statistics.median(add_us) if add_us else 0.0,
+        'candidates': stats['candidates'] / stats['lookups'],
+        'size': stats['size']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate question index benchmark")
+    parser.add_argument("--replay", help="JSONL file of recorded first-turn questions")
+    parser.add_argument("--questions", type=int, default=5000, help="synthetic traffic size")
+    parser.add_argument("--thresholds", type=float, nargs="+",
+                        default=[0.5, SIMILAR_QUESTION_CONFIG["suggest_threshold"], 0.7, 0.8,
+                                 SIMILAR_QUESTION_CONFIG["serve_threshold"]])
+    parser.add_argument("--num-perm", type=int, default=SIMILAR_QUESTION_CONFIG["num_perm"])
+    parser.add_argument("--bands", type=int, default=SIMILAR_QUESTION_CONFIG["bands"])
+    parser.add_argument("--max-entries", type=int, default=SIMILAR_QUESTION_CONFIG["max_entries"])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.replay:
+        traffic = [(question, None) for question in load_questions(args.replay)]
+    else:
+        traffic = synthetic_traffic(args.questions, rng)
+    if not traffic:
+        raise SystemExit("No questions to replay")
+
+    print(f"{len(traffic)} questions, {args.num_perm} permutations in {args.bands} bands\n")
+    print(f"{'threshold':>10}{'hit rate':>10}{'precision':>11}{'lookup p50 us':>15}{'lookup p95 us':>15}"
+          f"{'add p50 us':>12}{'candidates':>12}{'entries':>9}")
+    for threshold in args.thresholds:
+        row = replay(traffic, threshold, args)
+        precision = f"{row['precision']:.1%}" if row['precision'] is not None and not args.replay else "-"
+        print(f"{threshold:>10.2f}{row['hit_rate']:>10.1%}{precision:>11}{row['lookup_p50']:>15.1f}"
+              f"{row['lookup_p95']:>15.1f}{row['add_p50']:>12.1f}{row['candidates']:>12.1f}{row['size']:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Cold-start cost of the app: import-time breakdown and time to first render.
+
+Imports are measured with `python -X importtime` in a fresh interpreter per module,
+so nothing is already cached in sys.modules; the report groups self time by
+top-level package. --render also starts a fresh `streamlit run` server per script
+and opens one session the way a browser does (see warmup.py), reporting when the
+server first answered, when the first element arrived and when the run finished.
+
+    python -m bench.startup_time
+    python -m bench.startup_time --modules firebase_utils openrouter_utils --top 15
+    python -m bench.startup_time --render main.py main_backup.py --repeat 3
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from warmup import run_script
+
+APP_MODULES = ['config', 'firebase_utils', 'openrouter_utils', 'log_writer', 'search_index', 'session_store',
+               'similar_questions', 'analytics', 'archive_logs', 'job_runner']
+
+def import_times(module):
+    """(total microseconds, [(self us, cumulative us, module name)]) for importing `module` cold"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    # The last line is the requested module itself, with everything it pulled in
+    total = next((cumulative for _, cumulative, name in reversed(rows) if name.strip() == module), 0)
+    return total, rows
+
+def report_imports(modules, top):
+    print(f"{'module':<22}{'import ms':>10}  heaviest packages (self time)")
+    for module in modules:
+        runs = [import_times(module) for _ in range(3)]
+        total, rows = min(runs, key=lambda run: run[0])
+        by_package = defaultdict(int)
+        for self_us, _, name in rows:
+            by_package[name.strip().split('.')[0]] += self_us
+        heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+        print(f"{module:<22}{total / 1000:>10.1f}  " + ', '.join(f"{name} {us / 1000:.0f}" for name, us in heaviest))
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def time_to_render(script, timeout=60):
+    """Seconds from starting a fresh server to: first answer, first element, run finished"""
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', script, '--server.port', str(port), '--server.headless', 'true'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=dict(os.environ, METRICS_PORT='0')
+    )
+    marks = {}
+
+    def on_message(msg):
+        marks.setdefault('connected', time.perf_counter() - start)
+        if msg.WhichOneof('type') == 'delta':
+            marks.setdefault('first_element', time.perf_counter() - start)
+
+    try:
+        finished = asyncio.run(run_script(f'http://127.0.0.1:{port}', timeout, query_string='', on_message=on_message))
+        marks['finished'] = time.perf_counter() - start if finished else None
+        return marks
+    finally:
+        server.terminate()
+        server.wait()
+
+def report_render(scripts, repeat):
+    print(f"\n{'script':<22}{'connected s':>12}{'first element s':>16}{'finished s':>12}")
+    for script in scripts:
+        runs = [time_to_render(script) for _ in range(repeat)]
+        medians = []
+        for key in ('connected', 'first_element', 'finished'):
+            values = [run.get(key) for run in runs if run.get(key) is not None]
+            medians.append(f"{statistics.median(values):.2f}" if values else "-")
+        print(f"{script:<22}{medians[0]:>12}{medians[1]:>16}{medians[2]:>12}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time breakdown and time to first render")
+    parser.add_argument("--modules", nargs="+", default=['streamlit'] + APP_MODULES)
+    parser.add_argument("--top", type=int, default=5, help="packages listed per module")
+    parser.add_argument("--render", nargs="*", help="scripts to time in a fresh streamlit server")
+    parser.add_argument("--repeat", type=int, default=1, help="fresh servers per script (median)")
+    args = parser.parse_args()
+
+    report_imports(args.modules, args.top)
+    if args.render:
+        report_render(args.render, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,19 @@ load_dotenv()
 
 # OpenRouter configuration
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
-OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_URL = os.getenv('OPENROUTER_URL', "https://openrouter.ai/api/v1/chat/completions")
+
+# HTTP client configuration for OpenRouter (shared, keep-alive connection pool)
+OPENROUTER_HTTP_CONFIG = {
+    "connect_timeout": float(os.getenv('OPENROUTER_CONNECT_TIMEOUT', 5)),   # seconds
+    "read_timeout": float(os.getenv('OPENROUTER_READ_TIMEOUT', 60)),        # seconds between bytes
+    "max_retries": int(os.getenv('OPENROUTER_MAX_RETRIES', 3)),
+    "backoff_base": 0.5,        # first retry waits up to this many seconds
+    "backoff_max": 8,           # cap for a single backoff sleep
+    "retry_after_max": 30,      # cap for server-provided Retry-After
+    "retry_statuses": [429, 500, 502, 503, 504],
+    "pool_size": int(os.getenv('OPENROUTER_POOL_SIZE', 20))
+}
 
 # Model configuration
 MODEL_CONFIG = {
@@ -13,6 +25,127 @@ MODEL_CONFIG = {
     "temperature": 1
 }
 
+# Ordered model routes: on an error, or no first token within `timeout` seconds, the next route is tried.
+# The first-token timeout applies to streamed replies; blocking requests fail over on errors only
+# (including OPENROUTER_READ_TIMEOUT without a byte).
+# An optional "provider" dict is passed through as OpenRouter provider routing preferences.
+MODEL_ROUTES = [
+    {"model": MODEL_CONFIG["model"], "timeout": float(os.getenv('PRIMARY_MODEL_TIMEOUT', 20))},
+    {"model": os.getenv('FALLBACK_MODEL', "anthropic/claude-3.5-sonnet"), "timeout": 20},
+    {"model": "openai/gpt-4o-mini", "timeout": 15}
+]
+
+# Hedged streaming: if the current route has no first token after the threshold (about our p95
+# time-to-first-token), start the next route too and keep whichever answers first
+HEDGE_CONFIG = {
+    "enabled": os.getenv('HEDGED_REQUESTS', 'false').lower() == 'true',
+    "first_token_threshold": float(os.getenv('HEDGE_THRESHOLD', 4.0))  # seconds
+}
+
+# Admission control toward OpenRouter: per-user turn rate, global concurrency and token budget,
+# and a bounded wait queue; turns that can't be admitted within max_wait get a "busy" reply
+ADMISSION_CONFIG = {
+    "user_turns_per_minute": float(os.getenv('USER_TURNS_PER_MINUTE', 6)),
+    "user_burst": 3,               # turns a user may send back-to-back
+    "max_tracked_users": 10000,
+    "max_in_flight": int(os.getenv('MAX_IN_FLIGHT', 32)),                 # concurrent upstream turns per process
+    "tokens_per_minute": int(os.getenv('TOKENS_PER_MINUTE', 400000)),     # estimated prompt + reply tokens
+    "max_waiting": 64,             # turns allowed to queue for a slot
+    "max_wait": 10,                # seconds a turn may wait before getting the busy reply
+    "reply_token_estimate": 800
+}
+
+# Turns run as background jobs keyed by (user_id, turn index), so a Streamlit rerun mid-reply
+# doesn't lose the completion; finished jobs are kept until the session picks them up
+JOB_RUNNER_CONFIG = {
+    "max_workers": int(os.getenv('JOB_WORKERS', 96)),   # covers max_in_flight plus the admission queue
+    "finished_ttl": 900,                                # seconds a finished job waits for its session
+    "max_queued": int(os.getenv('JOB_MAX_QUEUED', 64))  # jobs waiting for a worker before the busy reply
+}
+
+BUSY_MESSAGES = {
+    "English": "The board is busy right now. Please wait a few seconds and ask again.",
+    "Russian": "Совет сейчас занят. Подождите несколько секунд и задайте вопрос снова."
+}
+
+# Opt-in exact-match cache of board replies (in-memory LRU, plus SQLite when a path is set)
+RESPONSE_CACHE_CONFIG = {
+    "enabled": os.getenv('RESPONSE_CACHE_ENABLED', 'false').lower() == 'true',
+    "max_entries": int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000)),
+    "ttl": int(os.getenv('RESPONSE_CACHE_TTL', 86400)),   # seconds
+    "disk_path": os.getenv('RESPONSE_CACHE_PATH')         # e.g. .response_cache.sqlite3
+}
+
+# Near-duplicate first-turn questions (similar_questions.py): a question whose estimated word/character
+# similarity to an earlier one in the same language, board and mode reaches serve_threshold gets the
+# earlier answer instantly; from suggest_threshold the earlier answer is offered while the board replies.
+# Set serve_threshold above 1 to only ever suggest.
+SIMILAR_QUESTION_CONFIG = {
+    "enabled": os.getenv('SIMILAR_QUESTIONS_ENABLED', 'false').lower() == 'true',
+    "suggest_threshold": float(os.getenv('SIMILAR_SUGGEST_THRESHOLD', 0.6)),
+    "serve_threshold": float(os.getenv('SIMILAR_SERVE_THRESHOLD', 0.9)),
+    "num_perm": 64,          # MinHash signature length
+    "bands": 16,             # LSH bands of num_perm / bands rows each
+    "max_entries": int(os.getenv('SIMILAR_QUESTIONS_MAX_ENTRIES', 5000)),
+    "ttl": int(os.getenv('SIMILAR_QUESTIONS_TTL', 86400))   # seconds
+}
+
+# Provider prompt caching: the system prompt is the first message and byte-identical across
+# turns for a given language and board, so providers can reuse it. Models matching one of the
+# prefixes below (explicit caching) get a cache_control breakpoint on it; OpenAI-style models
+# cache long prefixes automatically.
+PROMPT_CACHE_CONFIG = {
+    "enabled": os.getenv('PROMPT_CACHE_HINTS', 'true').lower() == 'true',
+    "cache_control_models": ["anthropic/", "google/gemini"]
+}
+
+# Conversation context budget: recent turns are sent verbatim, older ones are folded into a summary
+CONTEXT_CONFIG = {
+    "token_budget": int(os.getenv('CONTEXT_TOKEN_BUDGET', 6000)),  # tokens of recent history sent verbatim
+    "keep_ratio": 0.75,            # when folding, shrink the window to this share of the budget
+    "message_overhead": 4,         # per-message token overhead of the chat format
+    "summary_model": os.getenv('CONTEXT_SUMMARY_MODEL', "openai/gpt-4o-mini"),
+    "summary_max_tokens": 600,
+    # Seconds the turn waits for the summary before sending the recent window without it
+    "summary_timeout": float(os.getenv('CONTEXT_SUMMARY_TIMEOUT', 8))
+}
+
+SUMMARY_PROMPTS = {
+    "English": """You maintain the running minutes of a personal board of directors meeting. Update the existing summary with the new exchanges below. Keep the user's situation, questions, decisions and each advisor's key advice and disagreements, attributed by name. Be concise, no more than {max_tokens} tokens. Reply with the updated summary only.""",
+
+    "Russian": """Вы ведёте протокол заседания личного совета директоров. Дополните существующее резюме новыми репликами ниже. Сохраните ситуацию пользователя, его вопросы, решения, а также ключевые советы и разногласия каждого советника с указанием имени. Будьте кратки, не более {max_tokens} токенов. Ответьте только обновлённым резюме."""
+}
+
+SUMMARY_HEADERS = {
+    "English": "Summary of the earlier part of this meeting:",
+    "Russian": "Краткое содержание предыдущей части заседания:"
+}
+
+# Metrics export: Prometheus /metrics on this port (0 = off) and/or a JSON log line every N seconds (0 = off)
+METRICS_CONFIG = {
+    "port": int(os.getenv('METRICS_PORT', 0)),
+    "json_log_interval": int(os.getenv('METRICS_LOG_INTERVAL', 0))
+}
+
+# Warm-up: on a replica's first script run, OpenRouter connections are opened on a background
+# thread, so the first turn skips DNS and TLS setup. `python warmup.py` runs that first script run
+# (and the config load) itself and waits for it; the metrics port's /ready answers 200 afterwards.
+WARMUP_CONFIG = {
+    "enabled": os.getenv('WARMUP_ENABLED', 'true').lower() == 'true',
+    "connections": int(os.getenv('WARMUP_CONNECTIONS', 2)),   # pooled connections to open
+    "timeout": 30                                              # seconds to wait for them
+}
+
+# Stream responses token-by-token into the chat instead of waiting for the full reply
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', 'true').lower() == 'true'
+
+# Chat history rendering: only the most recent turns are drawn on each rerun; older messages
+# are drawn on request, a page at a time, under "Earlier in this meeting"
+CHAT_RENDER_CONFIG = {
+    "recent_turns": int(os.getenv('CHAT_RECENT_TURNS', 6)),   # user + assistant pairs
+    "earlier_page_size": 20                                    # messages per "show earlier" click
+}
+
 # System prompts for different languages
 SYSTEM_PROMPTS = {
     "English": """My personal board of directors includes: {members}
@@ -23,8 +156,98 @@ I will ask the question and you will give the most unique, relevant and ground-b
 Я задам вопрос, а вы дадите самый уникальный, актуальный и прорывной совет. Действуйте как на заседании совета директоров. Не уходите в длинные рассуждения. Выберите одного из членов совета и говорите от его лица. Обязательно указывайте, кто говорит. Задавайте мне дополнительные вопросы, которые помогут найти новое решение, и предлагайте советы от разных членов совета, только по одному за раз. Если другой член совета имеет серьезные разногласия с высказанным утверждением или вопросом, включите и его позицию."""
 }
 
+# Prompts for "full board" mode, where each advisor is asked separately and concurrently
+ADVISOR_PROMPTS = {
+    "English": """You are {member}, sitting on my personal board of directors together with {members}.
+
+I will ask the question and you will give your most unique, relevant and ground-breaking advice, speaking strictly as {member}, in your own voice and from your own experience. Don't go on long rants: a few short paragraphs at most. Do not write lines for the other members and do not prefix your answer with your name. You may end with one question to me that catalyses insight.""",
+
+    "Russian": """Вы — {member}, член моего личного совета директоров вместе с: {members}.
+
+Я задам вопрос, а вы дадите самый уникальный, актуальный и прорывной совет, говоря строго от лица {member}, своим голосом и исходя из своего опыта. Не уходите в длинные рассуждения: максимум несколько коротких абзацев. Не пишите реплики за других членов совета и не начинайте ответ со своего имени. В конце можете задать мне один вопрос, который поможет найти новое решение."""
+}
+
+FULL_BOARD_CONFIG = {
+    "max_concurrency": int(os.getenv('FULL_BOARD_MAX_CONCURRENCY', 6)),  # advisor requests in flight per turn
+    "advisor_timeout": float(os.getenv('FULL_BOARD_ADVISOR_TIMEOUT', 45)),  # seconds from an advisor's request starting
+    "turn_timeout": float(os.getenv('FULL_BOARD_TURN_TIMEOUT', 90)),  # seconds before the turn stops waiting for anyone
+    "max_tokens": 500
+}
+
 # Firebase configuration
 FIREBASE_DATABASE_URL = "https://board-chat-default-rtdb.europe-west1.firebasedatabase.app"
+# Seconds a cached /config snapshot is served before re-reading (fallback when the change listener is down)
+FIREBASE_CONFIG_CACHE_TTL = int(os.getenv('FIREBASE_CONFIG_CACHE_TTL', 60))
+# Background conversation logging (write-behind queue with a local SQLite spool for outages)
+LOG_WRITER_CONFIG = {
+    "enabled": os.getenv('LOG_WRITER_ENABLED', 'true').lower() == 'true',
+    "batch_size": 50,            # max queued log updates merged into one Firebase update
+    "poll_interval": 0.5,        # seconds the idle writer waits before checking the spool
+    "max_queue": 10000,          # beyond this, updates go straight to the spool
+    "spool_path": os.getenv('LOG_SPOOL_PATH', '.log_spool.sqlite3'),
+    "replay_interval": 15        # seconds between attempts to replay the spool after a failure
+}
+
+# Local full-text index of logged conversations for the admin panel's Chat Logs search
+SEARCH_INDEX_CONFIG = {
+    "enabled": os.getenv('SEARCH_INDEX_ENABLED', 'true').lower() == 'true',
+    "path": os.getenv('SEARCH_INDEX_PATH', '.search_index.sqlite3')
+}
+
+# Retention: archive_logs.py moves chats not updated for retention_days from Firebase into a
+# local, date-partitioned archive (a shared volume when several hosts run the admin panel)
+ARCHIVE_CONFIG = {
+    "retention_days": int(os.getenv('ARCHIVE_RETENTION_DAYS', 90)),
+    "path": os.getenv('ARCHIVE_PATH', 'archive'),
+    "page_size": 200
+}
+
+# Where chat sessions live between reruns, restarts and replicas: 'memory' (this process only),
+# 'sqlite' (one host) or 'redis' (any replica); 'none' keeps them in Streamlit session state only.
+# Sessions are keyed by the `session` token in the URL.
+SESSION_STORE_CONFIG = {
+    "backend": os.getenv('SESSION_STORE', 'memory'),
+    "sqlite_path": os.getenv('SESSION_STORE_PATH', '.sessions.sqlite3'),
+    "redis_url": os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0'),
+    "ttl": int(os.getenv('SESSION_TTL', 604800)),   # seconds since the last change
+    "max_memory_sessions": 10000
+}
+
+# Storage encoding of logged messages (see firebase_utils.encode_message): role codes, and
+# content above the threshold compressed and base64-framed when that is smaller. An optional
+# preset dictionary (bench/codec_benchmark.py --train-dict) improves short replies; keep old
+# dictionaries in the same directory so messages written with them still decode.
+MESSAGE_CODEC_CONFIG = {
+    "enabled": os.getenv('MESSAGE_CODEC_ENABLED', 'true').lower() == 'true',
+    "compression": os.getenv('MESSAGE_CODEC_COMPRESSION', 'zlib'),   # zlib, or zstd (needs zstandard)
+    "threshold": int(os.getenv('MESSAGE_CODEC_THRESHOLD', 400)),      # bytes of content
+    "level": 9,
+    "dictionary_path": os.getenv('MESSAGE_CODEC_DICTIONARY')          # e.g. codec/messages.dict
+}
+
+# Token usage accounting: every turn adds its tokens, cost and latency to running totals under
+# usage/ in Firebase (per day, member, model, language and session) with atomic increments,
+# so the admin Usage tab reads only those totals. A session token budget of 0 means no limit.
+USAGE_CONFIG = {
+    "enabled": os.getenv('USAGE_ACCOUNTING_ENABLED', 'true').lower() == 'true',
+    "session_token_budget": int(os.getenv('SESSION_TOKEN_BUDGET', 0)),   # prompt + completion tokens
+    "summary_days": 30
+}
+
+# Admin analytics: rollups under analytics/ in Firebase, fed by the logging path (see analytics.py)
+ANALYTICS_CONFIG = {
+    "enabled": os.getenv('ANALYTICS_ENABLED', 'true').lower() == 'true',
+    "summary_days": 30,
+    "page_size": 200        # chats per page when backfilling
+}
+
+# USD per million prompt / completion tokens, used when OpenRouter doesn't report the cost
+MODEL_PRICES = {
+    "openai/gpt-4o-2024-11-20": {"prompt": 2.50, "completion": 10.00},
+    "anthropic/claude-3.5-sonnet": {"prompt": 3.00, "completion": 15.00},
+    "openai/gpt-4o-mini": {"prompt": 0.15, "completion": 0.60}
+}
+
 FIREBASE_CREDENTIALS = {
     "type": "service_account",
     "project_id": os.getenv('FIREBASE_PROJECT_ID'),
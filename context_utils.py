@@ -0,0 +1,96 @@
+from config import CONTEXT_CONFIG, SUMMARY_PROMPTS, SUMMARY_HEADERS
+from openrouter_utils import summarize_conversation
+
+def new_context_state():
+    """Create the per-session context state stored alongside the messages"""
+    return {
+        'summary': '',          # rolling summary of folded turns
+        'summarized_count': 0   # number of leading messages already folded into the summary
+    }
+
+def count_tokens(message):
+    """Estimate the token count of a chat message, caching it on the message"""
+    if 'tokens' not in message:
+        # ~4 bytes per token holds for English and errs on the high side for Cyrillic
+        content_bytes = len(message['content'].encode('utf-8'))
+        message['tokens'] = content_bytes // 4 + 1 + CONTEXT_CONFIG["message_overhead"]
+    return message['tokens']
+
+def _window_start(messages, floor, budget):
+    """Index of the oldest message that fits the budget, counting back from the newest"""
+    start = len(messages)
+    used = 0
+    while start > floor:
+        tokens = count_tokens(messages[start - 1])
+        # Always keep the newest message, even if it alone exceeds the budget
+        if used + tokens > budget and start < len(messages):
+            break
+        used += tokens
+        start -= 1
+
+    # Start the window on a user turn so the model doesn't see a dangling reply
+    while start < len(messages) - 1 and messages[start]['role'] != 'user':
+        start += 1
+    return start
+
+def plan_context(messages, state, language):
+    """Decide what to send upstream for the next turn without calling the API.
+
+    Returns the recent window within the token budget and, when older turns no longer
+    fit, the messages to fold into the rolling summary. The plan holds copies, so
+    fold_context() can run on a worker thread while the session moves on.
+    """
+    budget = CONTEXT_CONFIG["token_budget"]
+    floor = state['summarized_count']
+
+    start = _window_start(messages, floor, budget)
+    fold = []
+    if start > floor:
+        # Over budget: shrink below the budget so we don't re-summarize on every turn
+        start = _window_start(messages, floor, int(budget * CONTEXT_CONFIG["keep_ratio"]))
+        fold = messages[floor:start]
+
+    tokens = sum(count_tokens(msg) for msg in messages[start:])
+    if state['summary']:
+        tokens += count_tokens({'content': state['summary']})
+    # The summary request: the old summary and the folded turns in, the new summary out
+    summary_tokens = sum(count_tokens(msg) for msg in fold) + 2 * CONTEXT_CONFIG["summary_max_tokens"] if fold else 0
+    return {
+        'language': language,
+        'summary': state['summary'],
+        'summarized_count': floor,
+        'fold': [{"role": msg['role'], "content": msg['content']} for msg in fold],
+        'fold_to': start,
+        'window': [{"role": msg['role'], "content": msg['content']} for msg in messages[start:]],
+        'tokens': tokens,                  # estimated prompt tokens of the context
+        'summary_tokens': summary_tokens   # estimated tokens of the summary request, if any
+    }
+
+def fold_context(plan, usage=None):
+    """Summarize the plan's folded turns if there are any; returns (context messages, new context state).
+
+    If a `usage` dict is given, the summary request's token usage is added to it.
+    """
+    language = plan['language']
+    state = {'summary': plan['summary'], 'summarized_count': plan['summarized_count']}
+    if plan['fold']:
+        summary = summarize_conversation(
+            plan['summary'],
+            plan['fold'],
+            language,
+            SUMMARY_PROMPTS,
+            CONTEXT_CONFIG["summary_model"],
+            CONTEXT_CONFIG["summary_max_tokens"],
+            CONTEXT_CONFIG["summary_timeout"],
+            usage=usage
+        )
+        if summary:
+            state = {'summary': summary, 'summarized_count': plan['fold_to']}
+        else:
+            print("Context summary failed, sending recent window without the dropped turns")
+
+    context = []
+    if state['summary']:
+        context.append({"role": "system", "content": f"{SUMMARY_HEADERS[language]}\n{state['summary']}"})
+    context.extend(plan['window'])
+    return context, state
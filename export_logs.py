@@ -0,0 +1,229 @@
+"""Export conversation logs from Firebase to compressed JSONL or Parquet.
+
+Chats are read in bounded, key-ordered pages and streamed to the output one batch
+at a time, so memory use does not grow with the size of the database. A checkpoint
+next to the output (<output>.checkpoint.json) is updated after every batch (after
+every part file for Parquet); rerun with --resume to continue an interrupted export.
+
+    python export_logs.py chats.jsonl.gz
+    python export_logs.py chats.jsonl.zst --page-size 500
+    python export_logs.py chats.parquet
+    python export_logs.py recent.jsonl.gz --since 2024-06-01T00:00:00   # incremental
+    python export_logs.py chats.jsonl.gz --resume
+
+The output format follows the file extension: .jsonl, .jsonl.gz, .jsonl.zst or .parquet.
+Each record is one chat: user_id, timestamp, language, board_members, message_count
+and messages. The checkpoint's `high_water` timestamp is the --since value for the
+next incremental export.
+"""
+import argparse
+import gzip
+import json
+import os
+from itertools import islice
+from firebase_utils import initialize_firebase, iter_chats, iter_chats_since, _format_chat_log
+
+def export_record(user_id, chat_data):
+    """One exported chat, JSON-serializable"""
+    record = _format_chat_log(user_id, chat_data)
+    record['timestamp'] = record['timestamp'].isoformat()
+    return record
+
+class JsonlSink:
+    """Newline-delimited JSON, plain or compressed.
+
+    Every batch is written as its own complete gzip member or zstd frame (readers
+    decode concatenated members as one stream), so the file is valid after each
+    batch and a resumed export can truncate back to the last checkpoint and append.
+    """
+
+    def __init__(self, path, offset=None):
+        self.path = path
+        self.compression = 'gzip' if path.endswith('.gz') else 'zstd' if path.endswith('.zst') else None
+        if self.compression == 'zstd':
+            # Optional dependency, only needed for .zst output
+            import zstandard
+            self._zstd = zstandard.ZstdCompressor(level=10)
+        self._file = open(path, 'r+b' if offset is not None else 'wb')
+        self._offset = offset or 0
+        if offset is not None:
+            # Drop anything written after the last checkpoint
+            self._file.truncate(offset)
+            self._file.seek(offset)
+
+    def write_batch(self, records):
+        data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode('utf-8')
+        if self.compression == 'gzip':
+            data = gzip.compress(data)
+        elif self.compression == 'zstd':
+            data = self._zstd.compress(data)
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._offset = self._file.tell()
+
+    def position(self):
+        """Byte offset just after the last complete batch"""
+        return {'offset': self._offset}
+
+    def close(self):
+        self._file.close()
+
+class ParquetSink:
+    """Parquet with one row group per batch; messages are kept as a JSON string column.
+
+    A Parquet file is only readable once closed, so output is split into part files
+    of about `rows_per_file` chats (chats.parquet, chats.1.parquet, ...) and the
+    export is checkpointed whenever a part is closed.
+    """
+
+    def __init__(self, path, part=None, rows_per_file=100000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._pq = pq
+        self.base_path = path
+        self.part = part or 0
+        self.rows_per_file = rows_per_file
+        self.schema = pa.schema([
+            ('user_id', pa.string()),
+            ('timestamp', pa.string()),
+            ('language', pa.string()),
+            ('board_members', pa.list_(pa.string())),
+            ('message_count', pa.int64()),
+            ('messages', pa.string())
+        ])
+        self._writer = None
+        self._rows = 0
+
+    def write_batch(self, records):
+        if self._writer is None:
+            stem, ext = os.path.splitext(self.base_path)
+            path = f'{stem}.{self.part}{ext}' if self.part else self.base_path
+            self._writer = self._pq.ParquetWriter(path, self.schema, compression='zstd')
+        rows = [dict(record, messages=json.dumps(record['messages'], ensure_ascii=False)) for record in records]
+        self._writer.write_table(self._pa.Table.from_pylist(rows, schema=self.schema))
+        self._rows += len(rows)
+        if self._rows >= self.rows_per_file:
+            self._close_part()
+
+    def position(self):
+        """The next part to write, or None while the current part is still open"""
+        return None if self._writer else {'part': self.part}
+
+    def close(self):
+        if self._writer:
+            self._close_part()
+
+    def _close_part(self):
+        self._writer.close()
+        self._writer = None
+        self._rows = 0
+        self.part += 1
+
+def open_sink(path, position=None):
+    """Open the sink for the output's file extension, resuming at a checkpointed position"""
+    position = position or {}
+    if path.endswith('.parquet'):
+        return ParquetSink(path, position.get('part'))
+    return JsonlSink(path, position.get('offset'))
+
+def output_intact(path, position):
+    """Whether everything written before the checkpointed `position` is still on disk"""
+    if not position:
+        return True
+    if 'part' in position:
+        stem, ext = os.path.splitext(path)
+        return all(os.path.exists(f'{stem}.{part}{ext}' if part else path) for part in range(position['part']))
+    try:
+        return os.path.getsize(path) >= position['offset']
+    except OSError:
+        return False
+
+def load_checkpoint(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint atomically so a crash never leaves a torn file"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+def iter_export(ref, page_size, since=None, cursor=None):
+    """Yield (record, cursor) for each chat to export"""
+    if since:
+        for user_id, chat_data, chat_cursor in iter_chats_since(ref, since, page_size, cursor):
+            yield export_record(user_id, chat_data), chat_cursor
+    else:
+        for user_id, chat_data in iter_chats(ref, page_size, cursor):
+            if isinstance(chat_data, dict):
+                yield export_record(user_id, chat_data), user_id
+
+def export_logs(ref, output, page_size=200, since=None, resume=False):
+    """Stream chats into `output`; returns the final checkpoint"""
+    checkpoint_path = output + '.checkpoint.json'
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint and not output_intact(output, checkpoint['position']):
+        print(f"{output} is missing or shorter than its checkpoint, restarting the export")
+        since, checkpoint = checkpoint['since'], None
+    if checkpoint and checkpoint.get('done'):
+        print(f"Export to {output} already finished ({checkpoint['exported']} chats)")
+        return checkpoint
+    if checkpoint:
+        since = checkpoint['since']
+        print(f"Resuming after {checkpoint['cursor']} ({checkpoint['exported']} chats exported)")
+    else:
+        checkpoint = {'since': since, 'cursor': None, 'position': None, 'exported': 0, 'high_water': None,
+                      'done': False}
+
+    sink = open_sink(output, checkpoint['position'])
+    cursor, pending, high_water = checkpoint['cursor'], 0, checkpoint['high_water']
+
+    def commit(position):
+        checkpoint.update(cursor=cursor, position=position, exported=checkpoint['exported'] + pending,
+                          high_water=high_water)
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    try:
+        records = iter_export(ref, page_size, since, checkpoint['cursor'])
+        while True:
+            batch = list(islice(records, page_size))
+            if not batch:
+                break
+            sink.write_batch([record for record, _ in batch])
+            cursor = batch[-1][1]
+            pending += len(batch)
+            high_water = max(filter(None, [high_water, *(record['timestamp'] for record, _ in batch)]))
+            position = sink.position()
+            if position is not None:
+                commit(position)
+                pending = 0
+                print(f"Exported {checkpoint['exported']} chats")
+    finally:
+        sink.close()
+
+    checkpoint['done'] = True
+    commit(sink.position())
+    return checkpoint
+
+def main():
+    parser = argparse.ArgumentParser(description="Export conversation logs to compressed JSONL or Parquet")
+    parser.add_argument("output", help="output file: .jsonl, .jsonl.gz, .jsonl.zst or .parquet")
+    parser.add_argument("--page-size", type=int, default=200, help="chats per Firebase query and output batch")
+    parser.add_argument("--since", help="only chats updated at or after this ISO timestamp")
+    parser.add_argument("--resume", action="store_true", help="continue from the output's checkpoint")
+    args = parser.parse_args()
+
+    ref = initialize_firebase()
+    if not ref:
+        raise SystemExit("Firebase is not configured")
+    checkpoint = export_logs(ref, args.output, args.page_size, args.since, args.resume)
+    print(f"Done: {checkpoint['exported']} chats, high water {checkpoint['high_water']}")
+
+if __name__ == "__main__":
+    main()
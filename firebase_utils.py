@@ -1,59 +1,344 @@
-import firebase_admin
-from firebase_admin import credentials, db
 from datetime import datetime
+from collections import Counter
+import base64
+import copy
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+import time
 import uuid
-from config import FIREBASE_CREDENTIALS, FIREBASE_DATABASE_URL, DEFAULT_BOARD_MEMBERS, SYSTEM_PROMPTS, TRANSLATIONS
+import zlib
+from config import (
+    FIREBASE_CREDENTIALS, FIREBASE_DATABASE_URL, FIREBASE_CONFIG_CACHE_TTL,
+    DEFAULT_BOARD_MEMBERS, SYSTEM_PROMPTS, TRANSLATIONS, MESSAGE_CODEC_CONFIG, MODEL_PRICES
+)
+
+# Process-wide cache of the /config node, shared by all sessions
+_config_cache = {
+    'value': None,
+    'loaded_at': 0.0,
+    'listener': None,
+    'listener_failed_at': None
+}
+_config_lock = threading.Lock()
 
 def initialize_firebase():
-    """Initialize Firebase Realtime Database connection"""
+    """Initialize Firebase Realtime Database connection (the app is created once per process)"""
     try:
-        # Check if default app exists
-        if firebase_admin._apps:
-            # Get the default app instance
-            default_app = firebase_admin.get_app()
-            # Delete it
-            firebase_admin.delete_app(default_app)
-            
-        # Initialize new app
-        cred = credentials.Certificate(FIREBASE_CREDENTIALS)
-        firebase_admin.initialize_app(cred, {
-            'databaseURL': FIREBASE_DATABASE_URL
-        })
+        # Imported on first use: firebase_admin and its Google auth stack are the slowest
+        # part of a cold import, and most modules importing this one never connect
+        import firebase_admin
+        from firebase_admin import credentials, db
+        # Reuse the default app if this process already created it
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(FIREBASE_CREDENTIALS)
+            firebase_admin.initialize_app(cred, {
+                'databaseURL': FIREBASE_DATABASE_URL
+            })
         return db.reference()
     except Exception as e:
         print(f"Firebase initialization error: {str(e)}")
         return None
 
-def log_conversation(ref, user_id, messages, board_members, language):
-    """Log a conversation entry to Firebase Realtime Database"""
+# Storage codec for logged messages. Version 1 stores
+#   {'v': 1, 'r': <role code>, 'c': <content>}                       short content, as is
+#   {'v': 1, 'r': <role code>, 'z': <base64>, 'e': 'zlib'|'zstd', 'd': <dictionary id>}
+# plus the plain model/ttft_ms/latency_ms fields. Messages without 'v' are the original
+# {'role', 'content'} layout and are read unchanged.
+MESSAGE_CODEC_VERSION = 1
+_ROLE_CODES = {'user': 0, 'assistant': 1, 'system': 2}
+_ROLE_NAMES = {code: role for role, code in _ROLE_CODES.items()}
+_codec_dictionaries = None  # (dictionaries by id, id used for encoding), loaded on first use
+
+def _dictionary_id(data):
+    return hashlib.blake2b(data, digest_size=4).hexdigest()
+
+def _load_dictionaries():
+    """Preset dictionaries from the configured file's directory, keyed by their id"""
+    global _codec_dictionaries
+    if _codec_dictionaries is None:
+        dictionaries, current = {}, None
+        path = MESSAGE_CODEC_CONFIG["dictionary_path"]
+        if path:
+            for dict_path in set(glob.glob(os.path.join(os.path.dirname(path) or '.', '*.dict')) + [path]):
+                try:
+                    with open(dict_path, 'rb') as f:
+                        data = f.read()
+                except OSError as e:
+                    print(f"Error loading message dictionary {dict_path}: {str(e)}")
+                    continue
+                dictionaries[_dictionary_id(data)] = data
+                if dict_path == path:
+                    current = _dictionary_id(data)
+        _codec_dictionaries = (dictionaries, current)
+    return _codec_dictionaries
+
+def _compress(data, method, dictionary, level):
+    if method == 'zstd':
+        import zstandard
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdCompressor(level=level, dict_data=dict_data).compress(data)
+    # Raw deflate: no zlib header or checksum, the JSON framing already delimits the data
+    compressor = (zlib.compressobj(level, zlib.DEFLATED, -15, zdict=dictionary) if dictionary
+                  else zlib.compressobj(level, zlib.DEFLATED, -15))
+    return compressor.compress(data) + compressor.flush()
+
+def _decompress(data, method, dictionary):
+    if method == 'zstd':
+        import zstandard
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+    decompressor = zlib.decompressobj(-15, zdict=dictionary) if dictionary else zlib.decompressobj(-15)
+    return decompressor.decompress(data) + decompressor.flush()
+
+def encode_message(msg, config=MESSAGE_CODEC_CONFIG):
+    """Storage form of a chat message: role code, and compressed content when that is smaller"""
+    stored = {'v': MESSAGE_CODEC_VERSION, 'r': _ROLE_CODES.get(msg['role'], msg['role'])}
+    raw = msg['content'].encode('utf-8')
+    encoded = None
+    if len(raw) >= config["threshold"]:
+        dictionaries, dictionary_id = _load_dictionaries()
+        dictionary = dictionaries.get(dictionary_id)
+        packed = base64.b64encode(_compress(raw, config["compression"], dictionary, config["level"])).decode('ascii')
+        # JSON escapes make non-ASCII content longer than its UTF-8 bytes; compare what is sent
+        if len(packed) < len(json.dumps(msg['content'])):
+            encoded = {'z': packed, 'e': config["compression"]}
+            if dictionary:
+                encoded['d'] = dictionary_id
+    stored.update(encoded or {'c': msg['content']})
+    for key in ('model', 'ttft_ms', 'latency_ms'):
+        if msg.get(key) is not None:
+            stored[key] = msg[key]
+    return stored
+
+def decode_message(stored):
+    """Chat message ({'role', 'content', ...}) from any stored version"""
+    if 'v' not in stored:
+        return stored
+    msg = {'role': _ROLE_NAMES.get(stored.get('r'), stored.get('r'))}
+    if 'z' in stored:
+        try:
+            dictionary = None
+            if stored.get('d'):
+                dictionary = _load_dictionaries()[0][stored['d']]
+            data = _decompress(base64.b64decode(stored['z']), stored.get('e', 'zlib'), dictionary)
+            msg['content'] = data.decode('utf-8')
+        except Exception as e:
+            print(f"Error decoding stored message: {str(e)}")
+            msg['content'] = '[message could not be decoded]'
+    else:
+        msg['content'] = stored.get('c', '')
+    for key in ('model', 'ttft_ms', 'latency_ms'):
+        if key in stored:
+            msg[key] = stored[key]
+    return msg
+
+def train_message_dictionary(contents, size=32768, compression='zlib'):
+    """Build a preset dictionary from sample message contents.
+
+    With zstd this is zstandard's trainer. For zlib it is the most valuable repeated
+    sentences and word n-grams (count x length), the most valuable last since deflate
+    reaches the end of its 32 KB window most cheaply.
+    """
+    if compression == 'zstd':
+        import zstandard
+        samples = [content.encode('utf-8') for content in contents]
+        return zstandard.train_dictionary(size, samples).as_bytes()
+    counts = Counter()
+    for content in contents:
+        counts.update(sentence.strip() for sentence in re.split(r'(?<=[.!?:\n])\s+', content)
+                      if len(sentence.strip()) > 8)
+        words = content.split()
+        for n in (1, 2, 3):
+            counts.update(' '.join(words[i:i + n]) for i in range(len(words) - n + 1))
+    ranked = sorted(
+        ((count * len(phrase), phrase) for phrase, count in counts.items() if count > 1 and len(phrase) > 3),
+        reverse=True
+    )
+    chosen, total = [], 0
+    for _, phrase in ranked:
+        data = (phrase + ' ').encode('utf-8')
+        if total + len(data) > size:
+            continue
+        chosen.append(data)
+        total += len(data)
+    return b''.join(reversed(chosen))
+
+def _stored_message(msg):
+    """The fields of a chat message that are logged (replies also carry the model and latency)"""
+    if MESSAGE_CODEC_CONFIG["enabled"]:
+        return encode_message(msg)
+    stored = {'role': msg['role'], 'content': msg['content']}
+    for key in ('model', 'ttft_ms', 'latency_ms'):
+        if msg.get(key) is not None:
+            stored[key] = msg[key]
+    return stored
+
+def build_log_update(user_id, messages, board_members, language, start=0):
+    """Build the root-relative multi-path update that appends messages[start:] to a chat.
+
+    Messages are stored as children keyed by their index under chats/<user_id>/messages,
+    the same layout Firebase uses for the lists written by older versions, so each turn
+    only uploads the new messages plus the chat metadata. The metadata is mirrored to
+    chat_index/<user_id> so the admin panel can list chats without their transcripts.
+    """
+    chat_path = f'chats/{user_id}'
+    update = {
+        f'{chat_path}/messages/{i}': _stored_message(msg)
+        for i, msg in enumerate(messages[start:], start)
+    }
+    metadata = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'board_members': board_members,
+        'language': language,
+        'message_count': len(messages)
+    }
+    for key, value in metadata.items():
+        update[f'{chat_path}/{key}'] = value
+        update[f'chat_index/{user_id}/{key}'] = value
+    return update
+
+def log_conversation(ref, user_id, messages, board_members, language, start=0):
+    """Append messages[start:] to the user's chat in Firebase; returns the number of messages now logged"""
     if not ref:
-        return
+        return start
     
     try:
-        # Store entire chat history under user's ID
-        chat_ref = ref.child('chats').child(user_id)
-        
-        chat_data = {
-            'timestamp': datetime.utcnow().isoformat(),
-            'messages': [{'role': msg['role'], 'content': msg['content']} for msg in messages],
-            'board_members': board_members,
-            'language': language
-        }
-        
-        # Update the user's chat entry (overwrite with latest)
-        chat_ref.set(chat_data)
+        # Multi-path update: new messages plus metadata, without rewriting the history
+        ref.update(build_log_update(user_id, messages, board_members, language, start))
+        return len(messages)
         
     except Exception as e:
         print(f"Error logging conversation: {str(e)}")
+        return start
+
+def increment_value(amount):
+    """Server value that atomically adds `amount` to the stored number (missing counts as 0)"""
+    return {'.sv': {'increment': amount}}
+
+def is_increment(value):
+    return isinstance(value, dict) and 'increment' in value.get('.sv', {})
+
+def safe_key(name):
+    """Firebase-safe key for a model, member or language name"""
+    return re.sub(r'[.$#\[\]/]', '_', str(name)) or '_'
+
+def estimate_cost(usage, model):
+    """Cost in USD: OpenRouter's reported cost, or an estimate from MODEL_PRICES (0 if unpriced)"""
+    if usage.get('cost') is not None:
+        return usage['cost']
+    prices = MODEL_PRICES.get(model)
+    if not prices:
+        return 0
+    return (usage.get('prompt_tokens', 0) * prices['prompt']
+            + usage.get('completion_tokens', 0) * prices['completion']) / 1e6
+
+def build_usage_update(user_id, usage, model, latency_ms, board_members, language, anonymous=False):
+    """Root-relative update adding one turn's usage to the running totals under usage/.
 
-def get_conversation_logs(ref):
-    """Retrieve all conversation logs for admin viewing"""
+    Totals are kept per day, board member, model and language, plus per session unless
+    the chat is anonymous. Every counter is a server-side increment, so concurrent turns
+    from any number of processes add up without read-modify-write transactions. Members
+    are credited with the tokens of every turn they sat on.
+    """
+    counters = {
+        'turns': 1,
+        'prompt_tokens': usage.get('prompt_tokens', 0),
+        'completion_tokens': usage.get('completion_tokens', 0),
+        'cached_tokens': (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0),
+        'cost': round(estimate_cost(usage, model), 6),
+        'latency_ms': latency_ms or 0
+    }
+    counters['total_tokens'] = counters['prompt_tokens'] + counters['completion_tokens']
+    paths = ['usage/total', f"usage/days/{datetime.utcnow().strftime('%Y-%m-%d')}",
+             f'usage/models/{safe_key(model)}', f'usage/languages/{safe_key(language)}']
+    paths += [f'usage/members/{safe_key(member)}' for member in board_members]
+    if not anonymous:
+        paths.append(f'usage/sessions/{user_id}')
+
+    update = {
+        f'{path}/{name}': increment_value(amount)
+        for path in paths for name, amount in counters.items() if amount
+    }
+    if not anonymous:
+        update[f'usage/sessions/{user_id}/last_turn'] = datetime.utcnow().isoformat()
+    return update
+
+def log_usage(ref, user_id, usage, model, latency_ms, board_members, language, anonymous=False):
+    """Add one turn's usage to the totals in Firebase"""
+    if not ref:
+        return
+    
+    try:
+        ref.update(build_usage_update(user_id, usage, model, latency_ms, board_members, language, anonymous))
+    except Exception as e:
+        print(f"Error logging usage: {str(e)}")
+
+def get_usage_summary(ref, days=30, top_sessions=20):
+    """Usage totals for the admin panel, read from the aggregates only.
+
+    Returns the overall totals, the last `days` days (newest first), totals per member,
+    model and language, and the sessions that used the most tokens.
+    """
+    summary = {'total': {}, 'days': {}, 'members': {}, 'models': {}, 'languages': {}, 'sessions': {}}
+    if not ref:
+        return summary
+    
+    try:
+        usage = ref.child('usage')
+        summary['total'] = usage.child('total').get() or {}
+        day_totals = usage.child('days').order_by_key().limit_to_last(days).get() or {}
+        summary['days'] = dict(sorted(day_totals.items(), reverse=True))
+        for name in ('members', 'models', 'languages'):
+            summary[name] = usage.child(name).get() or {}
+        sessions = usage.child('sessions').order_by_child('total_tokens').limit_to_last(top_sessions).get() or {}
+        summary['sessions'] = dict(sorted(sessions.items(), key=lambda item: item[1].get('total_tokens', 0),
+                                          reverse=True))
+        return summary
+        
+    except Exception as e:
+        print(f"Error retrieving usage summary: {str(e)}")
+        return summary
+
+def _normalize_messages(raw_messages):
+    """Return stored messages as an ordered list, for both list and keyed-child layouts"""
+    if not raw_messages:
+        return []
+    if isinstance(raw_messages, dict):
+        # Sparse index keys come back as a dict; order them numerically
+        keys = sorted(raw_messages, key=lambda k: (0, int(k)) if str(k).isdigit() else (1, str(k)))
+        raw_messages = [raw_messages[k] for k in keys]
+    # A gap from a failed write comes back as None in list form
+    return [decode_message(msg) for msg in raw_messages if msg]
+
+def _format_chat_log(user_id, chat_data, with_messages=True):
+    """Turn a stored chat (or chat_index entry) into a log entry for display"""
+    # Handle potential missing or malformed data
+    timestamp = chat_data.get('timestamp', datetime.utcnow().isoformat())
+    log = {
+        'user_id': user_id,
+        'timestamp': datetime.fromisoformat(timestamp),
+        'board_members': chat_data.get('board_members', []),
+        'language': chat_data.get('language', 'English'),
+        'message_count': chat_data.get('message_count')
+    }
+    if with_messages:
+        log['messages'] = _normalize_messages(chat_data.get('messages'))
+        if log['message_count'] is None:
+            log['message_count'] = len(log['messages'])
+    return log
+
+def get_conversation_logs(ref, limit=100):
+    """Retrieve the most recent conversation logs for admin viewing"""
     if not ref:
         return []
     
     try:
-        # Get all chats
-        chats = ref.child('chats').get()
+        # Indexed query (see database.rules.json): only the newest `limit` chats are downloaded
+        chats = ref.child('chats').order_by_child('timestamp').limit_to_last(limit).get()
         
         if not chats:
             return []
@@ -62,32 +347,163 @@ def get_conversation_logs(ref):
         all_logs = []
         for user_id, chat_data in chats.items():
             try:
-                # Handle potential missing or malformed data
-                timestamp = chat_data.get('timestamp', datetime.utcnow().isoformat())
-                messages = chat_data.get('messages', [])
-                board_members = chat_data.get('board_members', [])
-                language = chat_data.get('language', 'English')
-                
-                log = {
-                    'user_id': user_id,
-                    'timestamp': datetime.fromisoformat(timestamp),
-                    'messages': messages,
-                    'board_members': board_members,
-                    'language': language
-                }
-                all_logs.append(log)
+                all_logs.append(_format_chat_log(user_id, chat_data))
             except Exception as e:
                 print(f"Error processing chat log for user {user_id}: {str(e)}")
                 continue
         
         # Sort by timestamp, newest first
         all_logs.sort(key=lambda x: x['timestamp'], reverse=True)
-        return all_logs[:100]  # Return last 100 conversations
+        return all_logs
         
     except Exception as e:
         print(f"Error retrieving logs: {str(e)}")
         return []
 
+def get_conversation_page(ref, page_size=20, cursor=None):
+    """Retrieve one page of chat metadata (no transcripts), newest first.
+
+    Reads the chat_index node ordered by timestamp. Pass the returned cursor back in
+    to get the next (older) page; it is None when there are no more chats.
+    """
+    if not ref:
+        return [], None
+    
+    try:
+        query = ref.child('chat_index').order_by_child('timestamp')
+        if cursor:
+            query = query.end_at(cursor['timestamp'])
+        # One extra entry tells us if there is more; with a cursor, its own chat also comes back
+        limit = page_size + (2 if cursor else 1)
+        while True:
+            entries = query.limit_to_last(limit).get() or {}
+            fresh = [
+                (user_id, entry) for user_id, entry in reversed(list(entries.items()))
+                # Equal timestamps are ordered by key, so keys at or after the cursor were already shown
+                if not (cursor and entry.get('timestamp') == cursor['timestamp'] and user_id >= cursor['user_id'])
+            ]
+            if len(fresh) > page_size or len(entries) < limit:
+                break
+            # Too many already-shown chats share the cursor's timestamp; look further back
+            limit *= 2
+        
+        has_more = len(fresh) > page_size
+        page = []
+        next_cursor = None
+        for user_id, entry in fresh[:page_size]:
+            try:
+                page.append(_format_chat_log(user_id, entry, with_messages=False))
+            except Exception as e:
+                print(f"Error processing chat index entry for user {user_id}: {str(e)}")
+            next_cursor = {'timestamp': entry.get('timestamp'), 'user_id': user_id}
+        if not has_more:
+            next_cursor = None
+        return page, next_cursor
+        
+    except Exception as e:
+        print(f"Error retrieving chat page: {str(e)}")
+        return [], None
+
+def get_conversation_messages(ref, user_id):
+    """Retrieve the transcript of a single chat"""
+    if not ref:
+        return []
+    
+    try:
+        return _normalize_messages(ref.child('chats').child(user_id).child('messages').get())
+    except Exception as e:
+        print(f"Error retrieving messages for user {user_id}: {str(e)}")
+        return []
+
+def backfill_chat_index(ref, page_size=200):
+    """Build chat_index entries for chats logged before the index existed; returns how many were added"""
+    if not ref:
+        return 0
+    
+    added = 0
+    last_key = None
+    try:
+        while True:
+            # Walk chats in key order, one bounded page at a time
+            query = ref.child('chats').order_by_key()
+            if last_key:
+                query = query.start_at(last_key)
+            chats = query.limit_to_first(page_size + (1 if last_key else 0)).get() or {}
+            keys = [key for key in chats if key != last_key]
+            if not keys:
+                break
+            
+            index = ref.child('chat_index').order_by_key().start_at(keys[0]).end_at(keys[-1]).get() or {}
+            update = {}
+            for user_id in keys:
+                chat_data = chats[user_id]
+                if user_id in index or not isinstance(chat_data, dict):
+                    continue
+                update[f'chat_index/{user_id}'] = {
+                    'timestamp': chat_data.get('timestamp', datetime.utcnow().isoformat()),
+                    'board_members': chat_data.get('board_members', []),
+                    'language': chat_data.get('language', 'English'),
+                    'message_count': len(_normalize_messages(chat_data.get('messages')))
+                }
+            if update:
+                ref.update(update)
+                added += len(update)
+            last_key = keys[-1]
+        return added
+        
+    except Exception as e:
+        print(f"Error backfilling chat index: {str(e)}")
+        return added
+
+def iter_chats(ref, page_size=100, after_key=None):
+    """Yield (user_id, chat_data) for every chat in key order, one bounded page at a time.
+
+    Only `page_size` chats are held in memory at once. Pass the last user_id seen as
+    `after_key` to resume an interrupted walk.
+    """
+    last_key = after_key
+    while True:
+        query = ref.child('chats').order_by_key()
+        if last_key:
+            query = query.start_at(last_key)
+        chats = query.limit_to_first(page_size + (1 if last_key else 0)).get() or {}
+        keys = [key for key in chats if key != last_key]
+        if not keys:
+            return
+        for user_id in keys:
+            yield user_id, chats[user_id]
+        last_key = keys[-1]
+
+def iter_chats_since(ref, since, page_size=100, cursor=None):
+    """Yield (user_id, chat_data, cursor) for chats updated at or after `since`, oldest first.
+
+    Walks chat_index by timestamp and fetches each matching chat on its own. A chat
+    that was updated again later comes back again, with its full transcript. Pass a
+    yielded cursor ({'timestamp', 'user_id'}) back in to resume after that chat.
+    """
+    query_ref = ref.child('chat_index')
+    limit = page_size + 1
+    while True:
+        start = cursor['timestamp'] if cursor else since
+        entries = query_ref.order_by_child('timestamp').start_at(start).limit_to_first(limit).get() or {}
+        fresh = [
+            (user_id, entry) for user_id, entry in entries.items()
+            # Equal timestamps are ordered by key, so keys up to the cursor were already yielded
+            if not (cursor and entry.get('timestamp') == cursor['timestamp'] and user_id <= cursor['user_id'])
+        ]
+        if not fresh:
+            if len(entries) < limit:
+                return
+            # A whole page of already-seen chats sharing one timestamp; look further
+            limit *= 2
+            continue
+        for user_id, entry in fresh:
+            chat_data = ref.child('chats').child(user_id).get()
+            cursor = {'timestamp': entry.get('timestamp'), 'user_id': user_id}
+            if isinstance(chat_data, dict):
+                yield user_id, chat_data, cursor
+        limit = page_size + 1
+
 def generate_user_id():
     """Generate a unique user ID for anonymous tracking"""
     return str(uuid.uuid4())
@@ -113,20 +529,67 @@ def initialize_config(ref):
     except Exception as e:
         print(f"Error initializing config: {str(e)}")
 
+def invalidate_config_cache():
+    """Drop the cached configuration so the next get_config re-reads Firebase"""
+    with _config_lock:
+        _config_cache['value'] = None
+
+def _on_config_change(event):
+    """Realtime Database listener callback for changes under /config.
+
+    The listener first delivers the whole node (and again after reconnecting); that
+    snapshot only invalidates the cache if it differs from what is cached.
+    """
+    with _config_lock:
+        if event.path == '/' and event.data == _config_cache['value']:
+            return
+    invalidate_config_cache()
+
+def _start_config_listener(ref):
+    """Subscribe to /config changes once per process; the TTL covers us if this fails.
+
+    Connecting blocks, so after a failure it is only retried once per TTL rather
+    than on every get_config call.
+    """
+    if _config_cache['listener']:
+        return
+    failed_at = _config_cache['listener_failed_at']
+    if failed_at is not None and time.monotonic() - failed_at < FIREBASE_CONFIG_CACHE_TTL:
+        return
+    try:
+        _config_cache['listener'] = ref.child('config').listen(_on_config_change)
+        _config_cache['listener_failed_at'] = None
+    except Exception as e:
+        _config_cache['listener_failed_at'] = time.monotonic()
+        print(f"Error starting config listener: {str(e)}")
+
+def _load_config(ref):
+    """Read configuration from Firebase, initializing it if missing"""
+    config_ref = ref.child('config')
+    config = config_ref.get()
+
+    if not config:
+        initialize_config(ref)
+        config = config_ref.get()
+
+    return config
+
 def get_config(ref):
-    """Retrieve current configuration from Firebase"""
+    """Retrieve current configuration, served from the in-process cache when fresh"""
     if not ref:
         return None
     
     try:
-        config_ref = ref.child('config')
-        config = config_ref.get()
+        with _config_lock:
+            _start_config_listener(ref)
+            fresh = time.monotonic() - _config_cache['loaded_at'] < FIREBASE_CONFIG_CACHE_TTL
+            if _config_cache['value'] is None or not fresh:
+                _config_cache['value'] = _load_config(ref)
+                _config_cache['loaded_at'] = time.monotonic()
+            config = _config_cache['value']
         
-        if not config:
-            initialize_config(ref)
-            config = config_ref.get()
-            
-        return config
+        # Callers (e.g. the admin panel) edit the config in place, so hand out a copy
+        return copy.deepcopy(config)
     except Exception as e:
         print(f"Error retrieving config: {str(e)}")
         return None
@@ -139,6 +602,7 @@ def update_board_members(ref, members):
     try:
         config_ref = ref.child('config')
         config_ref.update({'board_members': members})
+        invalidate_config_cache()
         return True
     except Exception as e:
         print(f"Error updating board members: {str(e)}")
@@ -152,6 +616,7 @@ def update_system_prompts(ref, prompts):
     try:
         config_ref = ref.child('config')
         config_ref.update({'system_prompts': prompts})
+        invalidate_config_cache()
         return True
     except Exception as e:
         print(f"Error updating system prompts: {str(e)}")
@@ -165,6 +630,7 @@ def update_translations(ref, translations):
     try:
         config_ref = ref.child('config')
         config_ref.update({'translations': translations})
+        invalidate_config_cache()
         return True
     except Exception as e:
         print(f"Error updating translations: {str(e)}")
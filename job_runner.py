@@ -0,0 +1,140 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import JOB_RUNNER_CONFIG
+from admission import BusyError
+from metrics_utils import increment
+
+def make_turn_key(*parts):
+    """Coalescing key for a turn: a hash of the session and everything sent upstream"""
+    canonical = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class SharedTurn:
+    """One upstream turn whose output can be followed by several consumers.
+
+    A worker thread drains the upstream iterator into a buffer, so a consumer that goes
+    away (a Streamlit rerun) doesn't cancel the paid completion, and a later consumer
+    replays the buffer and then follows the live output.
+    """
+
+    def __init__(self, key=None):
+        self.key = key
+        self.items = []
+        self.meta = {}
+        self.done = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def run(self, iterator_factory, on_finish):
+        try:
+            for item in iterator_factory(self.meta):
+                with self._cond:
+                    self.items.append(item)
+                    self._cond.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self.done = True
+                self._cond.notify_all()
+            on_finish()
+
+    def follow(self, meta=None):
+        """Yield every item from the start, waiting for new ones until the turn is done"""
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.items) and not self.done:
+                    self._cond.wait()
+                pending = self.items[index:]
+                finished = self.done
+            for item in pending:
+                yield item
+            index += len(pending)
+            if finished and index >= len(self.items):
+                break
+        if meta is not None:
+            meta.update(self.meta)
+        if self.error:
+            raise self.error
+
+class JobRunner:
+    """Process-wide pool that runs chat turns independently of Streamlit script runs.
+
+    A turn is submitted as a job keyed by (user_id, turn index). Its output is buffered,
+    so a rerun (or a second browser tab) can follow it again from the start, and a
+    finished job is kept for `finished_ttl` seconds until its session attaches the reply.
+    At most `max_queued` jobs wait for a worker; past that, submit() raises BusyError.
+    """
+
+    def __init__(self, config=JOB_RUNNER_CONFIG):
+        self.config = config
+        self._executor = ThreadPoolExecutor(max_workers=config["max_workers"], thread_name_prefix='turn-job')
+        self._lock = threading.Lock()
+        self._jobs = {}  # (user_id, turn_index) -> SharedTurn
+        self._finished = {}  # (user_id, turn_index) -> time.monotonic() when the job finished
+        self._queued = 0  # submitted jobs not yet picked up by a worker
+
+    def submit(self, user_id, turn_index, iterator_factory, turn_key=None):
+        """Start a turn job, or return the existing job for this turn.
+
+        `iterator_factory(meta)` is called on a worker thread and its items are buffered.
+        With a `turn_key` (see make_turn_key), the existing job is only reused when it
+        was started for the same history; a turn asked again with a different history
+        (another tab of the same session) gets a job of its own.
+        """
+        key = (user_id, turn_index)
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(key)
+            if job is not None and (turn_key is None or job.key == turn_key):
+                increment('board_chat_jobs_total', event='coalesced')
+                return job
+            if self._queued >= self.config["max_queued"]:
+                increment('board_chat_rejected_total', reason='job_queue_full')
+                raise BusyError('job_queue_full')
+            self._queued += 1
+            job = self._jobs[key] = SharedTurn(turn_key)
+            self._finished.pop(key, None)
+        increment('board_chat_jobs_total', event='submitted')
+
+        def start():
+            with self._lock:
+                self._queued -= 1
+            job.run(iterator_factory, on_finish)
+
+        def on_finish():
+            with self._lock:
+                # A replaced job doesn't expire its replacement
+                if self._jobs.get(key) is job:
+                    self._finished[key] = time.monotonic()
+            increment('board_chat_jobs_total', event='failed' if job.error else 'finished')
+
+        self._executor.submit(start)
+        return job
+
+    def get(self, user_id, turn_index):
+        """The job for this turn, or None if it was never submitted here or has expired"""
+        with self._lock:
+            return self._jobs.get((user_id, turn_index))
+
+    def discard(self, user_id, turn_index):
+        """Forget a job once its reply is attached to the session"""
+        with self._lock:
+            self._jobs.pop((user_id, turn_index), None)
+            self._finished.pop((user_id, turn_index), None)
+
+    def stats(self):
+        with self._lock:
+            return {'jobs': len(self._jobs), 'running': len(self._jobs) - len(self._finished), 'queued': self._queued}
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.config["finished_ttl"]
+        for key, finished_at in list(self._finished.items()):
+            if finished_at < cutoff:
+                del self._finished[key]
+                self._jobs.pop(key, None)
+                increment('board_chat_jobs_total', event='expired')
@@ -0,0 +1,175 @@
+import atexit
+import json
+import queue
+import threading
+import time
+from config import LOG_WRITER_CONFIG
+from firebase_utils import increment_value, is_increment
+from metrics_utils import observe
+from sqlite_utils import connect_sqlite
+
+class LogWriter:
+    """Background writer that takes conversation logging off the request path.
+
+    Callers enqueue root-relative multi-path updates (see firebase_utils.build_log_update).
+    A single thread merges whatever is queued into one Firebase update. When Firebase
+    is unreachable, batches go to a local SQLite spool that is replayed in order once
+    writes succeed again.
+    """
+
+    def __init__(self, ref, config=LOG_WRITER_CONFIG):
+        self.ref = ref
+        self.config = config
+        self._queue = queue.Queue(maxsize=config["max_queue"])
+        self._spool_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._last_failure = 0.0
+        self._metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'failures': 0,
+            'spooled': 0,
+            'replayed': 0,
+            'last_lag': 0.0,
+            'max_lag': 0.0
+        }
+        self._spool_count = self._init_spool()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, update):
+        """Queue a multi-path update for writing; never blocks the caller"""
+        item = (time.time(), update)
+        self._count('enqueued')
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Keep the conversation rather than drop it
+            self._spool([item])
+
+    def stats(self):
+        """Queue depth, spool depth, lag (seconds from enqueue to write) and counters"""
+        with self._metrics_lock:
+            stats = dict(self._metrics)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['spool_depth'] = self._spool_count
+        return stats
+
+    def close(self, timeout=5):
+        """Stop the writer after draining the queue (to Firebase or the spool)"""
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _count(self, name, amount=1):
+        with self._metrics_lock:
+            self._metrics[name] += amount
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            try:
+                if batch:
+                    self._flush(batch)
+                elif self._spool_count:
+                    self._replay()
+            except Exception as e:
+                print(f"Log writer error: {str(e)}")
+
+    def _next_batch(self):
+        """Block for the first item, then take whatever else is already queued"""
+        try:
+            batch = [self._queue.get(timeout=self.config["poll_interval"])]
+        except queue.Empty:
+            return []
+        while len(batch) < self.config["batch_size"]:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, items):
+        """Merge items into one multi-path update; later writes to a path win, increments add up"""
+        merged = {}
+        for _, update in items:
+            for path, value in update.items():
+                if is_increment(value) and is_increment(merged.get(path)):
+                    value = increment_value(merged[path]['.sv']['increment'] + value['.sv']['increment'])
+                merged[path] = value
+        self.ref.update(merged)
+
+        lag = time.time() - items[0][0]
+        observe('board_chat_log_write_lag_seconds', lag)
+        with self._metrics_lock:
+            self._metrics['written'] += len(items)
+            self._metrics['batches'] += 1
+            self._metrics['last_lag'] = lag
+            self._metrics['max_lag'] = max(self._metrics['max_lag'], lag)
+
+    def _flush(self, batch):
+        # Spooled updates are older; replay them first so metadata isn't overwritten out of order
+        if self._spool_count:
+            self._replay()
+        if self._spool_count:
+            self._spool(batch)
+            return
+
+        try:
+            self._write(batch)
+        except Exception as e:
+            print(f"Error writing conversation logs, spooling {len(batch)} updates: {str(e)}")
+            self._last_failure = time.monotonic()
+            self._count('failures')
+            self._spool(batch)
+
+    def _replay(self):
+        """Write spooled updates back to Firebase in order, unless we failed recently"""
+        if time.monotonic() - self._last_failure < self.config["replay_interval"]:
+            return
+        while self._spool_count:
+            # Claim the rows by deleting them in the same statement that reads them, so another
+            # process sharing the spool can't replay them too (increments would count twice)
+            with self._spool_lock, connect_sqlite(self.config["spool_path"]) as conn:
+                rows = sorted(conn.execute(
+                    'DELETE FROM spool WHERE id IN (SELECT id FROM spool ORDER BY id LIMIT ?) '
+                    'RETURNING id, created_at, payload',
+                    (self.config["batch_size"],)
+                ).fetchall())
+                self._spool_count = max(0, self._spool_count - len(rows))
+            if not rows:
+                self._spool_count = 0
+                return
+
+            try:
+                self._write([(created_at, json.loads(payload)) for _, created_at, payload in rows])
+            except Exception as e:
+                print(f"Error replaying log spool: {str(e)}")
+                self._last_failure = time.monotonic()
+                self._count('failures')
+                # Give the claimed rows back under their old ids, so they keep their place in line
+                with self._spool_lock, connect_sqlite(self.config["spool_path"]) as conn:
+                    conn.executemany('INSERT INTO spool (id, created_at, payload) VALUES (?, ?, ?)', rows)
+                    self._spool_count += len(rows)
+                return
+            self._count('replayed', len(rows))
+
+    def _init_spool(self):
+        """Create the spool table and return how many updates are waiting in it"""
+        with self._spool_lock, connect_sqlite(self.config["spool_path"]) as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS spool ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, payload TEXT NOT NULL)'
+            )
+            return conn.execute('SELECT COUNT(*) FROM spool').fetchone()[0]
+
+    def _spool(self, items):
+        with self._spool_lock, connect_sqlite(self.config["spool_path"]) as conn:
+            conn.executemany(
+                'INSERT INTO spool (created_at, payload) VALUES (?, ?)',
+                [(created_at, json.dumps(update, ensure_ascii=False)) for created_at, update in items]
+            )
+            self._spool_count += len(items)
+        self._count('spooled', len(items))
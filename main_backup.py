@@ -1,21 +1,183 @@
 import streamlit as st
 import json
-from config import DEFAULT_BOARD_MEMBERS, TRANSLATIONS, ADMIN_PASSWORD, SYSTEM_PROMPTS
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import datetime
+from config import (
+    DEFAULT_BOARD_MEMBERS, TRANSLATIONS, ADMIN_PASSWORD, SYSTEM_PROMPTS, STREAM_RESPONSES,
+    LOG_WRITER_CONFIG, METRICS_CONFIG, BUSY_MESSAGES, CHAT_RENDER_CONFIG, USAGE_CONFIG, ANALYTICS_CONFIG,
+    WARMUP_CONFIG
+)
 from firebase_utils import (
-    initialize_firebase, log_conversation, get_conversation_logs, generate_user_id,
+    initialize_firebase, generate_user_id,
+    get_conversation_page, get_conversation_messages, backfill_chat_index,
     get_config, update_board_members, update_system_prompts, update_translations,
-    initialize_config
+    initialize_config, get_usage_summary
+)
+from openrouter_utils import (
+    get_response_cache, get_http_session, format_advisor_section, merge_board_responses, warm_up_connections
+)
+from context_utils import new_context_state, plan_context
+import turn_pipeline
+from turn_pipeline import (
+    new_turn, estimate_turn_tokens, over_token_budget, lookup_similar, remember_answer,
+    attach_reply, log_messages
+)
+from admission import AdmissionController, BusyError
+from job_runner import JobRunner
+from log_writer import LogWriter
+from search_index import create_search_index, rebuild_search_index
+from archive_logs import create_archive
+from similar_questions import create_similar_question_index
+from analytics import (
+    get_analytics_summary, backfill_analytics
 )
-from openrouter_utils import get_chat_response
+from session_store import (
+    create_session_store, new_session_token, serialize_session, deserialize_session, session_digest
+)
+from metrics_utils import span, increment, start_metrics_server, start_json_logger, mark_ready
+
+@st.cache_resource
+def start_metrics_export():
+    """Start the Prometheus endpoint and/or periodic JSON metrics log once per process"""
+    if METRICS_CONFIG["port"]:
+        start_metrics_server(METRICS_CONFIG["port"])
+    if METRICS_CONFIG["json_log_interval"]:
+        start_json_logger(METRICS_CONFIG["json_log_interval"])
+    return True
+
+start_metrics_export()
+
+@st.cache_resource
+def start_warm_up():
+    """Open OpenRouter connections on a background thread while the rest of the process starts.
+
+    Returns a future of how many connections answered, or None when warm-up is disabled.
+    """
+    if not WARMUP_CONFIG["enabled"] or not WARMUP_CONFIG["connections"]:
+        return None
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='warm-up')
+    future = executor.submit(warm_up_connections, get_http_session(), WARMUP_CONFIG["connections"])
+    executor.shutdown(wait=False)
+    return future
+
+# Started before Firebase is set up, so both handshakes overlap
+warm_up = start_warm_up()
+
+@st.cache_resource
+def get_database():
+    """Initialize Firebase and the default config once per process"""
+    ref = initialize_firebase()
+    if ref:
+        initialize_config(ref)
+    return ref
+
+# Initialize Firebase (cached across reruns and sessions)
+with span('firebase_init'):
+    db = get_database()
+if not db:
+    # Don't cache a failed initialization, retry on the next rerun
+    get_database.clear()
+
+@st.cache_resource
+def get_log_writer(_ref):
+    """Start the process-wide background conversation log writer"""
+    return LogWriter(_ref)
+
+log_writer = get_log_writer(db) if db and LOG_WRITER_CONFIG["enabled"] else None
+
+@st.cache_resource
+def get_search_index():
+    """Open the process-wide local search index over logged conversations"""
+    return create_search_index()
+
+search_index = get_search_index()
+
+def index_conversation(update):
+    """Add a logged turn to the local search index"""
+    if not search_index:
+        return
+    try:
+        with span('search_index'):
+            search_index.add_update(update)
+    except Exception as e:
+        print(f"Error indexing conversation: {str(e)}")
+
+@st.cache_resource
+def get_similar_questions():
+    """Create the process-wide index of answered first-turn questions, or None when disabled"""
+    return create_similar_question_index()
+
+similar_questions = get_similar_questions()
+
+@st.cache_resource
+def get_admission_controller():
+    """Process-wide rate limiter for upstream turns"""
+    return AdmissionController()
+
+admission = get_admission_controller()
+
+@st.cache_resource
+def get_job_runner():
+    """Process-wide worker pool running chat turns outside the script thread"""
+    return JobRunner()
+
+job_runner = get_job_runner()
+
+@st.cache_resource
+def get_session_store():
+    """Process-wide session backend, or None when sessions only live in Streamlit"""
+    return create_session_store()
+
+session_store = get_session_store()
+
+def _persist_session():
+    """Whether this session is kept in the session store (not the admin panel, anonymous mode or warm-up)"""
+    params = st.query_params
+    return (session_store is not None and params.get("admin", "") != "true" and params.get("anon", "") != "true"
+            and params.get("warmup", "") != "true")
+
+def restore_session():
+    """On a new browser session, load the meeting saved under the URL's session token"""
+    if 'session_token' in st.session_state or not _persist_session():
+        return
+    token = st.query_params.get("session")
+    if not token:
+        token = new_session_token()
+        st.query_params["session"] = token
+    st.session_state.session_token = token
+    try:
+        blob = session_store.get(token)
+    except Exception as e:
+        print(f"Error loading session: {str(e)}")
+        return
+    if blob:
+        st.session_state.update(deserialize_session(blob))
+        st.session_state.session_digest = session_digest(blob)
+
+def save_session():
+    """Write the meeting through to the session store if it changed during this run"""
+    if 'session_token' not in st.session_state or not _persist_session():
+        return
+    blob = serialize_session(st.session_state)
+    digest = session_digest(blob)
+    if digest == st.session_state.get('session_digest'):
+        return
+    try:
+        with span('session_save'):
+            session_store.put(st.session_state.session_token, blob)
+        st.session_state.session_digest = digest
+    except Exception as e:
+        print(f"Error saving session: {str(e)}")
 
-# Initialize Firebase
-db = initialize_firebase()
-if db:
-    initialize_config(db)
+restore_session()
 
 # Initialize session state
 if 'messages' not in st.session_state:
     st.session_state.messages = []
+if 'context' not in st.session_state:
+    st.session_state.context = new_context_state()
+if 'logged_count' not in st.session_state:
+    st.session_state.logged_count = 0
 if 'user_id' not in st.session_state:
     st.session_state.user_id = generate_user_id()
 if 'language' not in st.session_state:
@@ -24,6 +186,180 @@ if 'custom_members' not in st.session_state:
     st.session_state.custom_members = []
 if 'scroll_to_chat' not in st.session_state:
     st.session_state.scroll_to_chat = False
+if 'earlier_shown' not in st.session_state:
+    st.session_state.earlier_shown = 0
+if 'pending_turn' not in st.session_state:
+    st.session_state.pending_turn = None
+if 'session_tokens' not in st.session_state:
+    st.session_state.session_tokens = 0
+
+def render_history(messages, language):
+    """Draw the recent turns, with older messages collapsed behind "Earlier in this meeting".
+
+    Older messages are only sent to the browser once asked for, a page at a time, so the
+    work per rerun stays flat as the meeting grows.
+    """
+    recent = 2 * CHAT_RENDER_CONFIG["recent_turns"]
+    earlier = messages[:-recent] if len(messages) > recent else []
+    if earlier:
+        shown = min(st.session_state.earlier_shown, len(earlier))
+        hidden = len(earlier) - shown
+        with st.container(border=True):
+            st.caption(
+                f"Earlier in this meeting: {len(earlier)} messages" if language == "English"
+                else f"Ранее на этой встрече: {len(earlier)} сообщений"
+            )
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                if hidden and st.button(
+                    f"Show earlier ({hidden} hidden)" if language == "English" else f"Показать ранее ({hidden} скрыто)",
+                    key="show_earlier"
+                ):
+                    st.session_state.earlier_shown = shown + CHAT_RENDER_CONFIG["earlier_page_size"]
+                    st.rerun()
+            with col2:
+                if shown and st.button("Hide" if language == "English" else "Скрыть", key="hide_earlier"):
+                    st.session_state.earlier_shown = 0
+                    st.rerun()
+            for message in earlier[len(earlier) - shown:]:
+                with st.chat_message(message["role"]):
+                    st.write(message["content"])
+    for message in messages[len(earlier):]:
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
+
+def submit_turn(turn, plan, config):
+    """Start the upstream work for a turn as a background job (admitted, then run)"""
+    try:
+        turn_pipeline.submit_turn(job_runner, admission, st.session_state.user_id, turn, plan, config)
+    except BusyError:
+        reject_busy_turn(turn)
+
+def reject_busy_turn(turn):
+    """Not admitted: drop the question so it can simply be asked again, and stop this run"""
+    st.session_state.messages.pop()
+    st.session_state.pending_turn = None
+    job_runner.discard(st.session_state.user_id, turn['turn_index'])
+    with st.chat_message("assistant"):
+        st.warning(BUSY_MESSAGES[turn['language']])
+    st.stop()
+
+def show_turn_output(job, turn):
+    """Draw a turn job's output as it arrives; returns the reply and its metadata.
+
+    Following a job replays everything it has produced so far, so this also resumes
+    a reply that was interrupted by a rerun. Raises BusyError if the turn wasn't admitted.
+    """
+    members, language = turn['members'], turn['language']
+    # Filled with the model that answered, its latency and token usage, logged with the reply
+    response_meta = {}
+    items = job.follow(response_meta)
+    if turn['full_board']:
+        # One request per advisor; each section appears as soon as that advisor answers
+        with st.chat_message("assistant"):
+            placeholders = {member: st.empty() for member in members}
+            for member, placeholder in placeholders.items():
+                placeholder.markdown(f"_{member}..._")
+            responses = {}
+            for member, content in items:
+                responses[member] = content
+                if content:
+                    placeholders[member].markdown(format_advisor_section(member, content))
+                else:
+                    placeholders[member].empty()
+            response = merge_board_responses(members, responses, language)
+            if not any(responses.values()):
+                placeholders[members[0]].markdown(response)
+    elif turn['stream']:
+        # Render the AI response live as chunks arrive
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            placeholder.markdown('Getting response...' if language == "English" else 'Получение ответа...')
+            response = ""
+            for chunk in items:
+                response += chunk
+                placeholder.markdown(response + "▌")
+            placeholder.markdown(response)
+    else:
+        # Show loading spinner while getting response
+        with st.spinner('Getting response...' if language == "English" else 'Получение ответа...'):
+            response = ''.join(items)
+        
+        # Show AI response
+        with st.chat_message("assistant"):
+            st.write(response)
+    return response, response_meta
+
+def run_turn(turn, is_anonymous):
+    """Follow a pending turn's job to the end, then attach the reply to the session and log it"""
+    user_id = st.session_state.user_id
+    job = job_runner.get(user_id, turn['turn_index'])
+    if job is None or len(st.session_state.messages) != turn['turn_index'] + 1:
+        # The job is gone (restart, expiry, another replica): drop the question so it can be asked again
+        st.session_state.pending_turn = None
+        if len(st.session_state.messages) == turn['turn_index'] + 1:
+            st.session_state.messages.pop()
+        with st.chat_message("assistant"):
+            st.info(
+                "The last answer was interrupted. Please ask again." if turn['language'] == "English"
+                else "Последний ответ был прерван. Пожалуйста, спросите снова."
+            )
+        return
+    
+    try:
+        response, response_meta = show_turn_output(job, turn)
+    except BusyError:
+        reject_busy_turn(turn)
+    
+    # Add AI response to chat, and keep the summary of older turns the job folded
+    attach_reply(st.session_state, response, response_meta)
+    job_runner.discard(user_id, turn['turn_index'])
+    log_turn(turn['members'], turn['language'], is_anonymous)
+    log_turn_usage(turn, response_meta, is_anonymous)
+    remember_answer(similar_questions, turn, st.session_state.messages[0]['content'], response, response_meta)
+
+def answer_from_similar(turn, question, is_anonymous):
+    """Answer a first-turn question from a near-duplicate asked before, if there is one.
+
+    Returns True when the earlier answer was served as the reply. A less close match
+    is only shown as a suggestion, and the board is asked as usual.
+    """
+    match = lookup_similar(similar_questions, turn, question)
+    if not match:
+        return False
+    result, similarity, earlier = match
+    language = turn['language']
+    if result == 'served':
+        with st.chat_message("assistant"):
+            st.write(earlier['answer'])
+        st.session_state.messages.append({"role": "assistant", "content": earlier['answer'], "model": "similar"})
+        log_turn(turn['members'], language, is_anonymous)
+        return True
+    with st.expander(
+        f"A similar question was answered before: \"{earlier['question']}\"" if language == "English"
+        else f"Похожий вопрос уже задавали: «{earlier['question']}»"
+    ):
+        st.markdown(earlier['answer'])
+    return False
+
+def log_turn_usage(turn, response_meta, is_anonymous):
+    """Count the turn's tokens against the session and add them to the usage totals"""
+    st.session_state.session_tokens += turn_pipeline.log_turn_usage(
+        log_writer, db, st.session_state.user_id, turn, response_meta, is_anonymous
+    )
+
+def log_turn(members, language, is_anonymous):
+    """Log the messages not yet written to Firebase (skipped in anonymous mode)"""
+    if is_anonymous:
+        return
+    with span('log_conversation'):
+        # Write-behind when there is a writer: queued here, written to Firebase (or spooled) off the request path
+        st.session_state.logged_count, log_update = log_messages(
+            log_writer, db, st.session_state.user_id, st.session_state.messages,
+            members, language, st.session_state.logged_count
+        )
+        if log_update:
+            index_conversation(log_update)
 
 def main():
     # Force scroll to top on initial load
@@ -31,17 +367,36 @@ def main():
         st.empty()
     
     # Get dynamic configurations
-    config = get_config(db) if db else {
-        'board_members': DEFAULT_BOARD_MEMBERS,
-        'system_prompts': SYSTEM_PROMPTS,
-        'translations': TRANSLATIONS
-    }
+    with span('get_config'):
+        config = get_config(db) if db else {
+            'board_members': DEFAULT_BOARD_MEMBERS,
+            'system_prompts': SYSTEM_PROMPTS,
+            'translations': TRANSLATIONS
+        }
     
     # Check URL parameters using st.query_params
     params = st.query_params
     is_admin = params.get("admin", "") == "true"
     is_anonymous = params.get("anon", "") == "true"
     
+    # Warm-up run (warmup.py): the config is loaded now, wait for the connections and report ready
+    if params.get("warmup", "") == "true":
+        warmed_up = True
+        if warm_up:
+            try:
+                warmed_up = warm_up.result(WARMUP_CONFIG["timeout"]) > 0
+            except TimeoutError:
+                warmed_up = False
+            if not warmed_up:
+                # Open the connections again on the next warm-up run
+                start_warm_up.clear()
+        if not db or not warmed_up:
+            # /ready keeps answering 503; failing the run makes warmup.py exit non-zero
+            raise RuntimeError(f"Warm-up failed: {'Firebase unavailable' if not db else 'OpenRouter unreachable'}")
+        mark_ready()
+        st.write("ready")
+        return
+    
     # Show admin panel if requested
     if is_admin:
         show_admin_panel(config)
@@ -86,6 +441,12 @@ def main():
             default=all_members  # Show all members by default
         )
         
+        # Full board mode: every selected member answers, asked concurrently
+        full_board = st.toggle(
+            "Full board: every member answers" if language == "English" else "Весь совет: отвечает каждый участник",
+            key="full_board"
+        )
+        
         # Add custom board member (aligned input and button)
         with st.container():
             col1, col2 = st.columns([4, 1])
@@ -116,9 +477,12 @@ def main():
     
     with chat_container:
         # Display chat history
-        for message in st.session_state.messages:
-            with st.chat_message(message["role"]):
-                st.write(message["content"])
+        with span('render_history'):
+            render_history(st.session_state.messages, language)
+        
+        # A reply still being generated when the script was rerun is picked up where it is
+        if st.session_state.get('pending_turn'):
+            run_turn(st.session_state.pending_turn, is_anonymous)
         
         # Chat input
         if selected_members:
@@ -135,35 +499,32 @@ def main():
                 with st.chat_message("user"):
                     st.write(user_input)
                 
-                # Show loading spinner while getting response
-                with st.spinner('Getting response...' if language == "English" else 'Получение ответа...'):
-                    # Get AI response using dynamic system prompts
-                    response = get_chat_response(
-                        st.session_state.messages,
-                        selected_members,
-                        language,
-                        config['system_prompts']
-                    )
-                
-                # Add AI response to chat
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                
-                # Show AI response
-                with st.chat_message("assistant"):
-                    st.write(response)
+                # Recent turns within the token budget plus a rolling summary of older ones; the
+                # summary itself is updated in the turn's job
+                with span('prompt_build'):
+                    plan = plan_context(st.session_state.messages, st.session_state.context, language)
                 
-                # Log conversation to Firebase only if not in anonymous mode
-                if db and not is_anonymous:
-                    log_conversation(
-                        db,
-                        st.session_state.user_id,
-                        st.session_state.messages,
-                        selected_members,
-                        language
-                    )
-                
-                # Rerun to update chat display
-                st.rerun()
+                turn = new_turn(st.session_state.messages, full_board, STREAM_RESPONSES, selected_members, language)
+                if answer_from_similar(turn, user_input, is_anonymous):
+                    # Answered with an earlier reply; nothing was sent upstream
+                    increment('board_chat_turns_total', language=language)
+                elif over_token_budget(st.session_state.session_tokens, estimate_turn_tokens(turn, plan)):
+                    # Over the session's budget: drop the question before anything is sent upstream
+                    st.session_state.messages.pop()
+                    increment('board_chat_budget_rejections_total')
+                    with st.chat_message("assistant"):
+                        st.warning(
+                            "This meeting has used its token budget. Start a new chat to continue."
+                            if language == "English"
+                            else "Эта встреча исчерпала лимит токенов. Начните новый чат, чтобы продолжить."
+                        )
+                else:
+                    increment('board_chat_turns_total', language=language)
+                    submit_turn(turn, plan, config)
+                    st.session_state.pending_turn = turn
+                    run_turn(turn, is_anonymous)
+                    # No rerun here: the question and reply are already on screen, and the next
+                    # interaction redraws the history window anyway
         else:
             st.warning(
                 "Please select at least one board member to begin." if language == "English"
@@ -176,10 +537,248 @@ def main():
             st.session_state.user_id = generate_user_id()
             # Clear only the local messages
             st.session_state.messages = []
+            st.session_state.context = new_context_state()
+            st.session_state.logged_count = 0
+            st.session_state.earlier_shown = 0
+            st.session_state.pending_turn = None
+            st.session_state.session_tokens = 0
             # Reset scroll flag
             st.session_state.scroll_to_chat = False
             st.rerun()
 
+def load_transcript(user_id):
+    """A chat's messages from Firebase, or from the archive once it has been moved there"""
+    messages = get_conversation_messages(db, user_id)
+    if not messages:
+        archive = create_archive()
+        record = archive.get(user_id) if archive else None
+        if record:
+            messages = record['messages']
+    return messages
+
+def show_archive(page_size=20):
+    """Chats moved out of Firebase by the retention job, newest first, with lookup by user ID"""
+    archive = create_archive()
+    if not archive:
+        st.info("No archive yet. Chats are archived by running archive_logs.py.")
+        return
+    if 'loaded_transcripts' not in st.session_state:
+        st.session_state.loaded_transcripts = {}
+    if 'archive_page' not in st.session_state:
+        st.session_state.archive_page = 0
+    
+    archive_stats = archive.stats()
+    st.caption(f"{archive_stats['chats']} archived chats, {archive_stats['oldest'] or '-'} to {archive_stats['newest'] or '-'}")
+    
+    user_id = st.text_input("Find archived chat by user ID", key="archive_user_id").strip()
+    if user_id:
+        record = archive.get(user_id)
+        if not record:
+            st.warning("No archived chat with this user ID")
+            return
+        record = dict(record, timestamp=datetime.fromisoformat(record['timestamp']))
+        st.session_state.loaded_transcripts[user_id] = record['messages']
+        _show_chat_entry(record)
+        return
+    
+    page = st.session_state.archive_page
+    entries, total = archive.list(page_size, page * page_size)
+    for entry in entries:
+        _show_chat_entry(entry)
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        if page > 0 and st.button("Newer", key="archive_newer"):
+            st.session_state.archive_page -= 1
+            st.rerun()
+    with col2:
+        if (page + 1) * page_size < total and st.button("Older", key="archive_older"):
+            st.session_state.archive_page += 1
+            st.rerun()
+
+def _show_chat_entry(log):
+    """One chat in the admin log list; the transcript is fetched only on request"""
+    with st.expander(f"Conversation {log['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}"):
+        st.write(f"User ID: {log['user_id']}")
+        st.write(f"Language: {log['language']}")
+        st.write(f"Board Members: {', '.join(log['board_members'])}")
+        st.write(f"Messages: {log['message_count']}")
+        if log.get('snippet'):
+            st.markdown(f"> {log['snippet']}")
+        
+        messages = st.session_state.loaded_transcripts.get(log['user_id'])
+        if messages is None:
+            if st.button("Load transcript", key=f"load_{log['user_id']}"):
+                st.session_state.loaded_transcripts[log['user_id']] = load_transcript(log['user_id'])
+                st.rerun()
+        else:
+            for msg in messages:
+                st.write(f"{msg['role'].title()}: {msg['content']}")
+                if msg.get('model'):
+                    st.caption(f"{msg['model']}, {msg.get('latency_ms', '?')} ms")
+
+def show_chat_search(page_size=20):
+    """Search box and facet filters over the local search index; returns False when no filter is set"""
+    if 'search_page' not in st.session_state:
+        st.session_state.search_page = 0
+    facets = search_index.facets()
+    
+    text = st.text_input("Search conversations", key="search_text")
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        members = st.multiselect("Board members", facets['members'], key="search_members")
+    with col2:
+        language = st.selectbox("Language", ["Any"] + facets['languages'], key="search_language")
+    with col3:
+        dates = st.date_input("Dates", value=(), key="search_dates")
+    
+    filters = {
+        'text': text.strip(),
+        'members': members,
+        'language': None if language == "Any" else language,
+        'date_from': dates[0] if len(dates) > 0 else None,
+        'date_to': dates[1] if len(dates) > 1 else (dates[0] if dates else None)
+    }
+    if not any(filters.values()):
+        st.session_state.search_page = 0
+        return False
+    # A changed query starts again from the first page
+    if st.session_state.get('search_filters') != filters:
+        st.session_state.search_filters = filters
+        st.session_state.search_page = 0
+    
+    page = st.session_state.search_page
+    hits, total = search_index.search(**filters, limit=page_size, offset=page * page_size)
+    st.caption(f"{total} matching conversations")
+    for hit in hits:
+        _show_chat_entry(hit)
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        if page > 0 and st.button("Previous results"):
+            st.session_state.search_page -= 1
+            st.rerun()
+    with col2:
+        if (page + 1) * page_size < total and st.button("More results"):
+            st.session_state.search_page += 1
+            st.rerun()
+    return True
+
+def show_chat_logs(page_size=20):
+    """Paginated chat list from the metadata index; transcripts load only when requested"""
+    if 'log_cursors' not in st.session_state:
+        st.session_state.log_cursors = [None]  # cursor of each visited page, newest page first
+    if 'loaded_transcripts' not in st.session_state:
+        st.session_state.loaded_transcripts = {}
+    
+    if search_index and show_chat_search(page_size):
+        return
+    
+    logs, next_cursor = get_conversation_page(db, page_size, st.session_state.log_cursors[-1])
+    for log in logs:
+        _show_chat_entry(log)
+    
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 1])
+    with col1:
+        if len(st.session_state.log_cursors) > 1 and st.button("Newer"):
+            st.session_state.log_cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor and st.button("Older"):
+            st.session_state.log_cursors.append(next_cursor)
+            st.rerun()
+    with col3:
+        if st.button("Rebuild chat index"):
+            added = backfill_chat_index(db)
+            st.success(f"Indexed {added} older conversations")
+    with col4:
+        if search_index and st.button("Rebuild search index"):
+            with st.spinner("Indexing conversations..."):
+                indexed = rebuild_search_index(db, search_index)
+            st.success(f"Search index now covers {indexed} conversations")
+
+def show_analytics():
+    """Chats, turns, languages and members from the precomputed rollups (never scans chats)"""
+    summary = get_analytics_summary(db, ANALYTICS_CONFIG["summary_days"])
+    total = summary['total']
+    chats, turns = total.get('chats', 0), total.get('turns', 0)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Chats", f"{chats:,}")
+    col2.metric("Turns", f"{turns:,}")
+    col3.metric("Avg turns per chat", f"{turns / chats:.1f}" if chats else "-")
+    
+    st.subheader(f"Chats per day (last {ANALYTICS_CONFIG['summary_days']} days)")
+    if summary['days']:
+        st.bar_chart({
+            'chats': {day: counters.get('chats', 0) for day, counters in summary['days'].items()},
+            'turns': {day: counters.get('turns', 0) for day, counters in summary['days'].items()}
+        })
+    else:
+        st.caption("No chats recorded yet")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("Languages")
+        for language, counters in summary['languages'].items():
+            share = counters.get('chats', 0) / chats if chats else 0
+            st.text(f"{language}: {counters.get('chats', 0):,} chats ({share:.0%}), {counters.get('turns', 0):,} turns")
+    with col2:
+        st.subheader("Turns per chat")
+        # A table rather than a chart, which would sort the buckets alphabetically
+        st.dataframe([
+            {'turns': bucket, 'chats': count, 'share': f"{count / chats:.0%}" if chats else "-"}
+            for bucket, count in summary['turn_histogram'].items()
+        ], use_container_width=True, hide_index=True)
+    
+    st.subheader("Most selected board members")
+    st.dataframe([
+        {'member': member, 'chats': counters.get('chats', 0), 'turns': counters.get('turns', 0)}
+        for member, counters in summary['members'].items()
+    ], use_container_width=True, hide_index=True)
+    
+    if st.button("Backfill analytics from all chats"):
+        with st.spinner("Counting conversations..."):
+            counted = backfill_analytics(db, ANALYTICS_CONFIG["page_size"])
+        st.success(f"Analytics rebuilt from {counted} conversations")
+
+def _usage_rows(totals, label):
+    """Table rows for usage totals keyed by day, member, model, language or session"""
+    return [{
+        label: name,
+        'turns': counters.get('turns', 0),
+        'prompt tokens': counters.get('prompt_tokens', 0),
+        'completion tokens': counters.get('completion_tokens', 0),
+        'cached tokens': counters.get('cached_tokens', 0),
+        'cost (USD)': round(counters.get('cost', 0), 4),
+        'avg latency (s)': round(counters.get('latency_ms', 0) / counters['turns'] / 1000, 2)
+                           if counters.get('turns') else None
+    } for name, counters in totals.items() if isinstance(counters, dict)]
+
+def show_usage():
+    """Token usage and cost, read from the totals under usage/ (never from the chats)"""
+    summary = get_usage_summary(db, USAGE_CONFIG["summary_days"])
+    total = summary['total']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Turns", total.get('turns', 0))
+    col2.metric("Tokens", f"{total.get('total_tokens', 0):,}")
+    col3.metric("Cached prompt tokens", f"{total.get('cached_tokens', 0):,}")
+    col4.metric("Cost (USD)", f"{total.get('cost', 0):.2f}")
+    if USAGE_CONFIG["session_token_budget"]:
+        st.caption(f"Session token budget: {USAGE_CONFIG['session_token_budget']:,}")
+    
+    for title, key, label in [
+        (f"Last {USAGE_CONFIG['summary_days']} days", 'days', 'day'),
+        ("By board member", 'members', 'member'),
+        ("By model", 'models', 'model'),
+        ("By language", 'languages', 'language'),
+        ("Top sessions", 'sessions', 'user_id')
+    ]:
+        st.subheader(title)
+        rows = _usage_rows(summary[key], label)
+        if rows:
+            st.dataframe(rows, use_container_width=True, hide_index=True)
+        else:
+            st.caption("No usage recorded yet")
+
 def show_admin_panel(config):
     """Display enhanced admin panel with configuration management"""
     st.title("Admin Panel")
@@ -190,22 +789,54 @@ def show_admin_panel(config):
         return
     
     # Create tabs for different admin functions
-    chat_tab, board_tab, prompts_tab, translations_tab = st.tabs([
-        "Chat Logs", "Board Members", "System Prompts", "Interface Text"
+    chat_tab, analytics_tab, archive_tab, usage_tab, board_tab, prompts_tab, translations_tab = st.tabs([
+        "Chat Logs", "Analytics", "Archive", "Usage", "Board Members", "System Prompts", "Interface Text"
     ])
     
     # Chat Logs Tab
     with chat_tab:
         st.header("Conversation Logs")
+        if log_writer:
+            writer_stats = log_writer.stats()
+            st.caption(
+                f"Log writer: queue {writer_stats['queue_depth']}, spool {writer_stats['spool_depth']}, "
+                f"last lag {writer_stats['last_lag']:.2f}s, failures {writer_stats['failures']}"
+            )
+        response_cache = get_response_cache()
+        if response_cache:
+            cache_stats = response_cache.stats()
+            st.caption(
+                f"Response cache: hit rate {cache_stats['hit_rate']:.0%} "
+                f"({cache_stats['hits']} hits, {cache_stats['misses']} misses, {cache_stats['size']} entries)"
+            )
+        if similar_questions:
+            similar_stats = similar_questions.stats()
+            st.caption(
+                f"Similar questions: match rate {similar_stats['match_rate']:.0%} "
+                f"({similar_stats['matches']} of {similar_stats['lookups']} first questions, {similar_stats['size']} entries)"
+            )
+        if search_index:
+            index_stats = search_index.stats()
+            st.caption(f"Search index: {index_stats['chats']} conversations, {index_stats['messages']} messages")
+        if db:
+            show_chat_logs()
+    
+    # Analytics Tab
+    with analytics_tab:
+        st.header("Analytics")
+        if db:
+            show_analytics()
+    
+    # Archive Tab
+    with archive_tab:
+        st.header("Archived Conversations")
+        show_archive()
+    
+    # Usage Tab
+    with usage_tab:
+        st.header("Token Usage")
         if db:
-            logs = get_conversation_logs(db)
-            for log in logs:
-                with st.expander(f"Conversation {log['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}"):
-                    st.write(f"User ID: {log['user_id']}")
-                    st.write(f"Language: {log['language']}")
-                    st.write(f"Board Members: {', '.join(log['board_members'])}")
-                    for msg in log['messages']:
-                        st.write(f"{msg['role'].title()}: {msg['content']}")
+            show_usage()
     
     # Board Members Tab
     with board_tab:
@@ -294,4 +925,8 @@ def show_admin_panel(config):
             st.success("Interface translations updated successfully!")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        # Also runs when main() ends in st.rerun() or st.stop()
+        save_session()
@@ -0,0 +1,160 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds, shared by all phase timings
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+_counters = {}     # (name, labels) -> value
+_histograms = {}   # (name, labels) -> {'buckets': [...], 'sum': float, 'count': int}
+_ready = threading.Event()  # set once the process has warmed up
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+def increment(name, amount=1, **labels):
+    """Add to a counter, e.g. increment('board_chat_errors_total', type='request')"""
+    if not amount:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name, seconds, **labels):
+    """Record a duration in a histogram"""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram['buckets'][i] += 1
+                break
+        histogram['sum'] += seconds
+        histogram['count'] += 1
+
+def observe_phase(phase, seconds):
+    """Record the duration of one phase of a chat turn"""
+    observe('board_chat_phase_seconds', seconds, phase=phase)
+
+@contextmanager
+def span(phase):
+    """Time the enclosed block as a chat turn phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_phase(phase, time.perf_counter() - start)
+
+def record_usage(usage):
+    """Count tokens from an OpenRouter `usage` block"""
+    if not usage:
+        return
+    increment('board_chat_tokens_total', usage.get('prompt_tokens') or 0, direction='in')
+    increment('board_chat_tokens_total', usage.get('completion_tokens') or 0, direction='out')
+    # Prompt tokens served from the provider's prefix cache (a subset of 'in')
+    details = usage.get('prompt_tokens_details') or {}
+    increment('board_chat_tokens_total', details.get('cached_tokens') or 0, direction='cached')
+
+def snapshot():
+    """Copy of all counters and histograms"""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                      for key, h in _histograms.items()}
+    return counters, histograms
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+def render_prometheus():
+    """Render all metrics in the Prometheus text exposition format"""
+    counters, histograms = snapshot()
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, labels), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {histogram["count"]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {histogram["sum"]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+def render_json():
+    """Render all metrics as one structured JSON log line"""
+    counters, histograms = snapshot()
+    return json.dumps({
+        'ts': time.time(),
+        'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                     for (name, labels), value in counters.items()],
+        'histograms': [{'name': name, 'labels': dict(labels), 'count': h['count'], 'sum': h['sum']}
+                       for (name, labels), h in histograms.items()]
+    })
+
+def mark_ready():
+    """Report this process as ready on /ready (after its warm-up run)"""
+    _ready.set()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        if path == '/ready':
+            # Readiness probe: 503 until the warm-up run has finished
+            body = b'ready\n' if _ready.is_set() else b'warming up\n'
+            self.send_response(200 if _ready.is_set() else 503)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if path != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_metrics_server(port):
+    """Serve /metrics for Prometheus (and /ready for readiness probes) on a background thread"""
+    try:
+        server = ThreadingHTTPServer(('0.0.0.0', port), _MetricsHandler)
+    except OSError as e:
+        # Another Streamlit process on this host may already own the port
+        print(f"Metrics server not started on port {port}: {str(e)}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
+
+def start_json_logger(interval):
+    """Print a structured JSON metrics line every `interval` seconds"""
+    def run():
+        while True:
+            time.sleep(interval)
+            print(render_json(), flush=True)
+    thread = threading.Thread(target=run, name='metrics-logger', daemon=True)
+    thread.start()
+    return thread
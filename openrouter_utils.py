@@ -1,62 +1,728 @@
-import requests
 import json
-from config import OPENROUTER_API_KEY, OPENROUTER_URL, MODEL_CONFIG
+import queue
+import random
+import socket
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from config import (
+    OPENROUTER_API_KEY, OPENROUTER_URL, MODEL_CONFIG, OPENROUTER_HTTP_CONFIG, RESPONSE_CACHE_CONFIG,
+    FULL_BOARD_CONFIG, MODEL_ROUTES, HEDGE_CONFIG, PROMPT_CACHE_CONFIG
+)
+from response_cache import ResponseCache, make_cache_key
+from metrics_utils import increment, observe_phase, record_usage
+
+# Process-wide HTTP session and response cache, shared by all user sessions. Plain
+# lock-guarded singletons rather than st.cache_resource: they are used from turn,
+# advisor and hedge threads that have no Streamlit script context.
+_shared = {'http_session': None, 'response_cache': None}
+_shared_lock = threading.Lock()
+
+@lru_cache(maxsize=512)
+def _render_prompt(template, **fields):
+    """Format a prompt template; memoized since the same board is rendered on every turn"""
+    return template.format(**fields)
 
 def create_system_message(board_members, language, system_prompts):
     """Create a system message based on selected board members and language"""
     members_str = ', '.join(board_members)
-    return system_prompts[language].format(members=members_str)
+    # Keyed on the template text too, so edits in the admin panel take effect immediately
+    return _render_prompt(system_prompts[language], members=members_str)
+
+def create_advisor_message(member, board_members, language, advisor_prompts):
+    """Create the system message for one advisor answering on their own in full board mode"""
+    others = ', '.join(m for m in board_members if m != member)
+    return _render_prompt(advisor_prompts[language], member=member, members=others or member)
+
+def _with_prompt_cache_hints(data):
+    """Mark the leading system prompt as a cache breakpoint for providers with explicit caching.
+
+    Everything up to the breakpoint must stay byte-identical between turns, so the system
+    prompt is always the first message and the changing meeting summary comes after it.
+    """
+    messages = data.get("messages") or []
+    if (not PROMPT_CACHE_CONFIG["enabled"] or not messages or messages[0].get("role") != "system"
+            or not isinstance(messages[0].get("content"), str)
+            or not data.get("model", "").startswith(tuple(PROMPT_CACHE_CONFIG["cache_control_models"]))):
+        return data
+    system = {
+        "role": "system",
+        "content": [{"type": "text", "text": messages[0]["content"], "cache_control": {"type": "ephemeral"}}]
+    }
+    return dict(data, messages=[system, *messages[1:]])
+
+def _build_headers():
+    """Build the OpenRouter request headers"""
+    return {
+        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+        "HTTP-Referer": "http://localhost:8501",  # Required by OpenRouter
+        "X-Title": "Board of Directors Chat"      # Required by OpenRouter
+    }
+
+def get_http_session():
+    """The process-wide keep-alive HTTP session shared by all user sessions, created on first use"""
+    with _shared_lock:
+        if _shared['http_session'] is None:
+            # Imported on first use: requests and urllib3 are a large share of a cold start
+            import requests
+            from requests.adapters import HTTPAdapter
+            pool_size = OPENROUTER_HTTP_CONFIG["pool_size"]
+            session = requests.Session()
+            # Retries are handled in _post_with_retries so Retry-After and jitter apply
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(_build_headers())
+            _shared['http_session'] = session
+        return _shared['http_session']
+
+def warm_up_connections(session, count):
+    """Open `count` keep-alive connections to OpenRouter in the session's pool; returns how many answered.
+
+    Run at process start so the first turn doesn't pay for DNS and TLS setup. Each
+    connection is opened by a concurrent HEAD request, whose status doesn't matter.
+    """
+    timeout = (OPENROUTER_HTTP_CONFIG["connect_timeout"], OPENROUTER_HTTP_CONFIG["connect_timeout"])
+
+    def connect(_):
+        try:
+            session.head(OPENROUTER_URL, timeout=timeout).close()
+            return True
+        except Exception as e:
+            print(f"OpenRouter warm-up failed: {str(e)}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(count, 1), thread_name_prefix='warm-up') as executor:
+        opened = sum(executor.map(connect, range(count)))
+    increment('board_chat_warm_up_connections_total', opened)
+    return opened
+
+def get_response_cache():
+    """The process-wide response cache, created on first use, or None when caching is disabled"""
+    if not RESPONSE_CACHE_CONFIG["enabled"]:
+        return None
+    with _shared_lock:
+        if _shared['response_cache'] is None:
+            _shared['response_cache'] = ResponseCache(
+                max_entries=RESPONSE_CACHE_CONFIG["max_entries"],
+                ttl=RESPONSE_CACHE_CONFIG["ttl"],
+                disk_path=RESPONSE_CACHE_CONFIG["disk_path"]
+            )
+        return _shared['response_cache']
+
+def _cache_lookup(data, use_cache):
+    """Return (cache, key, cached reply) for a request payload; cache is None when bypassed"""
+    cache = get_response_cache() if use_cache else None
+    if not cache:
+        return None, None, None
+    key = make_cache_key(data["model"], data["temperature"], data["messages"])
+    cached = cache.get(key)
+    increment('board_chat_cache_lookups_total', result='miss' if cached is None else 'hit')
+    return cache, key, cached
 
-def get_chat_response(messages, board_members, language, system_prompts):
-    """Get response from OpenRouter API"""
+def _backoff_delay(attempt):
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    cap = min(OPENROUTER_HTTP_CONFIG["backoff_max"], OPENROUTER_HTTP_CONFIG["backoff_base"] * (2 ** attempt))
+    return random.uniform(0, cap)
+
+def _retry_after_delay(response):
+    """Parse a Retry-After header (seconds or HTTP date), or return None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
     try:
-        system_message = create_system_message(board_members, language, system_prompts)
-        
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "http://localhost:8501",  # Required by OpenRouter
-            "X-Title": "Board of Directors Chat"      # Required by OpenRouter
-        }
-        
-        # Prepare messages with system message and full chat history
-        full_messages = [
-            {"role": "system", "content": system_message},
-            *messages  # Include entire chat history
-        ]
-        
-        data = {
-            "model": MODEL_CONFIG["model"],
-            "temperature": MODEL_CONFIG["temperature"],
-            "messages": full_messages
-        }
-        
-        response = requests.post(OPENROUTER_URL, headers=headers, json=data)
-        response.raise_for_status()
-        
-        response_data = response.json()
-        
-        if 'error' in response_data:
-            error_details = response_data['error']
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return max(0.0, min(delay, OPENROUTER_HTTP_CONFIG["retry_after_max"]))
+
+def _post_with_retries(data, read_timeout=None, deadline=None):
+    """POST to OpenRouter over the pooled session, retrying on 429/5xx and connection errors.
+
+    No retry is started that would begin after `deadline` (a time.monotonic() value).
+    """
+    import requests
+    session = get_http_session()
+    data = _with_prompt_cache_hints(data)
+    timeout = (OPENROUTER_HTTP_CONFIG["connect_timeout"], read_timeout or OPENROUTER_HTTP_CONFIG["read_timeout"])
+    max_retries = OPENROUTER_HTTP_CONFIG["max_retries"]
+    start = time.perf_counter()
+
+    for attempt in range(max_retries + 1):
+        try:
+            # Always stream the body so time-to-first-byte is measured at the headers
+            response = session.post(OPENROUTER_URL, json=data, timeout=timeout, stream=True)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            delay = _backoff_delay(attempt)
+            if attempt >= max_retries or (deadline and time.monotonic() + delay >= deadline):
+                raise
+            increment('board_chat_retries_total', reason=e.__class__.__name__)
+            print(f"OpenRouter connection error ({str(e)}), retrying in {delay:.2f}s")
+        else:
+            delay = _retry_after_delay(response)
+            if delay is None:
+                delay = _backoff_delay(attempt)
+            if (response.status_code not in OPENROUTER_HTTP_CONFIG["retry_statuses"] or attempt >= max_retries
+                    or (deadline and time.monotonic() + delay >= deadline)):
+                observe_phase('upstream_ttfb', time.perf_counter() - start)
+                try:
+                    response.raise_for_status()
+                except requests.exceptions.HTTPError:
+                    # Nobody will read the body, so give the connection back to the pool
+                    response.close()
+                    raise
+                return response
+            increment('board_chat_retries_total', reason=str(response.status_code))
+            print(f"OpenRouter returned {response.status_code}, retrying in {delay:.2f}s")
+            response.close()
+        time.sleep(delay)
+
+def _build_payload(messages, board_members, language, system_prompts, stream=False):
+    """Build the OpenRouter request body for the given chat history"""
+    system_message = create_system_message(board_members, language, system_prompts)
+    return _build_request_body(system_message, messages, stream)
+
+def _build_request_body(system_message, messages, stream=False):
+    """Build the OpenRouter request body from a rendered system message and chat context"""
+    # The system prompt goes first so the prompt prefix is stable and cacheable upstream
+    full_messages = [
+        {"role": "system", "content": system_message},
+        *messages  # Include chat context (recent window plus any summary)
+    ]
+
+    data = {
+        "model": MODEL_CONFIG["model"],
+        "temperature": MODEL_CONFIG["temperature"],
+        "messages": full_messages,
+        "usage": {"include": True}  # token counts, also on the last chunk of a stream
+    }
+    if stream:
+        data["stream"] = True
+    return data
+
+def _error_message(language, kind):
+    """Return the user-facing apology for an API ('request') or processing error"""
+    if kind == "request":
+        return ("I apologize, but I encountered an error while connecting to the API." if language == "English"
+                else "Извините, произошла ошибка при подключении к API.")
+    return ("I apologize, but I encountered an error while processing your request." if language == "English"
+            else "Извините, произошла ошибка при обработке вашего запроса.")
+
+def add_usage(total, usage):
+    """Add an OpenRouter `usage` block into a running total (token counts and cost)"""
+    if not usage:
+        return total
+    for key in ('prompt_tokens', 'completion_tokens', 'total_tokens', 'cost'):
+        if usage.get(key):
+            total[key] = total.get(key, 0) + usage[key]
+    cached = (usage.get('prompt_tokens_details') or {}).get('cached_tokens')
+    if cached:
+        details = total.setdefault('prompt_tokens_details', {})
+        details['cached_tokens'] = details.get('cached_tokens', 0) + cached
+    return total
+
+def _complete(data, read_timeout=None, deadline=None, usage=None, call=None):
+    """Send a non-streaming request and return the reply content; raises on any failure.
+
+    If a `usage` dict is given, the reply's token usage is added to it. If an
+    _AdvisorCall is given, the response is attached to it so it can be abandoned.
+    """
+    start = time.perf_counter()
+    response = _post_with_retries(data, read_timeout, deadline)
+    if call is not None:
+        call.attach(response)
+    parse_start = time.perf_counter()
+    response_data = response.json()
+
+    if 'error' in response_data:
+        error_details = response_data['error']
+        print(f"OpenRouter API Error: {json.dumps(error_details, indent=2)}")
+        raise Exception(f"API Error: {error_details.get('message', 'Unknown error')}")
+
+    if 'choices' not in response_data:
+        print(f"Unexpected API Response: {json.dumps(response_data, indent=2)}")
+        raise Exception("API response missing 'choices' field")
+
+    content = response_data['choices'][0]['message']['content']
+    now = time.perf_counter()
+    observe_phase('response_parse', now - parse_start)
+    observe_phase('upstream_total', now - start)
+    record_usage(response_data.get('usage'))
+    if usage is not None:
+        add_usage(usage, response_data.get('usage'))
+    return content
+
+def _route_body(data, route):
+    """Request body for one model route"""
+    body = dict(data, model=route["model"])
+    if route.get("provider"):
+        body["provider"] = route["provider"]
+    return body
+
+def _complete_with_failover(data, meta):
+    """Non-streaming completion over MODEL_ROUTES, moving to the next model on error.
+
+    A route's first-token timeout can't be observed on a blocking request, and applying
+    it to the whole reply would cut off long answers, so each route gets the regular
+    read timeout (OPENROUTER_READ_TIMEOUT) between bytes instead.
+    """
+    error = None
+    for route in MODEL_ROUTES:
+        try:
+            usage = {}
+            content = _complete(_route_body(data, route), usage=usage)
+            meta['model'] = route["model"]
+            meta['usage'] = usage
+            return content
+        except Exception as e:
+            error = e
+            print(f"Model {route['model']} failed ({str(e)}), trying the next route")
+            increment('board_chat_failovers_total', model=route["model"])
+    raise error
+
+def get_chat_response(messages, board_members, language, system_prompts, use_cache=True, meta=None):
+    """Get response from OpenRouter API (served from the response cache when enabled).
+
+    If a `meta` dict is given, it is filled with the model that answered, the latency
+    and token usage.
+    """
+    import requests
+    meta = meta if meta is not None else {}
+    try:
+        start = time.perf_counter()
+        data = _build_payload(messages, board_members, language, system_prompts)
+        cache, cache_key, cached = _cache_lookup(data, use_cache)
+        if cached is not None:
+            meta.update(model='cache', latency_ms=0)
+            return cached
+
+        content = _complete_with_failover(data, meta)
+        meta['latency_ms'] = round((time.perf_counter() - start) * 1000)
+        if cache:
+            cache.put(cache_key, content)
+        return content
+
+    except requests.exceptions.RequestException as e:
+        print(f"OpenRouter API Request Error: {str(e)}")
+        if hasattr(e.response, 'text'):
+            print(f"Response content: {e.response.text}")
+        increment('board_chat_errors_total', type=e.__class__.__name__)
+        return _error_message(language, "request")
+
+    except Exception as e:
+        print(f"OpenRouter Processing Error: {str(e)}")
+        increment('board_chat_errors_total', type=e.__class__.__name__)
+        return _error_message(language, "processing")
+
+def _iter_sse_chunks(response, usage=None, first_token_deadline=None, cancel=None):
+    """Yield content deltas from an OpenRouter server-sent events response.
+
+    If a `usage` dict is given, it is filled from the usage block on the final chunk.
+    Raises TimeoutError when no content has arrived by `first_token_deadline`
+    (OpenRouter's keep-alive comments would otherwise hide a stall from the read
+    timeout), and stops quietly once `cancel` is set.
+    """
+    # SSE responses usually carry no charset, and requests would fall back to latin-1
+    response.encoding = 'utf-8'
+    received = False
+    for line in response.iter_lines(decode_unicode=True):
+        if cancel is not None and cancel.is_set():
+            return
+        if not received and first_token_deadline and time.monotonic() > first_token_deadline:
+            raise TimeoutError("No first token before the model timeout")
+
+        # Blank lines separate events, lines starting with ':' are keep-alive comments
+        if not line or line.startswith(':') or not line.startswith('data:'):
+            continue
+
+        payload = line[len('data:'):].strip()
+        if payload == '[DONE]':
+            return
+
+        chunk = json.loads(payload)
+        if 'error' in chunk:
+            error_details = chunk['error']
             print(f"OpenRouter API Error: {json.dumps(error_details, indent=2)}")
             raise Exception(f"API Error: {error_details.get('message', 'Unknown error')}")
-            
-        if 'choices' not in response_data:
-            print(f"Unexpected API Response: {json.dumps(response_data, indent=2)}")
-            raise Exception("API response missing 'choices' field")
-            
-        return response_data['choices'][0]['message']['content']
-        
+
+        if usage is not None and chunk.get('usage'):
+            usage.update(chunk['usage'])
+
+        choices = chunk.get('choices') or []
+        if not choices:
+            continue
+        content = (choices[0].get('delta') or {}).get('content')
+        if content:
+            received = True
+            yield content
+
+def _stream_route(data, route, usage, cancel=None):
+    """Stream one model route; raises on errors or when no first token arrives within its timeout"""
+    deadline = time.monotonic() + route["timeout"]
+    with _post_with_retries(_route_body(data, route), read_timeout=route["timeout"], deadline=deadline) as response:
+        yield from _iter_sse_chunks(response, usage, first_token_deadline=deadline, cancel=cancel)
+
+def _failover_stream(data, meta):
+    """Stream from the first model route that produces a token, trying MODEL_ROUTES in order.
+
+    Once a token has been yielded the model can't be switched, so later errors propagate.
+    """
+    error = None
+    for route in MODEL_ROUTES:
+        usage = {}
+        received = False
+        try:
+            for content in _stream_route(data, route, usage):
+                if not received:
+                    meta['model'] = route["model"]
+                received = True
+                yield content
+            if not received:
+                raise Exception("API stream ended without any content")
+            meta['usage'] = usage
+            return
+        except Exception as e:
+            if received:
+                raise
+            error = e
+            print(f"Model {route['model']} failed before its first token ({str(e)}), trying the next route")
+            increment('board_chat_failovers_total', model=route["model"])
+    raise error
+
+def _hedged_stream(data, meta):
+    """Race MODEL_ROUTES: if no first token arrives by the hedge threshold, start the next route too.
+
+    The first route to produce a token wins and the others are cancelled. Routes that
+    fail before their first token are replaced by the next route, as in _failover_stream.
+    """
+    events = queue.Queue()
+    cancels = []
+    threshold = HEDGE_CONFIG["first_token_threshold"]
+
+    def launch(index):
+        cancel = threading.Event()
+        cancels.append(cancel)
+
+        def run():
+            usage = {}
+            try:
+                for content in _stream_route(data, MODEL_ROUTES[index], usage, cancel):
+                    events.put((index, 'chunk', content))
+                events.put((index, 'done', usage))
+            except Exception as e:
+                events.put((index, 'error', e))
+
+        threading.Thread(target=run, name=f'hedge-{index}', daemon=True).start()
+
+    launch(0)
+    launched, failed, winner = 1, 0, None
+    hedge_at = time.monotonic() + threshold
+    try:
+        while True:
+            timeout = None
+            if winner is None and launched < len(MODEL_ROUTES):
+                timeout = max(0, hedge_at - time.monotonic())
+            try:
+                index, kind, value = events.get(timeout=timeout)
+            except queue.Empty:
+                print(f"No first token after {threshold}s, hedging with {MODEL_ROUTES[launched]['model']}")
+                increment('board_chat_hedged_requests_total')
+                meta['hedged'] = True
+                launch(launched)
+                launched += 1
+                hedge_at = time.monotonic() + threshold
+                continue
+
+            if winner is None:
+                if kind == 'chunk':
+                    winner = index
+                    meta['model'] = MODEL_ROUTES[index]["model"]
+                    for i, cancel in enumerate(cancels):
+                        if i != index:
+                            cancel.set()
+                    yield value
+                    continue
+
+                # This route ended before its first token
+                error = value if kind == 'error' else Exception("API stream ended without any content")
+                print(f"Model {MODEL_ROUTES[index]['model']} failed before its first token ({str(error)})")
+                increment('board_chat_failovers_total', model=MODEL_ROUTES[index]["model"])
+                failed += 1
+                if failed == launched:
+                    if launched == len(MODEL_ROUTES):
+                        raise error
+                    launch(launched)
+                    launched += 1
+                    hedge_at = time.monotonic() + threshold
+            elif index == winner:
+                if kind == 'chunk':
+                    yield value
+                elif kind == 'done':
+                    meta['usage'] = value
+                    return
+                else:
+                    raise value
+    finally:
+        for cancel in cancels:
+            cancel.set()
+
+def _fill_missing_usage(meta, data, chunks):
+    """Estimate the usage of a streamed reply whose final usage chunk never arrived"""
+    if not chunks or meta.get('usage'):
+        return
+    # Imported here: context_utils imports this module
+    from context_utils import count_tokens
+    prompt_tokens = sum(count_tokens({'content': msg['content']}) for msg in data['messages'])
+    completion_tokens = count_tokens({'content': ''.join(chunks)})
+    meta['usage'] = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                     'total_tokens': prompt_tokens + completion_tokens}
+    meta['usage_estimated'] = True
+    record_usage(meta['usage'])
+
+def stream_chat_response(messages, board_members, language, system_prompts, use_cache=True, meta=None):
+    """Stream response from OpenRouter API, yielding content chunks as they arrive.
+
+    If a `meta` dict is given, it is filled with the model that answered, time to first
+    token, total latency and token usage once the stream ends. The provider bills what
+    it streamed even when the stream breaks off, so if no usage was reported by then
+    it is estimated from the prompt and the partial reply (`usage_estimated` is set).
+    """
+    import requests
+    meta = meta if meta is not None else {}
+    received = False
+    chunks = []
+    try:
+        data = _build_payload(messages, board_members, language, system_prompts, stream=True)
+        cache, cache_key, cached = _cache_lookup(data, use_cache)
+        if cached is not None:
+            meta.update(model='cache', ttft_ms=0, latency_ms=0)
+            yield cached
+            return
+
+        start = time.perf_counter()
+        hedged = HEDGE_CONFIG["enabled"] and len(MODEL_ROUTES) > 1
+        for content in (_hedged_stream(data, meta) if hedged else _failover_stream(data, meta)):
+            if not received:
+                ttft = time.perf_counter() - start
+                observe_phase('upstream_ttft', ttft)
+                meta['ttft_ms'] = round(ttft * 1000)
+            received = True
+            chunks.append(content)
+            yield content
+
+        total = time.perf_counter() - start
+        observe_phase('upstream_total', total)
+        meta['latency_ms'] = round(total * 1000)
+        if meta.get('usage'):
+            record_usage(meta['usage'])
+        else:
+            _fill_missing_usage(meta, data, chunks)
+        # Only complete, error-free replies are cached
+        if cache:
+            cache.put(cache_key, ''.join(chunks))
+
     except requests.exceptions.RequestException as e:
         print(f"OpenRouter API Request Error: {str(e)}")
         if hasattr(e.response, 'text'):
             print(f"Response content: {e.response.text}")
-        error_msg = ("I apologize, but I encountered an error while connecting to the API." if language == "English" 
-                    else "Извините, произошла ошибка при подключении к API.")
-        return error_msg
-        
+        increment('board_chat_errors_total', type=e.__class__.__name__)
+        _fill_missing_usage(meta, data, chunks)
+        yield ("\n\n" if received else "") + _error_message(language, "request")
+
     except Exception as e:
         print(f"OpenRouter Processing Error: {str(e)}")
-        error_msg = ("I apologize, but I encountered an error while processing your request." if language == "English" 
-                    else "Извините, произошла ошибка при обработке вашего запроса.")
-        return error_msg
+        increment('board_chat_errors_total', type=e.__class__.__name__)
+        _fill_missing_usage(meta, data, chunks)
+        yield ("\n\n" if received else "") + _error_message(language, "processing")
+
+def summarize_conversation(summary, messages, language, summary_prompts, model, max_tokens, timeout=None,
+                           usage=None):
+    """Fold new messages into a running meeting summary, or return None on failure.
+
+    The summary is built while the user waits for their turn, so with a `timeout` no
+    retry starts after it and the request fails once that long passes without data.
+    If a `usage` dict is given, the request's token usage is added to it.
+    """
+    try:
+        transcript = '\n\n'.join(f"{msg['role'].title()}: {msg['content']}" for msg in messages)
+        data = {
+            "model": model,
+            "temperature": 0,
+            "max_tokens": max_tokens,
+            "messages": [
+                {"role": "system", "content": summary_prompts[language].format(max_tokens=max_tokens)},
+                {"role": "user", "content": f"Existing summary:\n{summary or '-'}\n\nNew exchanges:\n{transcript}"}
+            ]
+        }
+
+        deadline = time.monotonic() + timeout if timeout else None
+        response_data = _post_with_retries(data, read_timeout=timeout, deadline=deadline).json()
+        if 'error' in response_data or 'choices' not in response_data:
+            print(f"Unexpected summary response: {json.dumps(response_data, indent=2)}")
+            return None
+
+        record_usage(response_data.get('usage'))
+        if usage is not None:
+            add_usage(usage, response_data.get('usage'))
+        return response_data['choices'][0]['message']['content'].strip()
+
+    except Exception as e:
+        print(f"OpenRouter Summary Error: {str(e)}")
+        return None
+
+def _abort_response(response):
+    """Stop a response that another thread may be blocked reading.
+
+    Closing it would wait for that read to finish, so the socket is shut down
+    instead: the pending read returns at once and the connection is discarded.
+    """
+    try:
+        # The connection drops its socket early when the server will close it; the body's
+        # file object still holds it then
+        sock = getattr(response.raw.connection, 'sock', None) or response.raw._fp.fp.raw._sock
+        sock.shutdown(socket.SHUT_RDWR)
+    except (AttributeError, OSError):
+        # Already finished and returned to the pool
+        pass
+
+class _AdvisorCall:
+    """One advisor's request, which the turn can give up on from another thread.
+
+    `started` is set when the request actually begins, so advisors queued behind the
+    concurrency limit get their full time as well. abandon() stops a request that is
+    still queued or retrying, and closes the response of one that is being read.
+    """
+
+    def __init__(self):
+        self.started = None
+        self.cancel = threading.Event()
+        self._response = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.cancel.is_set():
+            raise TimeoutError("Advisor was given up on before starting")
+        self.started = time.monotonic()
+        return self.started + FULL_BOARD_CONFIG["advisor_timeout"]
+
+    def attach(self, response):
+        with self._lock:
+            if self.cancel.is_set():
+                response.close()
+                raise TimeoutError("Advisor was given up on")
+            self._response = response
+
+    def abandon(self):
+        with self._lock:
+            self.cancel.set()
+            response = self._response
+        if response is not None:
+            _abort_response(response)
+
+def _get_advisor_response(member, messages, board_members, language, advisor_prompts, use_cache, usage, call):
+    """One advisor's reply for full board mode, adding its token usage to `usage`; raises on failure"""
+    deadline = call.start()
+    system_message = create_advisor_message(member, board_members, language, advisor_prompts)
+    data = _build_request_body(system_message, messages)
+    data["max_tokens"] = FULL_BOARD_CONFIG["max_tokens"]
+    cache, cache_key, cached = _cache_lookup(data, use_cache)
+    if cached is not None:
+        return cached
+
+    content = _complete(data, read_timeout=FULL_BOARD_CONFIG["advisor_timeout"], deadline=deadline, usage=usage,
+                        call=call)
+    if not content or not content.strip():
+        raise Exception("Empty advisor reply")
+    if cache:
+        cache.put(cache_key, content)
+    return content
+
+def iter_board_responses(messages, board_members, language, advisor_prompts, use_cache=True, meta=None):
+    """Ask every advisor concurrently, yielding (member, content) as each finishes.
+
+    Advisors that fail, run past FULL_BOARD_ADVISOR_TIMEOUT from their own start or
+    are still running when the turn timeout ends the turn are yielded with content
+    None, so the turn still succeeds with whoever answered. An advisor that runs out
+    of time is given up on even while its reply is still arriving. If a `meta` dict
+    is given, it is filled with the model, total latency and the token usage of all
+    advisors together.
+    """
+    meta = meta if meta is not None else {}
+    start = time.perf_counter()
+    usages = {member: {} for member in board_members}
+    calls = {member: _AdvisorCall() for member in board_members}
+    advisor_timeout = FULL_BOARD_CONFIG["advisor_timeout"]
+    turn_deadline = time.monotonic() + FULL_BOARD_CONFIG["turn_timeout"]
+    workers = max(1, min(FULL_BOARD_CONFIG["max_concurrency"], len(board_members)))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='advisor')
+    try:
+        pending = {
+            executor.submit(
+                _get_advisor_response, member, messages, board_members, language, advisor_prompts, use_cache,
+                usages[member], calls[member]
+            ): member
+            for member in board_members
+        }
+        while pending:
+            now = time.monotonic()
+            for future, member in list(pending.items()):
+                started = calls[member].started
+                if started is not None and now - started >= advisor_timeout and not future.done():
+                    del pending[future]
+                    calls[member].abandon()
+                    print(f"Advisor {member} timed out")
+                    increment('board_chat_advisor_results_total', result='timeout')
+                    yield member, None
+            if not pending or now >= turn_deadline:
+                break
+
+            # Wake up for the next advisor deadline; poll while some haven't started yet
+            wake = turn_deadline
+            for member in pending.values():
+                started = calls[member].started
+                wake = min(wake, started + advisor_timeout if started is not None else now + 0.25)
+            done, _ = wait(pending, timeout=max(0, wake - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                member = pending.pop(future)
+                try:
+                    content = future.result()
+                    increment('board_chat_advisor_results_total', result='ok')
+                except Exception as e:
+                    print(f"Advisor {member} failed: {str(e)}")
+                    increment('board_chat_advisor_results_total', result='error')
+                    content = None
+                yield member, content
+
+        # Whoever is still running or queued missed the turn timeout
+        for member in pending.values():
+            calls[member].abandon()
+            print(f"Advisor {member} timed out")
+            increment('board_chat_advisor_results_total', result='timeout')
+            yield member, None
+
+        meta['model'] = MODEL_CONFIG["model"]
+        meta['latency_ms'] = round((time.perf_counter() - start) * 1000)
+        meta['usage'] = {}
+        for usage in usages.values():
+            add_usage(meta['usage'], usage)
+    finally:
+        # Don't wait for stragglers; abandoned requests end as soon as their response is closed
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def format_advisor_section(member, content):
+    """Attributed transcript section for one advisor"""
+    return f"**{member}:** {content.strip()}"
+
+def merge_board_responses(board_members, responses, language):
+    """Merge advisor replies into one transcript in board order, skipping those who didn't answer"""
+    sections = [format_advisor_section(member, responses[member]) for member in board_members if responses.get(member)]
+    if not sections:
+        return _error_message(language, "request")
+    return '\n\n'.join(sections)
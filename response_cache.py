@@ -0,0 +1,113 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from sqlite_utils import connect_sqlite
+
+def make_cache_key(model, temperature, messages):
+    """Canonical hash of everything that determines a completion.
+
+    `messages` is the full upstream message list, so the rendered system prompt
+    (board members and language) is part of the key.
+    """
+    canonical = json.dumps(
+        {
+            'model': model,
+            'temperature': temperature,
+            'messages': [{'role': msg['role'], 'content': msg['content']} for msg in messages]
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ResponseCache:
+    """Exact-match completion cache: bounded in-memory LRU with an optional SQLite tier.
+
+    Entries expire after `ttl` seconds in both tiers. Only successful replies should
+    be stored; callers are responsible for not caching apology/error text.
+    """
+
+    def __init__(self, max_entries=1000, ttl=86400, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self._memory = OrderedDict()  # key -> (stored_at, value), least recently used first
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+        if disk_path:
+            with connect_sqlite(self.disk_path) as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS responses ('
+                    'key TEXT PRIMARY KEY, stored_at REAL NOT NULL, value TEXT NOT NULL)'
+                )
+
+    def get(self, key):
+        """Return the cached reply for key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._memory.move_to_end(key)
+                self._stats['hits'] += 1
+                self._stats['memory_hits'] += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+
+        row = self._disk_get(key, now)
+        with self._lock:
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['disk_hits'] += 1
+            self._remember(key, *row)
+        return row[1]
+
+    def put(self, key, value):
+        """Store a successful reply in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._stats['stores'] += 1
+        if self.disk_path:
+            try:
+                with connect_sqlite(self.disk_path) as conn:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO responses (key, stored_at, value) VALUES (?, ?, ?)',
+                        (key, now, value)
+                    )
+                    conn.execute('DELETE FROM responses WHERE stored_at < ?', (now - self.ttl,))
+            except Exception as e:
+                print(f"Error writing response cache: {str(e)}")
+
+    def stats(self):
+        """Hit/miss counters, hit rate and in-memory size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._memory)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def _remember(self, key, stored_at, value):
+        self._memory[key] = (stored_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key, now):
+        if not self.disk_path:
+            return None
+        try:
+            with connect_sqlite(self.disk_path) as conn:
+                return conn.execute(
+                    'SELECT stored_at, value FROM responses WHERE key = ? AND stored_at >= ?',
+                    (key, now - self.ttl)
+                ).fetchone()
+        except Exception as e:
+            print(f"Error reading response cache: {str(e)}")
+            return None
@@ -0,0 +1,220 @@
+import json
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from config import SEARCH_INDEX_CONFIG
+from firebase_utils import get_conversation_page, get_conversation_messages, decode_message
+from sqlite_utils import connect_sqlite
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS chats ('
+    'user_id TEXT PRIMARY KEY, timestamp TEXT NOT NULL, language TEXT, '
+    'board_members TEXT NOT NULL DEFAULT \'[]\', message_count INTEGER NOT NULL DEFAULT 0)',
+    'CREATE INDEX IF NOT EXISTS chats_timestamp ON chats (timestamp)',
+    'CREATE INDEX IF NOT EXISTS chats_language ON chats (language, timestamp)',
+    'CREATE TABLE IF NOT EXISTS chat_members ('
+    'member TEXT NOT NULL, user_id TEXT NOT NULL, PRIMARY KEY (member, user_id))',
+    'CREATE TABLE IF NOT EXISTS messages ('
+    'id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, idx INTEGER NOT NULL, role TEXT, content TEXT, '
+    'UNIQUE (user_id, idx))',
+    # External-content FTS table over messages.content, kept in sync by the triggers below
+    'CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5('
+    'content, content=\'messages\', content_rowid=\'id\', tokenize=\'unicode61 remove_diacritics 2\')',
+    'CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN '
+    'INSERT INTO messages_fts (rowid, content) VALUES (new.id, new.content); END',
+    'CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN '
+    'INSERT INTO messages_fts (messages_fts, rowid, content) VALUES (\'delete\', old.id, old.content); END',
+)
+
+_MESSAGE_PATH = re.compile(r'^chats/([^/]+)/messages/(\d+)$')
+_INDEX_PATH = re.compile(r'^chat_index/([^/]+)/([^/]+)$')
+
+def _match_expression(text):
+    """Turn free text into an FTS5 query: every word must appear, the last one as a prefix"""
+    terms = [term.replace('"', '""') for term in text.split()]
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+class SearchIndex:
+    """Local full-text index over logged conversations (SQLite FTS5).
+
+    Fed with the same multi-path updates the app writes to Firebase (see
+    firebase_utils.build_log_update), so it grows incrementally with every turn.
+    Search is ranked by BM25 over message content and filtered by the facets
+    board member, language and date, without reading the Firebase `chats` tree.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with connect_sqlite(self.path) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            for statement in _SCHEMA:
+                conn.execute(statement)
+
+    def add_update(self, update):
+        """Index a root-relative log update: new messages plus chat metadata"""
+        chats = {}
+        messages = []
+        for path, value in update.items():
+            match = _MESSAGE_PATH.match(path)
+            if match and isinstance(value, dict):
+                msg = decode_message(value)
+                messages.append((match.group(1), int(match.group(2)), msg.get('role'), msg.get('content')))
+                continue
+            match = _INDEX_PATH.match(path)
+            if match:
+                chats.setdefault(match.group(1), {})[match.group(2)] = value
+        with connect_sqlite(self.path) as conn:
+            for user_id, metadata in chats.items():
+                self._upsert_chat(conn, user_id, metadata)
+            self._insert_messages(conn, messages)
+
+    def add_chat(self, user_id, metadata, messages):
+        """Index one whole chat, e.g. when rebuilding from Firebase"""
+        with connect_sqlite(self.path) as conn:
+            self._upsert_chat(conn, user_id, metadata)
+            self._insert_messages(conn, [
+                (user_id, i, msg.get('role'), msg.get('content')) for i, msg in enumerate(messages)
+            ])
+
+    def search(self, text='', members=(), language=None, date_from=None, date_to=None, limit=20, offset=0):
+        """Return (hits, total) for the query and facet filters, best match first.
+
+        Without search text, matching chats are returned newest first. `date_from`
+        and `date_to` are inclusive dates. Each hit carries the chat metadata and,
+        for text searches, a highlighted snippet of its best matching message.
+        """
+        where, params = ['1'], []
+        if members:
+            where.append(
+                'c.user_id IN (SELECT user_id FROM chat_members WHERE member IN '
+                f'({",".join("?" * len(members))}) GROUP BY user_id HAVING COUNT(*) = ?)'
+            )
+            params += [*members, len(members)]
+        if language:
+            where.append('c.language = ?')
+            params.append(language)
+        if date_from:
+            where.append('c.timestamp >= ?')
+            params.append(date_from.isoformat())
+        if date_to:
+            where.append('c.timestamp < ?')
+            params.append((date_to + timedelta(days=1)).isoformat())
+        filters = ' AND '.join(where)
+
+        expression = _match_expression(text or '')
+        with connect_sqlite(self.path) as conn:
+            if expression:
+                # Rank every matching message, then keep the best (lowest BM25) one per chat;
+                # SQLite returns the snippet from the row that has the MIN() score
+                ranked = (
+                    'WITH ranked AS MATERIALIZED ('
+                    'SELECT rowid AS id, bm25(messages_fts) AS score, '
+                    'snippet(messages_fts, 0, \'**\', \'**\', \'…\', 12) AS snippet '
+                    'FROM messages_fts WHERE messages_fts MATCH ?), '
+                    'hit AS (SELECT m.user_id AS user_id, MIN(r.score) AS score, r.snippet AS snippet '
+                    'FROM ranked r JOIN messages m ON m.id = r.id GROUP BY m.user_id) '
+                )
+                base = f'FROM hit JOIN chats c ON c.user_id = hit.user_id WHERE {filters}'
+                params = [expression, *params]
+                total = conn.execute(f'{ranked}SELECT COUNT(*) {base}', params).fetchone()[0]
+                rows = conn.execute(
+                    f'{ranked}SELECT c.user_id, c.timestamp, c.language, c.board_members, c.message_count, hit.snippet '
+                    f'{base} ORDER BY hit.score, c.timestamp DESC LIMIT ? OFFSET ?',
+                    [*params, limit, offset]
+                ).fetchall()
+            else:
+                base = f'FROM chats c WHERE {filters}'
+                total = conn.execute(f'SELECT COUNT(*) {base}', params).fetchone()[0]
+                rows = conn.execute(
+                    'SELECT c.user_id, c.timestamp, c.language, c.board_members, c.message_count, NULL '
+                    f'{base} ORDER BY c.timestamp DESC LIMIT ? OFFSET ?',
+                    [*params, limit, offset]
+                ).fetchall()
+
+        hits = [{
+            'user_id': user_id,
+            'timestamp': datetime.fromisoformat(timestamp),
+            'language': language,
+            'board_members': json.loads(board_members),
+            'message_count': message_count,
+            'snippet': snippet
+        } for user_id, timestamp, language, board_members, message_count, snippet in rows]
+        return hits, total
+
+    def facets(self):
+        """Values available for the facet filters: languages and board members"""
+        with connect_sqlite(self.path) as conn:
+            languages = [row[0] for row in conn.execute(
+                'SELECT DISTINCT language FROM chats WHERE language IS NOT NULL ORDER BY language')]
+            members = [row[0] for row in conn.execute('SELECT DISTINCT member FROM chat_members ORDER BY member')]
+        return {'languages': languages, 'members': members}
+
+    def stats(self):
+        """Number of indexed chats and messages"""
+        with connect_sqlite(self.path) as conn:
+            chats = conn.execute('SELECT COUNT(*) FROM chats').fetchone()[0]
+            messages = conn.execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+        return {'chats': chats, 'messages': messages}
+
+    def _upsert_chat(self, conn, user_id, metadata):
+        current = conn.execute(
+            'SELECT timestamp, language, board_members, message_count FROM chats WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        timestamp, language, board_members, message_count = current or (
+            datetime.utcnow().isoformat(), None, '[]', 0)
+        board_members = json.loads(board_members)
+        timestamp = metadata.get('timestamp', timestamp)
+        language = metadata.get('language', language)
+        board_members = metadata.get('board_members', board_members)
+        message_count = metadata.get('message_count', message_count)
+        conn.execute(
+            'INSERT OR REPLACE INTO chats (user_id, timestamp, language, board_members, message_count) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (user_id, timestamp, language, json.dumps(board_members, ensure_ascii=False), message_count)
+        )
+        if 'board_members' in metadata:
+            conn.execute('DELETE FROM chat_members WHERE user_id = ?', (user_id,))
+            conn.executemany(
+                'INSERT OR IGNORE INTO chat_members (member, user_id) VALUES (?, ?)',
+                [(member, user_id) for member in board_members]
+            )
+
+    def _insert_messages(self, conn, messages):
+        # Logged messages never change, so re-indexing the same (chat, index) is a no-op
+        conn.executemany(
+            'INSERT OR IGNORE INTO messages (user_id, idx, role, content) VALUES (?, ?, ?, ?)',
+            [msg for msg in messages if msg[3]]
+        )
+
+def rebuild_search_index(ref, index, page_size=100):
+    """Index every chat listed in Firebase's chat_index, one page at a time; returns how many"""
+    indexed = 0
+    cursor = None
+    while True:
+        page, cursor = get_conversation_page(ref, page_size, cursor)
+        for log in page:
+            metadata = {
+                'timestamp': log['timestamp'].isoformat(),
+                'board_members': log['board_members'],
+                'language': log['language'],
+                'message_count': log['message_count']
+            }
+            index.add_chat(log['user_id'], metadata, get_conversation_messages(ref, log['user_id']))
+            indexed += 1
+        if not cursor:
+            return indexed
+
+def create_search_index(config=SEARCH_INDEX_CONFIG):
+    """Open the configured search index, or None when it is disabled or unavailable"""
+    if not config["enabled"]:
+        return None
+    try:
+        return SearchIndex(config["path"])
+    except sqlite3.Error as e:
+        # e.g. an SQLite build without FTS5
+        print(f"Search index not available: {str(e)}")
+        return None
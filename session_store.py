@@ -0,0 +1,131 @@
+import hashlib
+import json
+import secrets
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from config import SESSION_STORE_CONFIG
+from sqlite_utils import connect_sqlite
+
+# Session state that makes up a meeting; everything else is UI state and is rebuilt on load
+SESSION_KEYS = ('messages', 'context', 'logged_count', 'user_id', 'language', 'custom_members', 'pending_turn',
+                'session_tokens')
+
+def new_session_token():
+    """Random, URL-safe token identifying one browser session"""
+    return secrets.token_urlsafe(16)
+
+def serialize_session(state):
+    """Compact, compressed snapshot of the persisted session keys"""
+    snapshot = {key: state[key] for key in SESSION_KEYS if key in state}
+    # Token counts cached on messages by context_utils are cheap to recompute
+    snapshot['messages'] = [{k: v for k, v in msg.items() if k != 'tokens'}
+                            for msg in snapshot.get('messages', [])]
+    payload = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(payload.encode('utf-8'))
+
+def deserialize_session(blob):
+    """Inverse of serialize_session"""
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+def session_digest(blob):
+    """Fingerprint used to skip writes when nothing changed since the last save"""
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+class MemorySessionStore:
+    """Process-local store: survives page reloads, not restarts, and isn't shared by replicas"""
+
+    def __init__(self, max_entries=10000, ttl=604800):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # token -> (stored_at, blob), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._sessions.get(token)
+            if not entry:
+                return None
+            if time.time() - entry[0] >= self.ttl:
+                del self._sessions[token]
+                return None
+            self._sessions.move_to_end(token)
+            return entry[1]
+
+    def put(self, token, blob):
+        with self._lock:
+            self._sessions[token] = (time.time(), blob)
+            self._sessions.move_to_end(token)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+
+    def delete(self, token):
+        with self._lock:
+            self._sessions.pop(token, None)
+
+class SQLiteSessionStore:
+    """Sessions in a local SQLite file: survives restarts, shared by processes on one host"""
+
+    def __init__(self, path, ttl=604800):
+        self.path = path
+        self.ttl = ttl
+        with connect_sqlite(self.path) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'token TEXT PRIMARY KEY, stored_at REAL NOT NULL, state BLOB NOT NULL)'
+            )
+
+    def get(self, token):
+        with connect_sqlite(self.path) as conn:
+            row = conn.execute(
+                'SELECT state FROM sessions WHERE token = ? AND stored_at >= ?',
+                (token, time.time() - self.ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, token, blob):
+        now = time.time()
+        with connect_sqlite(self.path) as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO sessions (token, stored_at, state) VALUES (?, ?, ?)',
+                (token, now, blob)
+            )
+            conn.execute('DELETE FROM sessions WHERE stored_at < ?', (now - self.ttl,))
+
+    def delete(self, token):
+        with connect_sqlite(self.path) as conn:
+            conn.execute('DELETE FROM sessions WHERE token = ?', (token,))
+
+class RedisSessionStore:
+    """Sessions in Redis (or any server speaking its protocol): shared by every replica"""
+
+    def __init__(self, url, ttl=604800, prefix='board_chat:session:'):
+        # Optional dependency, only needed for this backend
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, token):
+        return self.client.get(self.prefix + token)
+
+    def put(self, token, blob):
+        self.client.set(self.prefix + token, blob, ex=self.ttl)
+
+    def delete(self, token):
+        self.client.delete(self.prefix + token)
+
+def create_session_store(config=SESSION_STORE_CONFIG):
+    """Build the configured session backend ('memory', 'sqlite' or 'redis'), or None when off"""
+    backend = config["backend"]
+    if backend == "memory":
+        return MemorySessionStore(config["max_memory_sessions"], config["ttl"])
+    if backend == "sqlite":
+        return SQLiteSessionStore(config["sqlite_path"], config["ttl"])
+    if backend == "redis":
+        return RedisSessionStore(config["redis_url"], config["ttl"])
+    if backend != "none":
+        print(f"Unknown session store backend: {backend}")
+    return None
@@ -0,0 +1,157 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from config import SIMILAR_QUESTION_CONFIG
+
+# Words that carry no meaning for matching questions ("how do I ..." vs "how to ...")
+_STOPWORDS = frozenset(
+    "a an the i me my we our you your it is are am be to do does did can could should would will "
+    "how what which when where why who of in on for with about and or if at by as that this there "
+    "please any some get "
+    "я мне меня мой моя мы вы ты как что какой какая когда где почему кто в во на с со о об и или "
+    "ли же бы мне это этот для по к ко у из за не ну".split()
+)
+_WORD = re.compile(r'\w+')
+_INNER_HYPHEN = re.compile(r'(?<=\w)[-‐‑](?=\w)')
+
+# Mersenne prime modulus for the MinHash permutations (a * x + b) mod P
+_PRIME = (1 << 61) - 1
+
+def normalize_question(text):
+    """Lowercase words of a question without punctuation, hyphens or stopwords"""
+    text = unicodedata.normalize('NFKC', text).lower().replace('ё', 'е')
+    text = _INNER_HYPHEN.sub('', text)
+    return [word for word in _WORD.findall(text) if word not in _STOPWORDS]
+
+def shingles(words):
+    """Character trigrams of each word (so "choose"/"choosing" overlap) plus the words themselves"""
+    result = set(words)
+    for word in words:
+        padded = f' {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+def make_scope(language, board_members, full_board=False):
+    """Questions only match within the same language, board and answer mode"""
+    return language, tuple(sorted(board_members)), bool(full_board)
+
+class SimilarQuestionIndex:
+    """Near-duplicate lookup of first-turn questions with MinHash and LSH banding.
+
+    Each question is reduced to a MinHash signature of its word and character-trigram
+    shingles; the fraction of equal signature positions estimates the Jaccard similarity
+    of two questions. Signatures are split into `bands` bands, and questions sharing any
+    band within the same scope become candidates, so a lookup only compares against a
+    few entries however many are stored. Entries are evicted least recently used first
+    and expire after `ttl` seconds.
+    """
+
+    def __init__(self, num_perm=64, bands=16, max_entries=5000, ttl=86400, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Fixed permutations, so signatures are comparable across processes with the same seed
+        digest = hashlib.blake2b(str(seed).encode(), digest_size=64).digest()
+        self._perms = []
+        for i in range(num_perm):
+            a = int.from_bytes(hashlib.blake2b(digest + i.to_bytes(4, 'big'), digest_size=8).digest(), 'big')
+            b = int.from_bytes(hashlib.blake2b(digest + i.to_bytes(4, 'little'), digest_size=8).digest(), 'big')
+            self._perms.append((a % (_PRIME - 1) + 1, b % _PRIME))
+        self._entries = OrderedDict()  # (scope, normalized) -> entry, least recently used first
+        self._buckets = {}  # (scope, band, band values) -> set of entry keys
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'matches': 0, 'candidates': 0, 'stores': 0}
+
+    def signature(self, question):
+        """MinHash signature of a question, or None when nothing is left after normalizing"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+            for shingle in shingles(normalize_question(question))
+        ]
+        if not hashes:
+            return None
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+    def lookup(self, question, scope, threshold):
+        """The most similar stored question in scope at or above `threshold`.
+
+        Returns (similarity, {'question', 'answer'}) or None.
+        """
+        signature = self.signature(question)
+        now = time.time()
+        with self._lock:
+            self._stats['lookups'] += 1
+            if signature is None:
+                return None
+            candidates = set()
+            for band_key in self._band_keys(scope, signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            self._stats['candidates'] += len(candidates)
+
+            best = None
+            for key in candidates:
+                entry = self._entries[key]
+                if now - entry['stored_at'] >= self.ttl:
+                    self._remove(key)
+                    continue
+                similarity = sum(x == y for x, y in zip(signature, entry['signature'])) / self.num_perm
+                if similarity >= threshold and (best is None or similarity > best[0]):
+                    best = (similarity, key)
+            if best is None:
+                return None
+            self._entries.move_to_end(best[1])
+            self._stats['matches'] += 1
+            entry = self._entries[best[1]]
+            return best[0], {'question': entry['question'], 'answer': entry['answer']}
+
+    def add(self, question, scope, answer):
+        """Remember the answer to a question; a repeat of the same question replaces it"""
+        words = normalize_question(question)
+        signature = self.signature(question)
+        if signature is None:
+            return
+        key = (scope, ' '.join(words))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {'question': question, 'answer': answer, 'signature': signature,
+                                  'stored_at': time.time()}
+            for band_key in self._band_keys(scope, signature):
+                self._buckets.setdefault(band_key, set()).add(key)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self):
+        """Lookup and match counters, match rate and size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        stats['match_rate'] = stats['matches'] / stats['lookups'] if stats['lookups'] else 0.0
+        return stats
+
+    def _band_keys(self, scope, signature):
+        for band in range(self.bands):
+            yield scope, band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for band_key in self._band_keys(key[0], entry['signature']):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+def create_similar_question_index(config=SIMILAR_QUESTION_CONFIG):
+    """Build the configured similar-question index, or None when disabled"""
+    if not config["enabled"]:
+        return None
+    return SimilarQuestionIndex(config["num_perm"], config["bands"], config["max_entries"], config["ttl"])
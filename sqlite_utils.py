@@ -0,0 +1,12 @@
+import contextlib
+import sqlite3
+
+@contextlib.contextmanager
+def connect_sqlite(path):
+    """Open a local SQLite database, committing on success and closing on exit"""
+    conn = sqlite3.connect(path, timeout=10)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
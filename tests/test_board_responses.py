@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import openrouter_utils
+from config import ADVISOR_PROMPTS, FULL_BOARD_CONFIG
+
+SLOW_MEMBER = "Laozi"
+
+class TrickleHandler(BaseHTTPRequestHandler):
+    """Chat completions that answer at once, except for SLOW_MEMBER's: one byte every 0.2s"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        slow = body['messages'][0]['content'].startswith(f"You are {SLOW_MEMBER},")
+        reply = json.dumps({
+            'choices': [{'message': {'content': 'Advice. ' * 20}}],
+            'usage': {'prompt_tokens': 10, 'completion_tokens': 20, 'total_tokens': 30}
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        try:
+            for i in range(len(reply)):
+                self.wfile.write(reply[i:i + 1])
+                self.wfile.flush()
+                if slow:
+                    time.sleep(0.2)
+        except OSError:
+            # The client gave up and closed the connection
+            pass
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def trickle_server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), TrickleHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(openrouter_utils, 'OPENROUTER_URL', f'http://127.0.0.1:{server.server_port}/v1/chat/completions')
+    monkeypatch.setitem(FULL_BOARD_CONFIG, 'advisor_timeout', 1.0)
+    monkeypatch.setitem(FULL_BOARD_CONFIG, 'turn_timeout', 30.0)
+    yield
+    server.shutdown()
+
+def test_trickling_advisor_is_dropped_at_its_deadline(trickle_server):
+    # Every byte arrives well within the read timeout, but the whole reply would take ~40s
+    members = ["Steve Jobs", SLOW_MEMBER, "Warren Buffett"]
+    meta = {}
+    start = time.monotonic()
+    results = dict(openrouter_utils.iter_board_responses(
+        [{'role': 'user', 'content': 'How do I grow?'}], members, "English", ADVISOR_PROMPTS, use_cache=False,
+        meta=meta
+    ))
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 3
+    assert results[SLOW_MEMBER] is None
+    assert results["Steve Jobs"] and results["Warren Buffett"]
+    assert meta['usage']['total_tokens'] == 60
+
+def test_queued_advisor_gets_its_full_time(trickle_server, monkeypatch):
+    monkeypatch.setitem(FULL_BOARD_CONFIG, 'max_concurrency', 1)
+    members = [SLOW_MEMBER, "Steve Jobs"]
+    results = dict(openrouter_utils.iter_board_responses(
+        [{'role': 'user', 'content': 'How do I grow?'}], members, "English", ADVISOR_PROMPTS, use_cache=False
+    ))
+
+    # Steve Jobs only starts once Laozi is given up on, and still answers
+    assert results[SLOW_MEMBER] is None
+    assert results["Steve Jobs"]
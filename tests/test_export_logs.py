@@ -0,0 +1,59 @@
+import gzip
+import json
+import os
+
+from bench.fake_firebase import FakeDatabase
+from export_logs import export_logs, save_checkpoint
+
+def make_ref(chats=5):
+    ref = FakeDatabase().reference()
+    for i in range(chats):
+        ref.child('chats').child(f'user{i}').set({
+            'timestamp': f'2024-06-0{i + 1}T12:00:00',
+            'language': 'English',
+            'board_members': ['Steve Jobs'],
+            'messages': [{'role': 'user', 'content': f'question {i}'}]
+        })
+    return ref
+
+def read_user_ids(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line)['user_id'] for line in f]
+
+def interrupted_checkpoint():
+    """The checkpoint an export leaves behind after writing its first batch"""
+    return {'since': None, 'cursor': 'user1', 'position': {'offset': 200}, 'exported': 2, 'high_water': None,
+            'done': False}
+
+def test_resume_restarts_when_output_is_missing(tmp_path):
+    output = str(tmp_path / 'chats.jsonl.gz')
+    save_checkpoint(output + '.checkpoint.json', interrupted_checkpoint())
+
+    checkpoint = export_logs(make_ref(), output, page_size=2, resume=True)
+
+    assert checkpoint['done'] and checkpoint['exported'] == 5
+    assert sorted(read_user_ids(output)) == [f'user{i}' for i in range(5)]
+
+def test_resume_restarts_when_output_is_truncated(tmp_path):
+    output = str(tmp_path / 'chats.jsonl.gz')
+    with open(output, 'wb') as f:
+        f.write(b'\x1f\x8b')
+    save_checkpoint(output + '.checkpoint.json', interrupted_checkpoint())
+
+    checkpoint = export_logs(make_ref(), output, page_size=2, resume=True)
+
+    assert checkpoint['exported'] == 5
+    assert sorted(read_user_ids(output)) == [f'user{i}' for i in range(5)]
+
+def test_resume_continues_from_an_intact_output(tmp_path):
+    output = str(tmp_path / 'chats.jsonl.gz')
+    ref = make_ref()
+    export_logs(ref, output, page_size=2)
+    checkpoint_path = output + '.checkpoint.json'
+    with open(checkpoint_path, encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    checkpoint['done'] = False
+    save_checkpoint(checkpoint_path, checkpoint)
+
+    assert export_logs(ref, output, page_size=2, resume=True)['exported'] == 5
+    assert os.path.getsize(output) == checkpoint['position']['offset']
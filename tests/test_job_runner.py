@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from admission import AdmissionController, BusyError
+from config import ADMISSION_CONFIG, JOB_RUNNER_CONFIG
+from job_runner import JobRunner, make_turn_key
+
+def blocked_factory(release, reply):
+    def factory(meta):
+        release.wait(5)
+        yield reply
+    return factory
+
+def test_a_turn_is_coalesced_only_with_the_same_history():
+    runner = JobRunner({**JOB_RUNNER_CONFIG, "max_workers": 4})
+    release = threading.Event()
+    first = runner.submit('user-1', 2, blocked_factory(release, 'first'), turn_key=make_turn_key('user-1', 'a'))
+    again = runner.submit('user-1', 2, blocked_factory(release, 'again'), turn_key=make_turn_key('user-1', 'a'))
+    # Another tab of the same session asked something else at the same turn
+    other = runner.submit('user-1', 2, blocked_factory(release, 'other'), turn_key=make_turn_key('user-1', 'b'))
+    release.set()
+
+    assert again is first
+    assert other is not first
+    assert list(first.follow()) == ['first']
+    assert list(other.follow()) == ['other']
+    assert runner.get('user-1', 2) is other
+
+def test_jobs_past_the_queue_bound_are_turned_away():
+    runner = JobRunner({**JOB_RUNNER_CONFIG, "max_workers": 1, "max_queued": 1})
+    release = threading.Event()
+    running = runner.submit('user-1', 0, blocked_factory(release, 'one'))
+    # Wait until the worker has picked up the first job, so only the second one queues
+    while runner.stats()['queued']:
+        pass
+    queued = runner.submit('user-2', 0, blocked_factory(release, 'two'))
+    with pytest.raises(BusyError) as rejected:
+        runner.submit('user-3', 0, blocked_factory(release, 'three'))
+    release.set()
+
+    assert rejected.value.reason == 'job_queue_full'
+    assert list(running.follow()) == ['one'] and list(queued.follow()) == ['two']
+
+def test_admission_wait_counts_time_queued_for_a_worker():
+    admission = AdmissionController({**ADMISSION_CONFIG, "max_wait": 1})
+    with pytest.raises(BusyError) as rejected:
+        list(admission.run('user-1', lambda meta: iter(['reply']), 100, submitted_at=0))
+
+    assert rejected.value.reason == 'queue_wait'
@@ -0,0 +1,44 @@
+import threading
+
+from bench.fake_firebase import FakeDatabase
+from config import LOG_WRITER_CONFIG
+from firebase_utils import increment_value
+from log_writer import LogWriter
+
+class FlakyRef:
+    """Forwards updates to an in-memory database, failing while `down` is set"""
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.down = False
+
+    def update(self, value):
+        if self.down:
+            raise ConnectionError("Firebase unreachable")
+        self.ref.update(value)
+
+def test_processes_sharing_a_spool_replay_each_update_once(tmp_path):
+    config = dict(LOG_WRITER_CONFIG, spool_path=str(tmp_path / 'spool.sqlite3'), batch_size=5, replay_interval=0)
+    # Slow writes, so the two replays overlap
+    database = FakeDatabase(latency_ms=20)
+    first, second = FlakyRef(database.reference()), FlakyRef(database.reference())
+    writers = [LogWriter(first, config), LogWriter(second, config)]
+    first.down = True
+    for _ in range(40):
+        writers[0].enqueue({'analytics/total/turns': increment_value(1)})
+    writers[0].close()
+    assert writers[0].stats()['spool_depth'] == 40
+
+    first.down = False
+    # Both processes see the full spool and replay at the same time
+    for writer in writers:
+        writer._spool_count = 40
+    threads = [threading.Thread(target=writer._replay) for writer in writers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writers[1].close()
+
+    assert database.reference('analytics/total/turns').get() == 40
+    assert sum(writer.stats()['replayed'] for writer in writers) == 40
@@ -0,0 +1,53 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import openrouter_utils
+from config import SYSTEM_PROMPTS
+
+class BrokenStreamHandler(BaseHTTPRequestHandler):
+    """Streams two content chunks, then drops the connection before the usage chunk"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for text in ('Start with ', 'the customer.'):
+            event = b'data: ' + json.dumps({'choices': [{'delta': {'content': text}}]}).encode() + b'\n\n'
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(event), event))
+            self.wfile.flush()
+        # No terminating chunk: the client sees the stream break off
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def broken_stream_server(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), BrokenStreamHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(openrouter_utils, 'OPENROUTER_URL', f'http://127.0.0.1:{server.server_port}/v1/chat/completions')
+    monkeypatch.setitem(openrouter_utils.OPENROUTER_HTTP_CONFIG, 'max_retries', 0)
+    yield
+    server.shutdown()
+
+def test_usage_is_estimated_when_the_stream_breaks_off(broken_stream_server):
+    meta = {}
+    chunks = list(openrouter_utils.stream_chat_response(
+        [{'role': 'user', 'content': 'How do I grow my company?'}], ["Steve Jobs"], "English", SYSTEM_PROMPTS,
+        use_cache=False, meta=meta
+    ))
+
+    assert ''.join(chunks).startswith('Start with the customer.')
+    assert chunks[-1].strip() == openrouter_utils._error_message("English", "request")
+    assert meta['usage_estimated']
+    assert meta['usage']['completion_tokens'] > 0
+    # The system prompt is billed too
+    assert meta['usage']['prompt_tokens'] > 100
+    assert meta['usage']['total_tokens'] == meta['usage']['prompt_tokens'] + meta['usage']['completion_tokens']
@@ -0,0 +1,77 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import openrouter_utils
+import turn_pipeline
+from admission import AdmissionController
+from config import ADMISSION_CONFIG, CONTEXT_CONFIG, JOB_RUNNER_CONFIG, SYSTEM_PROMPTS
+from context_utils import new_context_state, plan_context
+from job_runner import JobRunner
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    """Answers every request with a fixed reply and usage, recording the models asked"""
+
+    models = []
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.models.append(request['model'])
+        body = json.dumps({
+            'model': request['model'],
+            'choices': [{'message': {'content': 'Summary of the meeting so far.'}}],
+            'usage': {'prompt_tokens': 100, 'completion_tokens': 10, 'total_tokens': 110}
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def completion_server(monkeypatch):
+    CompletionHandler.models = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CompletionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(openrouter_utils, 'OPENROUTER_URL', f'http://127.0.0.1:{server.server_port}/v1/chat/completions')
+    monkeypatch.setitem(CONTEXT_CONFIG, 'token_budget', 200)
+    yield CompletionHandler.models
+    server.shutdown()
+
+def test_summary_runs_in_the_admitted_job(completion_server):
+    messages = []
+    for i in range(6):
+        messages.append({'role': 'user', 'content': f'Question {i}: ' + 'detail ' * 60})
+        messages.append({'role': 'assistant', 'content': f'Answer {i}: ' + 'advice ' * 60})
+    messages.append({'role': 'user', 'content': 'What should I do next?'})
+    state = new_context_state()
+
+    plan = plan_context(messages, state, "English")
+    # Planning doesn't call the API
+    assert completion_server == []
+    assert plan['fold'] and plan['summary_tokens'] > 0
+
+    turn = turn_pipeline.new_turn(messages, False, False, ["Steve Jobs"], "English")
+    job_runner = JobRunner({**JOB_RUNNER_CONFIG, "max_workers": 2})
+    admission = AdmissionController({**ADMISSION_CONFIG, "max_in_flight": 1})
+    job = turn_pipeline.submit_turn(job_runner, admission, 'user-1', turn, plan,
+                                    {'system_prompts': SYSTEM_PROMPTS})
+    # A rerun follows the same job instead of summarizing again
+    assert turn_pipeline.submit_turn(job_runner, admission, 'user-1', turn, plan,
+                                     {'system_prompts': SYSTEM_PROMPTS}) is job
+    list(job.follow())
+    meta = {}
+    response = turn_pipeline.collect_reply(turn, job.follow(meta))
+
+    assert completion_server == [CONTEXT_CONFIG["summary_model"], openrouter_utils.MODEL_CONFIG["model"]]
+    session = {'messages': messages, 'context': state, 'pending_turn': turn}
+    turn_pipeline.attach_reply(session, response, meta)
+    assert session['context'] == {'summary': 'Summary of the meeting so far.', 'summarized_count': plan['fold_to']}
+    assert session['pending_turn'] is None
+    # The summary's tokens are billed with the turn
+    assert meta['usage']['prompt_tokens'] == 200 and meta['usage']['completion_tokens'] == 20
@@ -0,0 +1,173 @@
+"""The steps of a chat turn that don't draw anything.
+
+main_backup.py runs these around its UI code, and bench/load_test.py runs the same
+functions for its simulated sessions, so the load test measures what the app does:
+admission, background jobs, full board fan-out, similar-question lookups and logging.
+"""
+import time
+from config import ADMISSION_CONFIG, ADVISOR_PROMPTS, ANALYTICS_CONFIG, MODEL_CONFIG, SIMILAR_QUESTION_CONFIG, USAGE_CONFIG
+from context_utils import fold_context
+from firebase_utils import build_log_update, log_conversation, build_usage_update, log_usage
+from openrouter_utils import (
+    get_chat_response, stream_chat_response, iter_board_responses, merge_board_responses, add_usage
+)
+from job_runner import make_turn_key
+from analytics import build_analytics_update, log_analytics
+from similar_questions import make_scope
+from metrics_utils import increment
+
+def new_turn(messages, full_board, stream, members, language):
+    """The turn answering the newest message; stored as the session's pending turn until it is attached"""
+    return {
+        'turn_index': len(messages) - 1,
+        'full_board': full_board,
+        'stream': stream,
+        'members': members,
+        'language': language
+    }
+
+def estimate_turn_tokens(turn, plan):
+    """Estimated tokens of a planned turn: the summary request if any, then prompt plus reply
+    (once per member in full board mode)"""
+    estimated_tokens = plan['tokens'] + ADMISSION_CONFIG["reply_token_estimate"]
+    if turn['full_board']:
+        estimated_tokens *= len(turn['members'])
+    return plan['summary_tokens'] + estimated_tokens
+
+def over_token_budget(session_tokens, estimated_tokens):
+    """Whether a turn would take the session past its token budget (0 means no budget)"""
+    budget = USAGE_CONFIG["session_token_budget"]
+    return bool(budget) and session_tokens + estimated_tokens > budget
+
+def lookup_similar(index, turn, question):
+    """Match a first-turn question against earlier ones: ('served' | 'suggested', similarity, earlier) or None"""
+    if not index or turn['turn_index'] != 0:
+        return None
+    match = index.lookup(
+        question, make_scope(turn['language'], turn['members'], turn['full_board']),
+        SIMILAR_QUESTION_CONFIG["suggest_threshold"]
+    )
+    if not match:
+        increment('board_chat_similar_questions_total', result='miss')
+        return None
+    similarity, earlier = match
+    result = 'served' if similarity >= SIMILAR_QUESTION_CONFIG["serve_threshold"] else 'suggested'
+    increment('board_chat_similar_questions_total', result=result)
+    return result, similarity, earlier
+
+def remember_answer(index, turn, question, response, meta):
+    """Add a first-turn answer to the similar-question index.
+
+    Only complete upstream replies are kept: they report usage, while cached replies
+    and errors don't.
+    """
+    if index and turn['turn_index'] == 0 and meta.get('usage') and not meta.get('usage_estimated'):
+        index.add(question, make_scope(turn['language'], turn['members'], turn['full_board']), response)
+
+def _reply_iterator(turn, context, config, meta):
+    """Start the upstream request(s) answering a turn"""
+    members, language = turn['members'], turn['language']
+    if turn['full_board']:
+        return iter_board_responses(context, members, language, config.get('advisor_prompts', ADVISOR_PROMPTS), meta=meta)
+    if turn['stream']:
+        return stream_chat_response(context, members, language, config['system_prompts'], meta=meta)
+    return iter([get_chat_response(context, members, language, config['system_prompts'], meta=meta)])
+
+def turn_iterator_factory(turn, plan, config):
+    """`factory(meta)` running a planned turn, as the job runner expects.
+
+    Older turns are folded into the summary first, inside the admitted job, so the
+    summary request is rate limited with the turn and survives a rerun. The new
+    context state is left in meta['context'] for the session to keep, and the summary's
+    tokens are added to meta['usage'].
+    """
+    def factory(meta):
+        summary_usage = {}
+        context, meta['context'] = fold_context(plan, usage=summary_usage)
+        try:
+            yield from _reply_iterator(turn, context, config, meta)
+        finally:
+            if summary_usage:
+                meta['usage'] = add_usage(meta.get('usage') or {}, summary_usage)
+    return factory
+
+def submit_turn(job_runner, admission, user_id, turn, plan, config):
+    """Start the upstream work for a planned turn as a background job (admitted, then run); returns the job.
+
+    Submitting the same turn with the same history again returns the running job.
+    Raises BusyError if too many jobs are already waiting for a worker.
+    """
+    factory = turn_iterator_factory(turn, plan, config)
+    estimated_tokens = estimate_turn_tokens(turn, plan)
+    prompts = config.get('advisor_prompts', ADVISOR_PROMPTS) if turn['full_board'] else config['system_prompts']
+    turn_key = make_turn_key(
+        user_id, turn['full_board'], turn['stream'], turn['members'], turn['language'], prompts[turn['language']],
+        plan['summary'], plan['fold'], plan['window']
+    )
+    submitted_at = time.monotonic()
+    return job_runner.submit(
+        user_id, turn['turn_index'],
+        lambda meta: admission.run(user_id, factory, estimated_tokens, meta=meta, submitted_at=submitted_at),
+        turn_key=turn_key
+    )
+
+def collect_reply(turn, items):
+    """The whole reply from a turn job's output, for callers that don't draw it as it arrives"""
+    if turn['full_board']:
+        return merge_board_responses(turn['members'], dict(items), turn['language'])
+    return ''.join(items)
+
+def reply_message(response, meta):
+    """The assistant message for a reply, with the model and latency it was logged with"""
+    message = {"role": "assistant", "content": response}
+    for key in ('model', 'ttft_ms', 'latency_ms'):
+        if key in meta:
+            message[key] = meta[key]
+    return message
+
+def attach_reply(state, response, meta):
+    """Add a finished turn's reply to the session, with the context summary its job built"""
+    state['messages'].append(reply_message(response, meta))
+    if 'context' in meta:
+        state['context'] = meta['context']
+    state['pending_turn'] = None
+
+def log_messages(log_writer, ref, user_id, messages, members, language, start):
+    """Log messages[start:] with their analytics rollups.
+
+    Goes through the write-behind `log_writer` when there is one, straight to Firebase
+    otherwise. Returns (number of messages logged so far, the log update written or
+    None), so the caller can index what was logged.
+    """
+    if log_writer:
+        log_update = build_log_update(user_id, messages, members, language, start=start)
+        analytics_update = build_analytics_update(
+            messages, members, language, start=start
+        ) if ANALYTICS_CONFIG["enabled"] else {}
+        # One queued item, so the rollups are written in the same update as the messages
+        log_writer.enqueue({**log_update, **analytics_update})
+        return len(messages), log_update
+    if not ref:
+        return start, None
+    logged_count = log_conversation(ref, user_id, messages, members, language, start=start)
+    if logged_count <= start:
+        return logged_count, None
+    if ANALYTICS_CONFIG["enabled"]:
+        log_analytics(ref, messages, members, language, start=start)
+    return logged_count, build_log_update(user_id, messages, members, language, start=start)
+
+def log_turn_usage(log_writer, ref, user_id, turn, meta, is_anonymous):
+    """Add the turn's tokens to the usage totals; returns the tokens to count against the session"""
+    usage = meta.get('usage')
+    if not usage:
+        # Served from the response cache, or the provider reported no usage
+        return 0
+    if USAGE_CONFIG["enabled"]:
+        args = (user_id, usage, meta.get('model', MODEL_CONFIG["model"]), meta.get('latency_ms'),
+                turn['members'], turn['language'], is_anonymous)
+        if log_writer:
+            # Increments from concurrent turns are summed when the writer merges a batch
+            log_writer.enqueue(build_usage_update(*args))
+        elif ref:
+            log_usage(ref, *args)
+    return usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0)
@@ -0,0 +1,77 @@
+"""Warm up a freshly started Streamlit replica before it takes traffic.
+
+Streamlit only runs the app script when a browser session connects, so a new replica
+would otherwise set up Firebase, load the config and open its OpenRouter connections
+while its first user waits. This opens one headless session with `?warmup=true`;
+main_backup.py then does that setup, waits for the connection pool and reports ready
+(200 on /ready of the metrics port). Exits non-zero if the run fails or times out.
+
+    streamlit run main_backup.py & python warmup.py && touch /tmp/ready
+    python warmup.py --url http://127.0.0.1:8501 --timeout 60
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+async def run_script(url, timeout, query_string='warmup=true', on_message=None):
+    """Run the app script once through the websocket a browser would use; True on success.
+
+    Waits for the server to accept connections first. `on_message`, if given, is called
+    with every ForwardMsg the run sends.
+    """
+    from tornado.websocket import websocket_connect
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ClientState_pb2 import ClientState
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    deadline = time.monotonic() + timeout
+    stream_url = url.rstrip('/').replace('http', 'ws', 1) + '/_stcore/stream'
+    while True:
+        try:
+            connection = await websocket_connect(stream_url)
+            break
+        except OSError:
+            # The server is still starting
+            if time.monotonic() > deadline:
+                return False
+            await asyncio.sleep(0.5)
+
+    try:
+        request = BackMsg(rerun_script=ClientState(query_string=query_string))
+        await connection.write_message(request.SerializeToString(), binary=True)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            data = await asyncio.wait_for(connection.read_message(), remaining)
+            if data is None:
+                return False
+            msg = ForwardMsg()
+            msg.ParseFromString(data)
+            if on_message:
+                on_message(msg)
+            if msg.WhichOneof('type') == 'delta' and msg.delta.new_element.WhichOneof('type') == 'exception':
+                print(f"Script run failed: {msg.delta.new_element.exception.message}")
+                return False
+            if msg.WhichOneof('type') == 'script_finished':
+                return msg.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm up a Streamlit replica of the board chat")
+    parser.add_argument("--url", default="http://127.0.0.1:8501", help="the replica's Streamlit server")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for the server and the run")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if not asyncio.run(run_script(args.url, args.timeout)):
+        print(f"Warm-up of {args.url} did not finish")
+        sys.exit(1)
+    print(f"Warmed up {args.url} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()